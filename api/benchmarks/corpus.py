@@ -0,0 +1,81 @@
+"""
+Synthetic chat-message corpora for offline benchmarks.
+Messages mix everyday filler with phrases drawn from the emotion lexicon.
+"""
+
+import json
+import os
+import random
+
+LEXICON_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'lexicon.json')
+
+FILLER = [
+    "i", "really", "just", "feel", "today", "about", "work", "so", "the", "and", "my",
+    "was", "have", "been", "think", "not", "very", "it", "again", "lately", "at", "night"
+]
+
+OPENERS = [
+    "Honestly,", "I don't know,", "Today", "Lately", "Right now", "Ugh,", "Hey,", ""
+]
+
+CLOSERS = ["", ".", "!", "...", "?", " :(", " :)"]
+
+
+def load_lexicon():
+    with open(LEXICON_PATH, 'r') as f:
+        return json.load(f)
+
+
+def generate_messages(count=1000, seed=7, min_words=3, max_words=40, lexicon_ratio=0.25):
+    """
+    Returns `count` deterministic pseudo-random messages.
+    """
+    lexicon = load_lexicon()
+    categories = list(lexicon.keys())
+    rng = random.Random(seed)
+
+    messages = []
+    for _ in range(count):
+        words = []
+        for _ in range(rng.randint(min_words, max_words)):
+            if rng.random() < lexicon_ratio:
+                words.append(rng.choice(lexicon[rng.choice(categories)]))
+            else:
+                words.append(rng.choice(FILLER))
+        message = f"{rng.choice(OPENERS)} {' '.join(words)}{rng.choice(CLOSERS)}".strip()
+        messages.append(message)
+    return messages
+
+
+def generate_state_messages(state, count=50, words=50, seed=7, lexicon_ratio=0.15):
+    """
+    Returns `count` deterministic messages of about `words` words aimed at one
+    classified state: filler mixed with phrases from that state's lexicon
+    category. Critical messages carry exactly one crisis phrase; the rest
+    of their emotional vocabulary comes from the Depression category.
+    Run with the api/ directory on sys.path.
+    """
+    from nlp.lexicon_matcher import LexiconMatcher
+    from nlp.preprocessing import clean_text
+
+    lexicon = load_lexicon()
+    rng = random.Random(f"{seed}:{state}:{words}")
+
+    # Phrases that contain a crisis phrase (e.g. "need help") would turn every message Critical
+    crisis = LexiconMatcher({"Critical Distress": lexicon["Critical Distress"]})
+    source = lexicon["Depression"] if state == "Critical Distress" else lexicon[state]
+    pool = [phrase for phrase in source if not crisis.match(clean_text(phrase))["keywords"]]
+
+    messages = []
+    for _ in range(count):
+        tokens = []
+        if state == "Critical Distress":
+            tokens.append(rng.choice(lexicon["Critical Distress"]))
+        length = sum(len(token.split()) for token in tokens)
+        while length < words:
+            token = rng.choice(pool) if rng.random() < lexicon_ratio else rng.choice(FILLER)
+            tokens.append(token)
+            length += len(token.split())
+        rng.shuffle(tokens)
+        messages.append(f"{rng.choice(OPENERS)} {' '.join(tokens)}{rng.choice(CLOSERS)}".strip())
+    return messages
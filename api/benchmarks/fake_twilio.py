@@ -0,0 +1,261 @@
+"""
+Local stand-in for the Twilio Messages REST API, with latency and failure injection.
+
+Implements POST /2010-04-01/Accounts/<AccountSid>/Messages.json the way
+SOSService uses it: a form-encoded To/From/Body request answered with a
+201 message resource, or with a Twilio-style JSON error. Every request
+goes through the same stages a loaded provider would show:
+
+    1. rate limit    requests beyond --rate-limit per second get 429 (code 20429)
+    2. latency       sampled from --latency before anything else is answered
+    3. injection     --error-rate of the rest fail with 500, --throttle-rate with 429
+
+The server speaks HTTP/1.1 keep-alive, so PooledTwilioHttpClient reuses
+its connections exactly as it does against api.twilio.com.
+
+Point the API (or test_sos.py) at it with TWILIO_API_BASE_URL; any
+credentials are accepted:
+
+    python benchmarks/fake_twilio.py --port 8089 --latency lognormal:120:0.6 --error-rate 0.02
+    TWILIO_API_BASE_URL=http://127.0.0.1:8089 TWILIO_ACCOUNT_SID=ACfake TWILIO_AUTH_TOKEN=fake \\
+        TWILIO_PHONE_NUMBER=+15005550006 python index.py
+
+Latency specs (milliseconds):
+    fixed:MS  uniform:LOW:HIGH  normal:MEAN:SD  lognormal:MEDIAN:SIGMA  exponential:MEAN
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+MESSAGES_PATH = re.compile(r"^/2010-04-01/Accounts/(?P<account>[^/]+)/Messages\.json$")
+
+
+def parse_latency(spec):
+    """
+    Returns a callable giving one latency sample in seconds for a spec such
+    as "lognormal:120:0.6". Raises ValueError on an unknown spec.
+    """
+    name, _, params = (spec or "fixed:0").partition(":")
+    try:
+        values = [float(value) for value in params.split(":")] if params else []
+    except ValueError:
+        raise ValueError(f"Invalid latency parameters in '{spec}'")
+
+    shapes = {
+        "fixed": (1, lambda rng, ms: ms),
+        "uniform": (2, lambda rng, low, high: rng.uniform(low, high)),
+        "normal": (2, lambda rng, mean, sd: rng.gauss(mean, sd)),
+        "lognormal": (2, lambda rng, median, sigma: rng.lognormvariate(math.log(max(median, 1e-6)), sigma)),
+        "exponential": (1, lambda rng, mean: rng.expovariate(1 / mean) if mean > 0 else 0.0)
+    }
+    if name not in shapes or len(values) != shapes[name][0]:
+        raise ValueError(f"Invalid latency spec '{spec}'; expected one of: {', '.join(f'{k}:...' for k in shapes)}")
+
+    draw = shapes[name][1]
+    rng = random.Random()
+    lock = threading.Lock()
+
+    def sample():
+        with lock:
+            return max(0.0, draw(rng, *values)) / 1000
+    return sample
+
+
+class RateLimiter:
+    """Token bucket admitting `rate` requests per second with bursts of up to `burst`."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "FakeTwilio/1.0"
+
+    def log_message(self, format, *args):
+        if self.server.fake.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, code, message, headers=None):
+        self._send_json(status, {
+            "code": code,
+            "message": message,
+            "more_info": f"https://www.twilio.com/docs/errors/{code}",
+            "status": status
+        }, headers)
+
+    def do_HEAD(self):
+        # Connection warm-up
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        self._send_error(404, 20404, "The requested resource was not found")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        form = {key: values[-1] for key, values in parse_qs(self.rfile.read(length).decode("utf-8")).items()}
+
+        match = MESSAGES_PATH.match(self.path.split("?", 1)[0])
+        if not match:
+            return self._send_error(404, 20404, "The requested resource was not found")
+        self.server.fake.handle_message(self, match.group("account"), form)
+
+
+class FakeTwilioServer:
+    """
+    Threaded fake of the Messages API. Use start()/stop() in-process, or
+    main() from the command line. `accepted` keeps (monotonic time, To,
+    Body) for every message answered with 201.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency="fixed:0", error_rate=0.0,
+                 throttle_rate=0.0, rate_limit=None, seed=None, verbose=False):
+        self.latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.rate_limiter = RateLimiter(rate_limit) if rate_limit else None
+        self.verbose = verbose
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.responses = Counter()
+        self.accepted = []
+
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.fake = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-twilio", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def stats(self):
+        with self._lock:
+            return {"responses": dict(self.responses), "accepted": len(self.accepted)}
+
+    def _record(self, outcome):
+        with self._lock:
+            self.responses[outcome] += 1
+
+    def handle_message(self, handler, account_sid, form):
+        if self.rate_limiter and not self.rate_limiter.allow():
+            self._record("429_rate_limited")
+            return handler._send_error(429, 20429, "Too Many Requests", {"Retry-After": "1"})
+
+        time.sleep(self.latency())
+
+        missing = [field for field in ("To", "From", "Body") if not form.get(field)]
+        if missing:
+            self._record("400")
+            return handler._send_error(400, 21604 if "To" in missing else 21602, f"A '{missing[0]}' parameter is required.")
+
+        with self._lock:
+            roll = self._rng.random()
+        if roll < self.error_rate:
+            self._record("500")
+            return handler._send_error(500, 20500, "Internal Server Error")
+        if roll < self.error_rate + self.throttle_rate:
+            self._record("429_injected")
+            return handler._send_error(429, 20429, "Too Many Requests", {"Retry-After": "1"})
+
+        sid = "SM" + uuid.uuid4().hex
+        with self._lock:
+            self.responses["201"] += 1
+            self.accepted.append((time.monotonic(), form["To"], form["Body"]))
+
+        now = formatdate(usegmt=True)
+        handler._send_json(201, {
+            "sid": sid,
+            "account_sid": account_sid,
+            "to": form["To"],
+            "from": form["From"],
+            "body": form["Body"],
+            "status": "queued",
+            "direction": "outbound-api",
+            "num_segments": "1",
+            "date_created": now,
+            "date_updated": now,
+            "api_version": "2010-04-01",
+            "uri": f"/2010-04-01/Accounts/{account_sid}/Messages/{sid}.json"
+        })
+
+
+def add_fault_arguments(parser):
+    """Latency and failure options shared with benchmarks/sos_throughput.py."""
+    parser.add_argument("--latency", default="lognormal:120:0.5", help="Provider latency distribution (ms), see above")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--rate-limit", type=float, help="Requests per second before 429s (token bucket)")
+    parser.add_argument("--seed", type=int, help="Seed for failure injection")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    try:
+        server = FakeTwilioServer(args.host, args.port, args.latency, args.error_rate,
+                                  args.throttle_rate, args.rate_limit, args.seed, args.verbose)
+    except ValueError as e:
+        raise SystemExit(f"❌ {e}")
+    print(f"📡 Fake Twilio listening on {server.url} (set TWILIO_API_BASE_URL={server.url})")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"\n📊 {server.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Cold-start report: import time per module, with a budget check.
+
+Imports the target module (index by default, which also builds the
+services) in fresh interpreters under `python -X importtime`, takes the
+median over runs, and prints the slowest third-party packages and every
+project module. Exits with status 1 when the target's cumulative import
+time exceeds the budget, so it can gate CI.
+
+Run from the api/ directory:
+    python benchmarks/import_time.py --runs 5 --budget-ms 250
+    python benchmarks/import_time.py --json > import_times.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+API_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), '..'))
+PROJECT_PACKAGES = ("index", "services", "nlp", "models", "utils")
+
+
+def measure(module):
+    """
+    One cold import in a fresh interpreter.
+    Returns {module_name: (self_us, cumulative_us)}.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=API_DIR,
+        capture_output=True,
+        text=True,
+        env=dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+
+def summarize(runs, module, top):
+    names = set().union(*runs)
+    median = {
+        name: (
+            statistics.median(run.get(name, (0, 0))[0] for run in runs),
+            statistics.median(run.get(name, (0, 0))[1] for run in runs)
+        )
+        for name in names
+    }
+
+    # Third-party cost is attributed to the top-level package by summing self time
+    packages = defaultdict(float)
+    for name, (self_us, _) in median.items():
+        root = name.split(".")[0]
+        if root not in PROJECT_PACKAGES:
+            packages[root] += self_us
+
+    project = {
+        name: cumulative_us
+        for name, (_, cumulative_us) in median.items()
+        if name.split(".")[0] in PROJECT_PACKAGES
+    }
+
+    return {
+        "module": module,
+        "runs": len(runs),
+        "total_ms": round(median.get(module, (0, 0))[1] / 1000, 2),
+        "packages_ms": {
+            name: round(us / 1000, 2)
+            for name, us in sorted(packages.items(), key=lambda item: -item[1])[:top]
+        },
+        "project_ms": {
+            name: round(us / 1000, 2)
+            for name, us in sorted(project.items(), key=lambda item: -item[1])
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="index", help="Module to import (default: index)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="Third-party packages to list")
+    parser.add_argument("--budget-ms", type=float, default=None, help="Fail when the cumulative import time exceeds this")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = summarize([measure(args.module) for _ in range(args.runs)], args.module, args.top)
+    report["budget_ms"] = args.budget_ms
+    report["within_budget"] = args.budget_ms is None or report["total_ms"] <= args.budget_ms
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"import {args.module}: {report['total_ms']:.1f} ms (median of {report['runs']} cold runs)")
+        print("\nThird-party packages (self time):")
+        for name, ms in report["packages_ms"].items():
+            print(f"  {name:<28} {ms:>8.1f} ms")
+        print("\nProject modules (cumulative):")
+        for name, ms in report["project_ms"].items():
+            print(f"  {name:<28} {ms:>8.1f} ms")
+        if args.budget_ms is not None:
+            verdict = "within" if report["within_budget"] else "OVER"
+            print(f"\nBudget {args.budget_ms:.0f} ms: {verdict}")
+
+    sys.exit(0 if report["within_budget"] else 1)
+
+
+if __name__ == "__main__":
+    main()
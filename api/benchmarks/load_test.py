@@ -0,0 +1,374 @@
+"""
+Load test for /api/analyze: throughput, latency percentiles and error rates.
+
+Replays a weighted mix of normal, distressed (stress, anxiety, depression)
+and critical messages, each sent with a client history of a randomly
+chosen size, from a pool of client threads. Three targets:
+
+    inprocess   index.app through Flask's test client (WSGI, no sockets)
+    socket      index.app behind a local threaded HTTP server on a free port
+    --url       an already running server, e.g. gunicorn on another terminal
+
+For the in-process targets Twilio is replaced by a local stub, so critical
+traffic goes through the real SOS path (outbox, workers, fan-out) without
+sending SMS; --sms-latency-ms sets the stub's simulated provider latency.
+Against --url the server's own SOS configuration applies: run it without
+Twilio credentials (mock mode) before sending critical traffic.
+
+Without --rate, every thread sends back-to-back (closed loop) and the run
+measures the maximum sustainable throughput. With --rate, requests are
+sent on a fixed schedule (open loop) and latency is measured from the
+scheduled send time, so queueing behind a saturated server shows up in
+the percentiles; pass several rates to find where p99 falls apart.
+
+Result caches are disabled unless --cache is given. Run from the api/ directory:
+    python benchmarks/load_test.py --duration 20 --concurrency 8
+    python benchmarks/load_test.py --target socket --rate 50 100 200 400
+    python benchmarks/load_test.py --mix normal=50 distressed=30 critical=20 --history 0 10 50
+    python benchmarks/load_test.py --url http://127.0.0.1:5000 --concurrency 32 --save load.json
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from collections import Counter, defaultdict
+
+# Add the parent api directory to the path to import services
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.corpus import generate_state_messages
+from benchmarks.stats import latency_stats
+
+CLASSES = {
+    "normal": ("Normal",),
+    "distressed": ("Stress", "Anxiety", "Depression"),
+    "critical": ("Critical Distress",)
+}
+DEFAULT_MIX = ("normal=70", "distressed=25", "critical=5")
+DEFAULT_HISTORY = (0, 3, 10)
+
+EMERGENCY_CONTACTS = [
+    {"name": "Load Test Contact A", "phone": "+15005550001"},
+    {"name": "Load Test Contact B", "phone": "+15005550002"}
+]
+
+
+class StubTwilioClient:
+    """
+    Stands in for twilio.rest.Client: messages.create sleeps for the
+    configured latency and returns a fake SID.
+    """
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.sent = 0
+        self._lock = threading.Lock()
+        self.messages = self
+
+    def create(self, body, from_, to):
+        time.sleep(self.latency)
+        with self._lock:
+            self.sent += 1
+            return _StubMessage(f"SMload{self.sent:08d}")
+
+
+class _StubMessage:
+    def __init__(self, sid):
+        self.sid = sid
+
+
+def parse_mix(items):
+    mix = {}
+    for item in items:
+        name, _, weight = item.partition("=")
+        if name not in CLASSES or not weight:
+            raise SystemExit(f"❌ Invalid mix entry '{item}'; expected one of {', '.join(CLASSES)} as name=weight")
+        mix[name] = float(weight)
+    return mix
+
+
+def build_workload(mix, history_sizes, words, messages, users, mode, seed):
+    """
+    Pre-encodes request bodies so the client threads spend their time on
+    the server, not on building JSON. Returns [(class, share, bodies)],
+    with each class's share of the traffic taken from `mix`.
+    """
+    rng = random.Random(seed)
+    states = [state for names in CLASSES.values() for state in names]
+
+    bodies = {}
+    for name in mix:
+        texts = [text for state in CLASSES[name]
+                 for text in generate_state_messages(state, count=messages, words=words, seed=seed)]
+        bodies[name] = []
+        for text in texts:
+            size = rng.choice(history_sizes)
+            payload = {
+                "message": text,
+                "mode": mode,
+                "history": [{"classified_state": rng.choice(states)} for _ in range(size)],
+                "emergency_contacts": EMERGENCY_CONTACTS,
+                # Distinct users, so critical traffic is not all coalesced into one alert
+                "user_info": {"uid": f"load-user-{rng.randrange(users)}", "name": "Load Test User"}
+            }
+            bodies[name].append(json.dumps(payload).encode("utf-8"))
+
+    total = sum(mix.values())
+    return [(name, weight / total, bodies[name]) for name, weight in mix.items() if weight > 0]
+
+
+def pick(workload, rng):
+    point = rng.random()
+    for name, share, bodies in workload:
+        point -= share
+        if point < 0:
+            break
+    return name, rng.choice(bodies)
+
+
+class InProcessTarget:
+    def __init__(self, app):
+        self.app = app
+
+    def session(self):
+        client = self.app.test_client()
+
+        def post(body):
+            response = client.post("/api/analyze", data=body, content_type="application/json")
+            response.get_data()
+            return response.status_code
+        return post
+
+    def close(self):
+        pass
+
+
+class HttpTarget:
+    """One keep-alive connection per client thread, reopened after errors."""
+
+    def __init__(self, url, server=None):
+        parsed = urllib.parse.urlsplit(url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.path = (parsed.path.rstrip("/") or "") + "/api/analyze"
+        self.server = server
+
+    def session(self):
+        state = {"connection": None}
+
+        def post(body):
+            if state["connection"] is None:
+                state["connection"] = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            try:
+                state["connection"].request("POST", self.path, body, {"Content-Type": "application/json"})
+                response = state["connection"].getresponse()
+                response.read()
+                if response.getheader("Connection", "").lower() == "close":
+                    state["connection"].close()
+                    state["connection"] = None
+                return response.status
+            except Exception:
+                state["connection"].close()
+                state["connection"] = None
+                raise
+        return post
+
+    def close(self):
+        if self.server:
+            self.server.shutdown()
+
+
+def run_step(target, workload, concurrency, duration, rate=None, seed=7):
+    """
+    Drives the target for `duration` seconds. Returns the per-request
+    (class, seconds, error) results and the elapsed time.
+    """
+    results = []
+    lock = threading.Lock()
+    schedule = itertools.count()
+    start = time.perf_counter()
+    end = start + duration
+
+    def client(index):
+        rng = random.Random(f"{seed}:{index}")
+        post = target.session()
+        local = []
+        while True:
+            if rate:
+                with lock:
+                    scheduled = start + next(schedule) / rate
+                if scheduled >= end:
+                    break
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            else:
+                scheduled = time.perf_counter()
+                if scheduled >= end:
+                    break
+
+            name, body = pick(workload, rng)
+            try:
+                status = post(body)
+                error = None if status == 200 else f"HTTP {status}"
+            except Exception as e:
+                error = type(e).__name__
+            local.append((name, time.perf_counter() - scheduled, error))
+
+        with lock:
+            results.extend(local)
+
+    threads = [threading.Thread(target=client, args=(i,), name=f"load-{i}") for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - start
+
+
+def summarize(results, elapsed, concurrency, rate):
+    by_class = defaultdict(list)
+    errors = Counter()
+    for name, seconds, error in results:
+        by_class[name].append(seconds)
+        if error:
+            errors[error] += 1
+
+    return {
+        "rate": rate,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 2),
+        "requests": len(results),
+        "throughput_rps": round(len(results) / elapsed, 1) if elapsed else 0.0,
+        "error_rate": round(sum(errors.values()) / len(results), 4) if results else 0.0,
+        "errors": dict(errors),
+        "latency": latency_stats([seconds for _, seconds, _ in results]),
+        "classes": {name: latency_stats(by_class[name]) for name in CLASSES if name in by_class}
+    }
+
+
+def print_step(step):
+    rate = f"{step['rate']:g}/s scheduled" if step["rate"] else "closed loop"
+    print(f"\n📊 {rate}, {step['concurrency']} clients: {step['requests']:,} requests in {step['elapsed_s']}s "
+          f"= {step['throughput_rps']:,.1f} req/s, errors {step['error_rate']:.2%}")
+    print(f"  {'class':<12} {'count':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, stats in [("all", step["latency"])] + list(step["classes"].items()):
+        if stats["count"]:
+            print(f"  {name:<12} {stats['count']:>8} {stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} "
+                  f"{stats['p99_ms']:>9.1f} {stats['max_ms']:>9.1f}")
+    for error, count in step["errors"].items():
+        print(f"  ❌ {error}: {count}")
+
+
+def prepare_environment(cache, sms_latency):
+    """
+    Configures index.app for an offline run before it is imported: caches
+    off unless requested, a throwaway SOS outbox, and the Twilio stub.
+    """
+    if not cache:
+        os.environ["ANALYSIS_CACHE_MAX_ENTRIES"] = "0"
+        os.environ["SENTIMENT_CACHE_MAX_ENTRIES"] = "0"
+    for variable in ("TWILIO_ACCOUNT_SID", "TWILIO_AUTH_TOKEN", "TWILIO_PHONE_NUMBER"):
+        os.environ.pop(variable, None)
+    os.environ["SOS_OUTBOX_PATH"] = os.path.join(tempfile.mkdtemp(prefix="kiddoo-load-"), "outbox.db")
+
+    import logging
+    logging.disable(logging.WARNING)
+    import index
+
+    stub = StubTwilioClient(sms_latency)
+    if index.sos_service:
+        index.sos_service.client = stub
+        index.sos_service.from_number = "+15005550006"
+    index.warm_up()
+    return index.app, stub
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=("inprocess", "socket"), default="inprocess")
+    parser.add_argument("--url", help="Base URL of a running server (overrides --target)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Client threads")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per step")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds before the first step")
+    parser.add_argument("--rate", type=float, nargs="+", help="Open-loop request rates (req/s), one step each")
+    parser.add_argument("--mix", nargs="+", default=list(DEFAULT_MIX), help="Class weights, e.g. normal=70 distressed=25 critical=5")
+    parser.add_argument("--history", type=int, nargs="+", default=list(DEFAULT_HISTORY), help="History sizes to draw from")
+    parser.add_argument("--words", type=int, default=30, help="Words per message")
+    parser.add_argument("--messages", type=int, default=200, help="Distinct messages per state")
+    parser.add_argument("--users", type=int, default=1000, help="Distinct user ids")
+    parser.add_argument("--mode", default="user", choices=("user", "review"))
+    parser.add_argument("--sms-latency-ms", type=float, default=150.0, help="Simulated provider latency of the Twilio stub")
+    parser.add_argument("--cache", action="store_true", help="Keep the analysis and sentiment caches enabled")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    print(f"🧪 Building workload: {', '.join(f'{k}={v:g}' for k, v in mix.items())}, history sizes {args.history}", file=sys.stderr)
+    workload = build_workload(mix, args.history, args.words, args.messages, args.users, args.mode, args.seed)
+
+    stub = None
+    if args.url:
+        target = HttpTarget(args.url)
+        target_name = args.url
+    else:
+        app, stub = prepare_environment(args.cache, args.sms_latency_ms / 1000)
+        if args.target == "socket":
+            from werkzeug.serving import make_server
+
+            server = make_server("127.0.0.1", 0, app, threaded=True)
+            threading.Thread(target=server.serve_forever, name="load-server", daemon=True).start()
+            target = HttpTarget(f"http://127.0.0.1:{server.port}", server)
+        else:
+            target = InProcessTarget(app)
+        target_name = args.target
+
+    try:
+        if args.warmup > 0:
+            run_step(target, workload, args.concurrency, args.warmup, seed=args.seed + 1)
+
+        steps = []
+        for rate in args.rate or [None]:
+            results, elapsed = run_step(target, workload, args.concurrency, args.duration, rate, args.seed)
+            step = summarize(results, elapsed, args.concurrency, rate)
+            steps.append(step)
+            print_step(step)
+    finally:
+        target.close()
+
+    if stub:
+        print(f"\n📱 Twilio stub accepted {stub.sent:,} SMS")
+
+    if args.save:
+        report = {
+            "meta": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "target": target_name,
+                "mix": mix,
+                "history_sizes": args.history,
+                "words": args.words,
+                "mode": args.mode,
+                "cache": args.cache,
+                "sms_latency_ms": args.sms_latency_ms if stub else None,
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S")
+            },
+            "steps": steps
+        }
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Saved results to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""
+Per-stage benchmark of the /api/analyze pipeline.
+
+Generates deterministic corpora for each of the five states at several
+message lengths, then times every stage on its own (lexicon pass,
+sentiment, classification, intensity, agent response) and the whole
+perform_full_analysis call. Reports p50/p95/p99 latency and the peak
+memory allocated per call (tracemalloc, measured in a separate pass so it
+does not distort timings).
+
+Results can be saved as a baseline and later runs compared against it;
+any cell whose p50 or p95 grows by more than --threshold is flagged and
+the exit status is 1.
+
+Runs offline: result caches are disabled and SOS alerts for Critical
+messages go to an in-memory outbox in mock mode (Twilio credentials are
+ignored). Run from the api/ directory:
+    python benchmarks/pipeline.py --save benchmarks/baseline.json
+    python benchmarks/pipeline.py --compare benchmarks/baseline.json
+    python benchmarks/pipeline.py --lengths 5 50 --messages 20 --stages keywords full
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+# Add the parent api directory to the path to import services
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+# Measure the pipeline itself, not cache hits or real SMS
+os.environ["ANALYSIS_CACHE_MAX_ENTRIES"] = "0"
+os.environ["SENTIMENT_CACHE_MAX_ENTRIES"] = "0"
+os.environ["SESSION_STORE"] = "none"
+for variable in ("TWILIO_ACCOUNT_SID", "TWILIO_AUTH_TOKEN", "TWILIO_PHONE_NUMBER"):
+    os.environ.pop(variable, None)
+
+from benchmarks.corpus import generate_state_messages
+from benchmarks.stats import percentile
+from utils.constants import ALLOWED_STATES
+
+STAGES = ("keywords", "sentiment", "classify", "intensity", "agent", "full")
+DEFAULT_LENGTHS = (5, 50, 500, 5000)
+
+
+def build_service():
+    import logging
+    from services.analysis_service import AnalysisService
+    from services.sos_service import SOSService
+    from services.sos_outbox import SOSOutbox, MEMORY_OUTBOX
+
+    logging.disable(logging.WARNING)
+    return AnalysisService(sos_service=SOSService(outbox=SOSOutbox(MEMORY_OUTBOX)))
+
+
+def stage_calls(service, message):
+    """
+    The pipeline of perform_full_analysis split into separately timed steps.
+    Each call receives the previous stage's output so no stage is repeated.
+    """
+    from utils.scoring import calculate_intensity
+
+    state = {}
+
+    def keywords():
+        state["context"] = service.keyword_extractor.build_context(message)
+
+    def sentiment():
+        state["context"].sentiment = service.sentiment_analyzer.analyze(message, state["context"])
+
+    def classify():
+        state["detailed"] = service.state_classifier.get_detailed_classification(state["context"])
+
+    def intensity():
+        context = state["context"]
+        state["intensity"] = calculate_intensity(context.sentiment_score, context.total_match_weight)
+
+    def agent():
+        service.agent_service.generate_response(state["detailed"]["classified_state"], state["intensity"], "Stable")
+
+    def full():
+        service.perform_full_analysis(message, 'review')
+
+    return {"keywords": keywords, "sentiment": sentiment, "classify": classify,
+            "intensity": intensity, "agent": agent, "full": full}
+
+
+def run_cell(service, messages, stages):
+    timings = {stage: [] for stage in stages}
+    peaks = {stage: [] for stage in stages}
+
+    # Warm-up so lazy imports and first-call setup are not measured
+    for call in stage_calls(service, messages[0]).values():
+        call()
+
+    for message in messages:
+        calls = stage_calls(service, message)
+        for stage in STAGES:
+            start = time.perf_counter()
+            calls[stage]()
+            if stage in timings:
+                timings[stage].append((time.perf_counter() - start) * 1e6)
+
+    tracemalloc.start()
+    try:
+        for message in messages:
+            calls = stage_calls(service, message)
+            for stage in STAGES:
+                tracemalloc.reset_peak()
+                baseline = tracemalloc.get_traced_memory()[0]
+                calls[stage]()
+                if stage in peaks:
+                    peaks[stage].append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+
+    summary = {}
+    for stage in stages:
+        values = sorted(timings[stage])
+        summary[stage] = {
+            "p50_us": round(percentile(values, 0.50), 2),
+            "p95_us": round(percentile(values, 0.95), 2),
+            "p99_us": round(percentile(values, 0.99), 2),
+            "mean_us": round(sum(values) / len(values), 2),
+            "peak_alloc_bytes": max(peaks[stage]),
+            "mean_peak_alloc_bytes": int(sum(peaks[stage]) / len(peaks[stage]))
+        }
+    return summary
+
+
+def run(lengths, count, seed, stages):
+    service = build_service()
+    results = {stage: {} for stage in stages}
+    for words in lengths:
+        for state in ALLOWED_STATES:
+            messages = generate_state_messages(state, count=count, words=words, seed=seed)
+            for stage, stats in run_cell(service, messages, stages).items():
+                results[stage][f"{state}/{words}"] = stats
+            print(f"  ✓ {state:<18} {words:>5} words", file=sys.stderr)
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sentiment_engine": service.sentiment_analyzer.engine,
+            "lengths": list(lengths),
+            "messages_per_cell": count,
+            "seed": seed,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S")
+        },
+        "results": results
+    }
+
+
+def compare(report, baseline, threshold):
+    """
+    Returns the cells whose p50 or p95 grew by more than `threshold` (a fraction).
+    """
+    regressions = []
+    for stage, cells in report["results"].items():
+        for cell, stats in cells.items():
+            previous = baseline.get("results", {}).get(stage, {}).get(cell)
+            if not previous:
+                continue
+            for metric in ("p50_us", "p95_us"):
+                if previous[metric] > 0 and stats[metric] > previous[metric] * (1 + threshold):
+                    regressions.append({
+                        "stage": stage,
+                        "cell": cell,
+                        "metric": metric,
+                        "baseline": previous[metric],
+                        "current": stats[metric],
+                        "change": round(stats[metric] / previous[metric] - 1, 4)
+                    })
+    return regressions
+
+
+def print_report(report):
+    for stage, cells in report["results"].items():
+        print(f"\n⏱️  {stage}")
+        print(f"  {'cell':<24} {'p50 us':>10} {'p95 us':>10} {'p99 us':>10} {'peak alloc':>12}")
+        for cell, stats in cells.items():
+            print(f"  {cell:<24} {stats['p50_us']:>10.1f} {stats['p95_us']:>10.1f} "
+                  f"{stats['p99_us']:>10.1f} {stats['peak_alloc_bytes']:>10} B")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lengths", type=int, nargs="+", default=list(DEFAULT_LENGTHS), help="Message lengths in words")
+    parser.add_argument("--messages", type=int, default=50, help="Messages per state and length")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed slowdown before flagging (0.15 = 15%%)")
+    args = parser.parse_args()
+
+    print(f"📊 Benchmarking {len(ALLOWED_STATES)} states x {len(args.lengths)} lengths x {args.messages} messages", file=sys.stderr)
+    report = run(args.lengths, args.messages, args.seed, args.stages)
+    print_report(report)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Saved results to {args.save}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) over {args.threshold:.0%}:")
+            for r in regressions:
+                print(f"  {r['stage']:<10} {r['cell']:<24} {r['metric']} {r['baseline']:.1f} -> {r['current']:.1f} us ({r['change']:+.0%})")
+            sys.exit(1)
+        print(f"\n✅ No regressions over {args.threshold:.0%} against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
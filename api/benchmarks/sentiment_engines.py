@@ -0,0 +1,84 @@
+"""
+Benchmark: TextBlob vs the in-house lexicon polarity scorer.
+Reports per-message latency, cold load time and agreement with TextBlob.
+
+Run from the api/ directory:
+    python benchmarks/sentiment_engines.py --messages 2000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+# Add the parent api directory to the path to import models
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.corpus import generate_messages
+from benchmarks.stats import percentile
+
+
+def label(score):
+    if score > 0.1:
+        return "Positive"
+    if score < -0.1:
+        return "Negative"
+    return "Neutral"
+
+
+def time_engine(score_fn, messages):
+    timings = []
+    scores = []
+    for message in messages:
+        start = time.perf_counter()
+        scores.append(score_fn(message))
+        timings.append(time.perf_counter() - start)
+    return scores, timings
+
+
+def summarize(name, load_seconds, timings):
+    # Microseconds: a single message scores well under a millisecond
+    timings_us = sorted(t * 1e6 for t in timings)
+    print(f"  {name:<9} load {load_seconds * 1000:8.1f} ms | "
+          f"mean {statistics.mean(timings_us):8.1f} us | p50 {percentile(timings_us, 0.50):8.1f} us | "
+          f"p95 {percentile(timings_us, 0.95):8.1f} us | total {sum(timings) * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=2000, help="Number of synthetic messages")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    messages = generate_messages(args.messages, seed=args.seed)
+    print(f"📊 Scoring {len(messages)} messages\n")
+
+    start = time.perf_counter()
+    from textblob import TextBlob
+    textblob_load = time.perf_counter() - start
+    textblob_scores, textblob_timings = time_engine(lambda m: TextBlob(m).sentiment.polarity, messages)
+
+    start = time.perf_counter()
+    from models.polarity_scorer import PolarityScorer
+    scorer = PolarityScorer()
+    lexicon_load = time.perf_counter() - start
+    lexicon_scores, lexicon_timings = time_engine(scorer.score, messages)
+
+    print("⏱️  Latency per message:")
+    summarize("textblob", textblob_load, textblob_timings)
+    summarize("lexicon", lexicon_load, lexicon_timings)
+    speedup = sum(textblob_timings) / max(sum(lexicon_timings), 1e-12)
+    print(f"  Speedup: {speedup:.1f}x\n")
+
+    exact = sum(round(a, 2) == round(b, 2) for a, b in zip(textblob_scores, lexicon_scores))
+    labels = sum(label(a) == label(b) for a, b in zip(textblob_scores, lexicon_scores))
+    max_diff = max(abs(a - b) for a, b in zip(textblob_scores, lexicon_scores))
+    print("🎯 Agreement with TextBlob:")
+    print(f"  Score (2 dp): {exact / len(messages):.2%}")
+    print(f"  Label:        {labels / len(messages):.2%}")
+    print(f"  Max |diff|:   {max_diff:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+SOS dispatch throughput and tail latency against a fake Twilio.
+
+Starts benchmarks/fake_twilio.py in-process, points a real SOSService at
+it through TWILIO_API_BASE_URL (so alerts take the full network path:
+outbox, delivery workers, pooled HTTP client, retries) and fires
+concurrent emergencies from a pool of threads, each alerting its own set
+of contacts. Reports:
+
+    trigger     latency of trigger_sos() as seen by the API request
+    delivery    from trigger to the provider accepting each SMS (retries included)
+    alert       from trigger to the last contact of the alert being accepted
+    throughput  alerts triggered and fully delivered per second
+
+plus the provider's response mix and connection reuse. Undelivered SMS
+(attempts exhausted, or still pending at --timeout) are counted separately.
+
+Run from the api/ directory:
+    python benchmarks/sos_throughput.py --alerts 200 --concurrency 20 --contacts 3
+    python benchmarks/sos_throughput.py --latency lognormal:300:0.8 --error-rate 0.05 --throttle-rate 0.05
+    python benchmarks/sos_throughput.py --rate-limit 50 --workers 16 --dispatch inline --save sos.json
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+# Add the parent api directory to the path to import services
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.fake_twilio import FakeTwilioServer, add_fault_arguments
+from benchmarks.stats import latency_stats
+
+
+def build_service(server, args):
+    """SOSService with real credentials shapes, sending to the fake server."""
+    os.environ.update({
+        "TWILIO_ACCOUNT_SID": "AC" + "0" * 32,
+        "TWILIO_AUTH_TOKEN": "fake-auth-token",
+        "TWILIO_PHONE_NUMBER": "+15005550006",
+        "TWILIO_API_BASE_URL": server.url,
+        "SOS_OUTBOX_PATH": os.path.join(tempfile.mkdtemp(prefix="kiddoo-sos-bench-"), "outbox.db"),
+        "SOS_DISPATCH_MODE": args.dispatch,
+        "SOS_MAX_WORKERS": str(args.workers),
+        "SOS_MAX_ATTEMPTS": str(args.max_attempts),
+        "SOS_RETRY_BASE_SECONDS": str(args.retry_base),
+        "SOS_OUTBOX_POLL_SECONDS": str(min(1.0, args.retry_base))
+    })
+
+    import logging
+    logging.disable(logging.ERROR)
+    from services.sos_service import SOSService
+
+    service = SOSService()
+    service.warm_up()
+    return service
+
+
+def run(service, server, alerts, contacts, concurrency, rate, timeout):
+    phones = {}
+    plans = []
+    for i in range(alerts):
+        alert_contacts = []
+        for k in range(contacts):
+            phone = f"+1555{i:06d}{k}"
+            phones[phone] = i
+            alert_contacts.append({"name": f"Contact {k}", "phone": phone})
+        plans.append(alert_contacts)
+
+    started = [None] * alerts
+    triggers = []
+    errors = []
+    lock = threading.Lock()
+    schedule = itertools.count()
+    begin = time.monotonic()
+
+    def emergency():
+        while True:
+            with lock:
+                i = next(schedule)
+            if i >= alerts:
+                return
+            if rate:
+                delay = begin + i / rate - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            start = time.monotonic()
+            started[i] = start
+            result = service.trigger_sos(plans[i], {"lat": 40.7128, "lng": -74.0060},
+                                         {"uid": f"bench-user-{i}", "name": f"Bench User {i}"})
+            elapsed = time.monotonic() - start
+            with lock:
+                triggers.append(elapsed)
+                if not result.get("sos_triggered"):
+                    errors.append(result.get("error") or result.get("message"))
+
+    threads = [threading.Thread(target=emergency, name=f"emergency-{n}") for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    triggered_at = time.monotonic()
+
+    # Outbox mode delivers in the background; wait for every delivery to settle
+    deadline = triggered_at + timeout
+    while service.outbox.pending_count() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    settled_at = time.monotonic()
+
+    deliveries = []
+    delivered_to = defaultdict(set)
+    last_accepted = {}
+    for accepted_at, to, _ in list(server.accepted):
+        i = phones.get(to)
+        if i is None:
+            continue
+        deliveries.append(accepted_at - started[i])
+        delivered_to[i].add(to)
+        last_accepted[i] = max(last_accepted.get(i, 0), accepted_at)
+
+    completed = [last_accepted[i] - started[i] for i in range(alerts) if len(delivered_to[i]) == contacts]
+    finished_at = max(last_accepted.values(), default=settled_at)
+
+    return {
+        "alerts": alerts,
+        "contacts_per_alert": contacts,
+        "concurrency": concurrency,
+        "rate": rate,
+        "trigger_errors": len(errors),
+        "sms_expected": alerts * contacts,
+        "sms_delivered": len(deliveries),
+        "sms_undelivered": alerts * contacts - sum(len(to) for to in delivered_to.values()),
+        "pending_at_end": service.outbox.pending_count(),
+        "trigger_seconds": round(triggered_at - begin, 3),
+        "delivery_seconds": round(finished_at - begin, 3),
+        "triggered_alerts_per_second": round(alerts / max(triggered_at - begin, 1e-9), 1),
+        "delivered_alerts_per_second": round(len(completed) / max(finished_at - begin, 1e-9), 1),
+        "trigger": latency_stats(triggers),
+        "delivery": latency_stats(deliveries),
+        "alert": latency_stats(completed),
+        "provider": server.stats()["responses"],
+        "connections": service.http_client.metrics() if service.http_client else None
+    }
+
+
+def print_report(report):
+    print(f"\n🚨 {report['alerts']} alerts x {report['contacts_per_alert']} contacts, "
+          f"{report['concurrency']} concurrent emergencies"
+          + (f", {report['rate']:g}/s scheduled" if report["rate"] else ""))
+    print(f"  triggered  {report['triggered_alerts_per_second']:>8,.1f} alerts/s  ({report['trigger_seconds']}s)")
+    print(f"  delivered  {report['delivered_alerts_per_second']:>8,.1f} alerts/s  ({report['delivery_seconds']}s)")
+    print(f"  SMS        {report['sms_delivered']}/{report['sms_expected']} accepted, "
+          f"{report['sms_undelivered']} undelivered, {report['pending_at_end']} still pending")
+    print(f"\n  {'latency':<10} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name in ("trigger", "delivery", "alert"):
+        stats = report[name]
+        if stats["count"]:
+            print(f"  {name:<10} {stats['count']:>7} {stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} "
+                  f"{stats['p99_ms']:>9.1f} {stats['max_ms']:>9.1f}")
+    print(f"\n  provider responses: {report['provider']}")
+    if report["connections"]:
+        connections = report["connections"]
+        print(f"  connections: {connections['connections_opened']} opened for {connections['requests']} requests "
+              f"(reuse {connections['reuse_ratio']:.0%})")
+    if report["trigger_errors"]:
+        print(f"  ❌ {report['trigger_errors']} trigger(s) did not dispatch")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alerts", type=int, default=100, help="Emergencies to trigger")
+    parser.add_argument("--contacts", type=int, default=3, help="Contacts per emergency")
+    parser.add_argument("--concurrency", type=int, default=10, help="Emergencies triggered at once")
+    parser.add_argument("--rate", type=float, help="Trigger emergencies on a schedule (alerts/s) instead of back-to-back")
+    parser.add_argument("--dispatch", choices=("outbox", "inline"), default="outbox", help="SOS_DISPATCH_MODE")
+    parser.add_argument("--workers", type=int, default=8, help="SOS_MAX_WORKERS")
+    parser.add_argument("--max-attempts", type=int, default=5, help="SOS_MAX_ATTEMPTS")
+    parser.add_argument("--retry-base", type=float, default=0.25, help="SOS_RETRY_BASE_SECONDS")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Seconds to wait for pending deliveries")
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    try:
+        server = FakeTwilioServer(latency=args.latency, error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+                                  rate_limit=args.rate_limit, seed=args.seed).start()
+    except ValueError as e:
+        raise SystemExit(f"❌ {e}")
+    print(f"📡 Fake Twilio on {server.url}: latency {args.latency}, errors {args.error_rate:.0%}, "
+          f"429s {args.throttle_rate:.0%}, rate limit {args.rate_limit or 'none'}", file=sys.stderr)
+
+    try:
+        service = build_service(server, args)
+        report = run(service, server, args.alerts, args.contacts, args.concurrency, args.rate, args.timeout)
+    finally:
+        server.stop()
+    print_report(report)
+
+    if args.save:
+        report["meta"] = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "latency": args.latency,
+            "error_rate": args.error_rate,
+            "throttle_rate": args.throttle_rate,
+            "rate_limit": args.rate_limit,
+            "dispatch": args.dispatch,
+            "workers": args.workers,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S")
+        }
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Saved results to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
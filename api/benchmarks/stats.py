@@ -0,0 +1,24 @@
+"""
+Latency summaries shared by the benchmarks.
+"""
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def latency_stats(seconds):
+    """Count, p50/p95/p99, max and mean in milliseconds for a list of durations in seconds."""
+    values = sorted(value * 1000 for value in seconds)
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 0.50), 2),
+        "p95_ms": round(percentile(values, 0.95), 2),
+        "p99_ms": round(percentile(values, 0.99), 2),
+        "max_ms": round(values[-1], 2),
+        "mean_ms": round(sum(values) / len(values), 2)
+    }
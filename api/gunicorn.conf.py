@@ -0,0 +1,69 @@
+"""
+Production entry point: pre-fork Gunicorn serving index:app.
+
+    cd api && gunicorn index:app
+
+Gunicorn picks this file up from the working directory. The app is
+imported once in the master (preload_app), so the lexicon index, TextBlob
+corpora, NumPy and the pre-rendered agent payloads are loaded a single
+time and shared with every worker through copy-on-write. The garbage
+collector is kept off in the master and everything loaded is frozen
+before forking, so collections in the workers never touch (and copy)
+those shared pages.
+
+Environment:
+    PORT               listen port (default 5000)
+    WEB_CONCURRENCY    worker processes (default: one per CPU)
+    GUNICORN_THREADS   threads per worker (default 4)
+    GUNICORN_PRELOAD   set to "false" to import the app in each worker instead
+    SESSION_STORE      defaults to "sqlite" here, so every worker sees the same sessions
+"""
+import gc
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() in ("1", "true", "yes")
+timeout = 30
+
+# Outbox threads and provider sockets belong to workers; the master starts none
+os.environ["SOS_START_WORKERS"] = "false"
+# A per-process memory store would let each worker trust its own stale view of a session
+os.environ.setdefault("SESSION_STORE", "sqlite")
+
+if preload_app:
+    # Objects created while loading must not be collected into new pages before the fork
+    gc.disable()
+
+
+def when_ready(server):
+    """Runs in the master after the app is loaded and before any worker is forked."""
+    if not preload_app:
+        return
+    import index
+
+    index.warm_up()
+    # Move everything loaded so far out of the collector's reach; workers inherit the frozen set
+    gc.freeze()
+    server.log.info(f"🧊 Froze {gc.get_freeze_count()} objects before forking {workers} workers")
+
+
+def post_fork(server, worker):
+    """Runs in each worker right after the fork."""
+    gc.enable()
+    if preload_app:
+        import index
+
+        index.after_fork()
+
+
+def post_worker_init(worker):
+    """Runs in each worker once the app is loaded (per worker when preload is off)."""
+    if not preload_app:
+        import index
+
+        index.warm_up()
+        index.after_fork()
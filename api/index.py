@@ -1,7 +1,12 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-from services.analysis_service import AnalysisService
-from services.sos_service import SOSService
+from services.analysis_service import AnalysisService, normalize_mode
+from services.sos_service import get_sos_service
+from utils.constants import MAX_BATCH_SIZE, MAX_STREAM_CHARS, MAX_ANALYZE_BODY_BYTES, MOMENTUM_WINDOW
+from utils.json_stream import BodyTooLarge, read_json_object
+from utils.metrics import REGISTRY
+from utils.serialization import dumps
+import json
 import logging
 import os
 
@@ -12,39 +17,134 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app)
 
+# /api/analyze reads only these fields, and only the last MOMENTUM_WINDOW states of history
+ANALYZE_FIELDS = ('message', 'mode', 'emergency_contacts', 'user_info', 'session_id')
+ANALYZE_TAILS = {'history': (MOMENTUM_WINDOW, ('classified_state',))}
+MAX_ANALYZE_BODY = int(os.getenv("MAX_ANALYZE_BODY_BYTES", MAX_ANALYZE_BODY_BYTES))
+
 # Initialize services
+# One SOS dispatcher per process, shared by the SOS endpoints and autonomous alerts
 try:
-    analysis_service = AnalysisService()
+    sos_service = get_sos_service()
+    logger.info("✅ SOS service initialized")
+except Exception as e:
+    logger.error(f"❌ Failed to initialize SOS service: {e}")
+    sos_service = None
+
+try:
+    analysis_service = AnalysisService(sos_service=sos_service)
     logger.info("✅ Analysis service initialized")
 except Exception as e:
     logger.error(f"❌ Failed to initialize Analysis service: {e}")
     analysis_service = None
 
-try:
-    sos_service = SOSService()
-    logger.info("✅ SOS service initialized")
-except Exception as e:
-    logger.error(f"❌ Failed to initialize SOS service: {e}")
-    sos_service = None
+def json_response(payload, status=200):
+    """
+    JSON response encoded by utils.serialization, which splices in the
+    pre-encoded agent and precaution payloads instead of re-encoding them.
+    """
+    return Response(dumps(payload), status=status, mimetype='application/json')
 
 @app.route('/api/analyze', methods=['POST'])
 def analyze():
     if not analysis_service:
         return jsonify({"error": "Analysis service failed to initialize. Check logs."}), 500
     
+    # Parsed incrementally: a long client-side history is scanned, never held in memory
+    if request.content_length is not None and request.content_length > MAX_ANALYZE_BODY:
+        return jsonify({"error": f"Request body too large: at most {MAX_ANALYZE_BODY} bytes"}), 413
+    try:
+        data = read_json_object(request.stream, ANALYZE_FIELDS, MAX_ANALYZE_BODY, ANALYZE_TAILS)
+    except BodyTooLarge:
+        return jsonify({"error": f"Request body too large: at most {MAX_ANALYZE_BODY} bytes"}), 413
+    except ValueError as e:
+        return jsonify({"error": f"Invalid JSON in request body: {e}"}), 400
+
     try:
-        data = request.get_json()
         message = data.get('message', '')
-        mode = data.get('mode', 'user')
+        mode = normalize_mode(data.get('mode', 'user'))
         history = data.get('history', [])
         emergency_contacts = data.get('emergency_contacts', [])
+        user_info = data.get('user_info')  # Optional; lets repeated Critical alerts coalesce per user
+        session_id = data.get('session_id')  # Optional; trend then comes from the server-side session
         
-        result = analysis_service.perform_full_analysis(message, mode, history, emergency_contacts)
-        return jsonify(result), 200
+        result = analysis_service.perform_full_analysis(message, mode, history, emergency_contacts, user_info, session_id)
+        return json_response(result)
     except Exception as e:
         logger.error(f"Analysis error: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/analyze/batch', methods=['POST'])
+def analyze_batch():
+    """
+    Batch analysis endpoint for re-scoring backlogs.
+    Expected body:
+    {
+        "messages": ["...", ...],
+        "mode": "user" | "review",
+        "history": [...]            # Optional, shared by every message
+    }
+    SOS alerts are never dispatched from this endpoint.
+    """
+    if not analysis_service:
+        return jsonify({"error": "Analysis service failed to initialize. Check logs."}), 500
+
+    try:
+        data = request.get_json(force=True, silent=True) or {}
+        messages = data.get('messages')
+        mode = normalize_mode(data.get('mode', 'user'))
+        history = data.get('history', [])
+
+        if not isinstance(messages, list) or not all(isinstance(m, str) for m in messages):
+            return jsonify({"error": "'messages' must be a list of strings"}), 400
+        if len(messages) > MAX_BATCH_SIZE:
+            return jsonify({"error": f"Batch too large: at most {MAX_BATCH_SIZE} messages per request"}), 400
+
+        results = analysis_service.analyze_many(messages, mode, history)
+        return json_response({"results": results, "count": len(results)})
+    except Exception as e:
+        logger.error(f"Batch analysis error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/analyze/stream', methods=['POST'])
+def analyze_stream():
+    """
+    Live risk feedback while the user types, as NDJSON in both directions.
+    Request body: one JSON object per line, sent as the user types:
+        {"delta": "text typed since the previous line"}
+    Response: one JSON object per line, written only when the classified
+    state or intensity changes, plus a final line with "final": true once
+    the request body ends. A Critical phrase is reported ("critical": true)
+    once the word completing it is finished: on the delta that adds a word
+    boundary after it, or on the final line. No SOS is dispatched from this endpoint.
+    """
+    if not analysis_service:
+        return jsonify({"error": "Analysis service failed to initialize. Check logs."}), 500
+
+    stream = analysis_service.open_stream(max_chars=MAX_STREAM_CHARS)
+
+    def generate():
+        try:
+            for line in request.stream:
+                line = line.strip()
+                if not line:
+                    continue
+                delta = json.loads(line).get('delta', '')
+                if not isinstance(delta, str):
+                    raise ValueError("'delta' must be a string")
+                update = stream.feed(delta)
+                if update is not None:
+                    yield json.dumps(update) + "\n"
+            yield json.dumps(stream.close()) + "\n"
+        except (ValueError, AttributeError) as e:
+            # Malformed line or oversized stream: report and end the response
+            yield json.dumps({"error": str(e), "final": True}) + "\n"
+        except Exception as e:
+            logger.error(f"Stream analysis error: {e}")
+            yield json.dumps({"error": str(e), "final": True}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @app.route('/api/sos/trigger', methods=['POST'])
 def trigger_sos():
     if not sos_service:
@@ -57,8 +157,11 @@ def trigger_sos():
     {
         "emergency_contacts": [{"name": "", "phone": ""}, ...],
         "user_location": {"lat": float, "lng": float} or {"address": ""},
-        "user_info": {"name": "", "uid": ""}
+        "user_info": {"name": "", "uid": ""},
+        "idempotency_key": ""           # Optional; the Idempotency-Key header also works
     }
+    Retries with the same key, and repeat triggers for the same uid inside the
+    suppression window, return the existing alert with "deduplicated": true.
     """
     try:
         # Log the incoming request
@@ -74,15 +177,100 @@ def trigger_sos():
         emergency_contacts = data.get('emergency_contacts', [])
         user_location = data.get('user_location')  # Optional
         user_info = data.get('user_info')          # Optional
+        idempotency_key = request.headers.get('Idempotency-Key') or data.get('idempotency_key')
         
         logger.info(f"Processing SOS with {len(emergency_contacts)} contacts")
         
-        result = sos_service.trigger_sos(emergency_contacts, user_location, user_info)
+        result = sos_service.trigger_sos(emergency_contacts, user_location, user_info, idempotency_key)
         return jsonify(result), 200
     except Exception as e:
         logger.error(f"SOS trigger error: {e}", exc_info=True)
         return jsonify({"error": f"Internal server error: {str(e)}"}), 500
 
+@app.route('/api/sos/status/<alert_id>', methods=['GET'])
+def sos_status(alert_id):
+    """
+    Per-contact delivery state for an alert returned by /api/sos/trigger.
+    """
+    if not sos_service:
+        return jsonify({"error": "SOS service failed to initialize. Check logs."}), 500
+
+    try:
+        status = sos_service.get_alert_status(alert_id)
+        if status is None:
+            return jsonify({"error": f"Unknown alert id: {alert_id}"}), 404
+        return jsonify(status), 200
+    except Exception as e:
+        logger.error(f"SOS status error: {e}", exc_info=True)
+        return jsonify({"error": f"Internal server error: {str(e)}"}), 500
+
+def collect_service_metrics():
+    """
+    Scrape-time values that the services already track: cache counters,
+    session count, outbox backlog, Twilio connection reuse and breaker state.
+    """
+    families = []
+    if analysis_service:
+        caches = analysis_service.cache_stats()
+        for field, metric_type, help_text in (
+            ("hits", "counter", "Cache lookups that found an entry."),
+            ("misses", "counter", "Cache lookups that found nothing."),
+            ("evictions", "counter", "Entries evicted to stay within the cache limits."),
+            ("entries", "gauge", "Entries currently cached.")
+        ):
+            name = f"kiddoo_cache_{field}_total" if metric_type == "counter" else f"kiddoo_cache_{field}"
+            samples = [({"cache": cache}, stats[field]) for cache, stats in caches.items() if stats]
+            families.append((name, metric_type, help_text, samples))
+
+        lexicon = analysis_service.lexicon_stats()
+        families.append(("kiddoo_lexicon_info", "gauge", "Active lexicon version (always 1).",
+                         [({"version": lexicon["version"]}, 1)]))
+
+        sessions = analysis_service.session_stats()
+        if sessions:
+            families.append(("kiddoo_sessions", "gauge", "Sessions held by the session store.",
+                             [({"backend": sessions["backend"]}, sessions["sessions"])]))
+
+    if sos_service:
+        sos = sos_service.metrics()
+        families.append(("kiddoo_sos_pending_deliveries", "gauge", "Outbox deliveries not yet sent or failed.",
+                         [({}, sos["pending_deliveries"])]))
+        if sos["http"]:
+            families.append(("kiddoo_twilio_http_requests_total", "counter", "HTTP requests made to Twilio.",
+                             [({}, sos["http"]["requests"])]))
+            families.append(("kiddoo_twilio_http_connections_total", "counter", "TCP/TLS connections opened to Twilio.",
+                             [({}, sos["http"]["connections_opened"])]))
+        families.append(("kiddoo_sms_breaker_state", "gauge", "SMS provider circuit breaker state (1 for the current one).",
+                         [({"state": state}, int(sos["breaker"]["state"] == state)) for state in ("closed", "open", "half_open")]))
+    return families
+
+REGISTRY.register_collector(collect_service_metrics)
+
+def warm_up():
+    """
+    Loads every lazily imported resource in this process.
+    Called by gunicorn.conf.py in the master before workers are forked.
+    """
+    if analysis_service:
+        analysis_service.warm_up()
+        logger.info("🔥 Analysis pipeline warmed up")
+
+def after_fork():
+    """
+    Per-worker setup after a fork: fresh metrics, SMS threads and connections.
+    """
+    REGISTRY.reset()
+    if sos_service:
+        sos_service.after_fork()
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """
+    Prometheus text exposition of this process's counters and latency histograms.
+    Under multi-worker servers each worker reports its own series.
+    """
+    return Response(REGISTRY.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     services_status = {
@@ -90,9 +278,15 @@ def health_check():
         "sos_service": sos_service is not None,
         "twilio_configured": sos_service.client is not None if sos_service else False
     }
+    # Still serving, but SOS alerts are only queued while the SMS provider's circuit is not closed
+    degraded = sos_service.provider_degraded() if sos_service else False
     return jsonify({
-        "status": "healthy",
-        "services": services_status
+        "status": "degraded" if degraded else "healthy",
+        "services": services_status,
+        "caches": analysis_service.cache_stats() if analysis_service else None,
+        "sessions": analysis_service.session_stats() if analysis_service else None,
+        "lexicon": analysis_service.lexicon_stats() if analysis_service else None,
+        "sos": sos_service.metrics() if sos_service else None
     }), 200
 
 if __name__ == '__main__':
@@ -0,0 +1,198 @@
+import importlib.util
+import os
+import re
+from array import array
+from xml.etree import ElementTree
+
+# Mirrors the pattern/TextBlob sentiment rules so scores stay comparable
+NEGATIONS = frozenset(("no", "not", "n't", "never"))
+PUNCTUATION = ".,;:!?()[]{}`''\"@#$^&*+-|=~_"
+LEADING_PUNCTUATION = PUNCTUATION.replace(".", "")
+
+EMOTICONS = {
+    1.00: ("<3", "♥", ">:D", ":-D", ":D", "=-D", "=D", "X-D", "x-D", "XD", "xD", "8-D"),
+    0.75: (">:P", ":-P", ":P", ":-p", ":p", ":-b", ":b", ":c)", ":o)", ":^)"),
+    0.50: (">:)", ":-)", ":)", "=)", "=]", ":]", ":}", ":>", ":3", "8)", "8-)"),
+    0.25: (">;]", ";-)", ";)", ";-]", ";]", ";D", ";^)", "*-)", "*)"),
+    0.05: (">:o", ":-O", ":O", ":o", ":-o", "o_O", "o.O", "°O°", "°o°"),
+    -0.25: (">:/", ":-/", ":/", ":\\", ">:\\", ":-.", ":-s", ":s", ":S", ":-S", ">.>"),
+    -0.75: (">:[", ":-(", ":(", "=(", ":-[", ":[", ":{", ":-<", ":c", ":-c", "=/"),
+    -1.00: (":'(", ":'''(", ";'("),
+}
+EMOTICON_POLARITY = {e.lower(): p for p, faces in EMOTICONS.items() for e in faces}
+
+# "(!)" marks irony: a neutral but subjective assessment, as in pattern
+SARCASM = "(!)"
+SARCASM_MARK = re.compile(r"\(\s*!\s*\)")
+
+# Quotes become standalone tokens, as in pattern's tokenizer
+QUOTE_SPLIT = str.maketrans({q: f" {q} " for q in "'\"“”‘’"})
+CONTRACTION = re.compile(r"n't|'(?:d|m|s|ll|re|ve)")
+
+
+def default_lexicon_path():
+    """
+    Location of the polarity lexicon shipped with TextBlob, found without importing it.
+    """
+    spec = importlib.util.find_spec("textblob")
+    if spec is None or not spec.submodule_search_locations:
+        raise RuntimeError("TextBlob is not installed; set POLARITY_LEXICON_PATH to an en-sentiment.xml file")
+    return os.path.join(list(spec.submodule_search_locations)[0], "en", "en-sentiment.xml")
+
+
+def tokenize(text):
+    """
+    Lightweight stand-in for pattern's find_tokens: lowercases, splits quotes and
+    leading/trailing punctuation into their own tokens and keeps emoticons and
+    the "(!)" irony mark whole.
+    """
+    tokens = []
+    text = CONTRACTION.sub(lambda m: " " + m.group(), text.lower())
+    text = SARCASM_MARK.sub(f" {SARCASM} ", text)
+    for chunk in text.split():
+        if chunk in EMOTICON_POLARITY or chunk == SARCASM:
+            tokens.append(chunk)
+            continue
+
+        for part in chunk.translate(QUOTE_SPLIT).split():
+            if part in EMOTICON_POLARITY:
+                tokens.append(part)
+                continue
+
+            start, end = 0, len(part)
+            while start < end and part[start] in LEADING_PUNCTUATION:
+                tokens.append(part[start])
+                start += 1
+
+            tail = []
+            while end > start and part[end - 1] in PUNCTUATION:
+                if part.endswith("...", start, end):
+                    tail.append("...")
+                    end -= 3
+                else:
+                    tail.append(part[end - 1])
+                    end -= 1
+
+            if end > start:
+                tokens.append(part[start:end])
+            tokens.extend(reversed(tail))
+    return tokens
+
+
+class PolarityScorer:
+    """
+    Single-pass polarity scorer over the pattern sentiment lexicon.
+
+    The lexicon is loaded once into flat arrays indexed by word, and each
+    message is scored with the same modifier ("very good"), negation
+    ("not good"), exclamation and irony ("(!)") rules TextBlob applies,
+    without building a TextBlob or running its parser.
+    """
+
+    def __init__(self, lexicon_path=None):
+        lexicon_path = lexicon_path or os.getenv("POLARITY_LEXICON_PATH") or default_lexicon_path()
+
+        self._index = {}
+        self._polarity = array('d')
+        self._intensity = array('d')
+        self._modifier = bytearray()
+
+        for word, polarity, intensity, is_modifier in self._load(lexicon_path):
+            self._index[word] = len(self._polarity)
+            self._polarity.append(polarity)
+            self._intensity.append(intensity)
+            self._modifier.append(1 if is_modifier else 0)
+
+    def _load(self, path):
+        """
+        Reads the XML lexicon and averages every sense of a word, then derives
+        "-ly" adverbs from adjectives the way TextBlob's English loader does.
+        """
+        senses = {}
+        for element in ElementTree.parse(path).getroot().iter("word"):
+            form = element.attrib.get("form")
+            if not form:
+                continue
+            scores = (float(element.attrib.get("polarity", 0.0)), float(element.attrib.get("intensity", 1.0)))
+            senses.setdefault(form, {}).setdefault(element.attrib.get("pos"), []).append(scores)
+
+        words = {}
+        for form, by_pos in senses.items():
+            averaged = {pos: _average(scores) for pos, scores in by_pos.items()}
+            words[form] = (averaged, _average(list(averaged.values())))
+
+        for form, (by_pos, _) in list(words.items()):
+            if "JJ" not in by_pos:
+                continue
+            stem = form[:-1] + "i" if form.endswith("y") else form
+            stem = stem[:-2] if stem.endswith("le") else stem
+            adverb = stem + "ly"
+            existing = words.get(adverb, ({}, None))[0]
+            existing["RB"] = by_pos["JJ"]
+            words[adverb] = (existing, by_pos["JJ"])
+
+        for form, (by_pos, (polarity, intensity)) in words.items():
+            yield form, polarity, intensity, "RB" in by_pos
+
+    def score(self, text):
+        """
+        Returns the average polarity (-1.0 to 1.0) of the sentiment-bearing words in text.
+        """
+        index = self._index
+        assessments = []  # [polarity, intensity, negated]
+        modifier = None
+        negation = None
+
+        for word in tokenize(text):
+            position = index.get(word)
+            if position is not None:
+                polarity = self._polarity[position]
+                intensity = self._intensity[position]
+
+                if modifier is None:
+                    assessments.append([polarity, intensity, False])
+                else:
+                    # "really good": the modifier scales the next known word
+                    previous = assessments[-1]
+                    previous[0] = max(-1.0, min(polarity * previous[1], 1.0))
+                    previous[1] = intensity
+
+                if negation is not None:
+                    previous = assessments[-1]
+                    previous[1] = 1.0 / previous[1]
+                    previous[2] = True
+
+                modifier = word if self._modifier[position] else None
+                negation = word if word in NEGATIONS else None
+                continue
+
+            if word in NEGATIONS:
+                negation = word
+            elif negation and len(word.strip("'")) > 1:
+                negation = None
+
+            # "really not good": negation following a modifier applies to the modifier's chunk
+            if negation is not None and modifier is not None and modifier.endswith("ly"):
+                assessments[-1][2] = True
+                negation = None
+            elif modifier and len(word) > 2:
+                modifier = None
+
+            if word == "!" and assessments:
+                assessments[-1][0] = max(-1.0, min(assessments[-1][0] * 1.25, 1.0))
+
+            # Irony counts as a neutral assessment, pulling the average towards 0
+            if word == SARCASM:
+                assessments.append([0.0, 1.0, False])
+
+            emoticon = EMOTICON_POLARITY.get(word)
+            if emoticon is not None:
+                assessments.append([emoticon, 1.0, False])
+
+        if not assessments:
+            return 0.0
+        return sum(p * -0.5 if negated else p for p, _, negated in assessments) / len(assessments)
+
+
+def _average(values):
+    return tuple(sum(column) / len(values) for column in zip(*values))
@@ -1,45 +1,84 @@
-from textblob import TextBlob
 import os
-import json
+from nlp.keyword_extractor import KeywordExtractor
+from nlp.lexicon_matcher import LexiconMatcher
+from utils.cache import MISSING, build_cache, normalize_message
+from models.polarity_scorer import PolarityScorer
+
+# Even if the phrase isn't in the lexicon, these words in any non-positive context are critical
+DANGER_PHRASES = ['suicide', 'kill myself', 'killing myself', 'end my life', 'want to die', 'going to die', 'end it all', 'die', 'kill']
+
+# Polarity engines selectable per deployment through SENTIMENT_ENGINE
+SENTIMENT_ENGINES = ("textblob", "lexicon")
 
 class SentimentAnalyzer:
-    def __init__(self):
-        # Load critical lexicon for sentiment overrides
-        lex_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'lexicon.json')
-        with open(lex_path, 'r') as f:
-            lex = json.load(f)
-            self.critical_phrases = lex.get("Critical Distress", [])
-            self.depression_phrases = lex.get("Depression", [])
-
-    def analyze(self, text):
+    def __init__(self, keyword_extractor=None, engine=None):
+        # Share the compiled lexicon with the keyword extractor for the critical/depression overrides
+        self.keyword_extractor = keyword_extractor or KeywordExtractor()
+        self.danger_matcher = LexiconMatcher({"Danger": DANGER_PHRASES})
+
+        self.engine = (engine or os.getenv("SENTIMENT_ENGINE", "textblob")).lower()
+        if self.engine not in SENTIMENT_ENGINES:
+            raise ValueError(f"Unknown sentiment engine '{self.engine}'. Expected one of {SENTIMENT_ENGINES}")
+
+        # TextBlob (and the nltk it pulls in) is imported on the first polarity call to keep cold starts light
+        self._textblob = None
+        if self.engine == "lexicon":
+            self.polarity_scorer = PolarityScorer()
+
+        # Repeated short messages skip the polarity pass entirely
+        self.cache = build_cache("SENTIMENT", max_entries=4096, max_bytes=1024 * 1024)
+
+    def analyze(self, text, context=None, use_cache=True):
         """
         Calculates sentiment with a critical phrase and keyword override.
+        Uses the precomputed lexicon matches from `context` when given.
+        Results are memoized on the normalized message unless `use_cache` is False
+        (e.g. for the partial texts of a live stream, which would only crowd the cache).
         """
-        lower_text = text.lower()
+        if self.cache is None or not use_cache:
+            return self._analyze(text, context)
+
+        # Lexicon overrides decide some results, so entries are per lexicon version
+        version = context.lexicon_version if context is not None else self.keyword_extractor.registry.version
+        key = (normalize_message(text), version)
+        cached = self.cache.get(key)
+        if cached is not MISSING:
+            return dict(cached)
+
+        result = self._analyze(text, context)
+        self.cache.set(key, result)
+        return dict(result)
+
+    def polarity(self, text):
+        """
+        Raw polarity (-1.0 to 1.0) from the configured engine.
+        """
+        if self.engine == "lexicon":
+            return self.polarity_scorer.score(text)
+        if self._textblob is None:
+            from textblob import TextBlob
+            self._textblob = TextBlob
+        return self._textblob(text).sentiment.polarity
+
+    def _analyze(self, text, context):
+        if context is None:
+            context = self.keyword_extractor.build_context(text)
         
-        # 1. Broad Critical Keyword Sweep (Highest Priority)
-        # Even if the phrase isn't exact, these words in any non-positive context are critical
-        danger_words = ['suicide', 'kill myself', 'killing myself', 'end my life', 'want to die', 'going to die', 'end it all']
-        if any(dw in lower_text for dw in danger_words):
+        # 1. Critical Phrase Lexicon Override (Highest Priority)
+        if context.category_counts.get("Critical Distress", 0) > 0:
             return {"score": -1.0, "label": "Critical"}
 
-        # Standalone 'die' or 'kill' check
-        if ' die ' in f' {lower_text} ' or ' kill ' in f' {lower_text} ':
-             return {"score": -1.0, "label": "Critical"}
-            
-        # 2. Critical Phrase Lexicon Override
-        if any(phrase in lower_text for phrase in self.critical_phrases):
+        # 2. Broad Critical Keyword Sweep
+        if self.danger_matcher.match(context.cleaned_text)["keywords"]:
             return {"score": -1.0, "label": "Critical"}
             
         # 3. Depression/Severe Negative Override
-        if any(phrase in lower_text for phrase in self.depression_phrases):
-            analysis = TextBlob(text)
-            score = min(analysis.sentiment.polarity, -0.6)
+        if context.category_counts.get("Depression", 0) > 0:
+            score = min(self.polarity(text), -0.6)
             return {"score": round(score, 2), "label": "Negative"}
 
-        # 3. Standard TextBlob fallback
-        analysis = TextBlob(text)
-        score = analysis.sentiment.polarity
+        # 4. Standard polarity fallback
+        score = self.polarity(text)
         
         if score > 0.1:
             label = "Positive"
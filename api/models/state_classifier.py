@@ -1,20 +1,26 @@
 from utils.constants import NORMAL, ANXIETY, STRESS, DEPRESSION, CRITICAL
 
+# numpy is imported inside the batch methods so single-message requests never load it
+
+# Column order of the batch score matrix; matches the key order of get_probabilities
+STATE_ORDER = (NORMAL, ANXIETY, STRESS, DEPRESSION, CRITICAL)
+
 class StateClassifier:
-    def __init__(self, keyword_extractor):
+    def __init__(self, keyword_extractor=None):
         self.keyword_extractor = keyword_extractor
 
-    def get_detailed_classification(self, text, sentiment_score):
+    def get_detailed_classification(self, context):
         """
         Returns detailed classification data for explainability.
+        Expects an AnalysisContext with sentiment already filled in.
         """
-        category_matches = self.keyword_extractor.get_category_matches(text)
+        category_matches = context.category_matches
         
         # Determine classified state
-        final_state = self.classify(text, sentiment_score)
+        final_state = self.classify(context)
         
         # Calculate probabilities
-        probabilities = self.get_probabilities(text, sentiment_score)
+        probabilities = self.get_probabilities(context)
         
         return {
             "classified_state": final_state,
@@ -22,12 +28,13 @@ class StateClassifier:
             "category_matches": category_matches
         }
 
-    def classify(self, text, sentiment_score):
+    def classify(self, context):
         """
         Rule-based classification prioritizing Critical Distress, 
         then using keyword counts and sentiment.
         """
-        category_matches = self.keyword_extractor.get_category_matches(text)
+        category_matches = context.category_matches
+        sentiment_score = context.sentiment_score
         
         # 1. Check for Critical Distress (High Priority)
         if category_matches.get("Critical Distress", 0) > 0:
@@ -51,12 +58,13 @@ class StateClassifier:
             
         return NORMAL
 
-    def get_probabilities(self, text, sentiment_score):
+    def get_probabilities(self, context):
         """
         Calculates normalized confidence across all states.
         Sums to exactly 100%.
         """
-        category_matches = self.keyword_extractor.get_category_matches(text)
+        category_matches = context.category_matches
+        sentiment_score = context.sentiment_score
         
         # Base scores
         scores = {
@@ -107,3 +115,109 @@ class StateClassifier:
                 scores[max_state] += diff
                 
         return scores
+
+    def get_detailed_classification_batch(self, contexts):
+        """
+        Batch form of get_detailed_classification for a list of contexts.
+        """
+        states = self.classify_batch(contexts)
+        probabilities = self.get_probabilities_batch(contexts)
+        return [
+            {
+                "classified_state": state,
+                "probabilities": probs,
+                "category_matches": context.category_matches
+            }
+            for context, state, probs in zip(contexts, states, probabilities)
+        ]
+
+    def _batch_arrays(self, contexts):
+        import numpy as np
+
+        sentiment = np.array([context.sentiment_score for context in contexts], dtype=float)
+        counts = {
+            category: np.array([context.category_matches.get(category, 0) for context in contexts], dtype=np.int64)
+            for category in (ANXIETY, STRESS, DEPRESSION, CRITICAL)
+        }
+        return sentiment, counts
+
+    def classify_batch(self, contexts):
+        """
+        Vectorized classify over a list of contexts, applying the same rules in the same priority.
+        """
+        import numpy as np
+
+        if not contexts:
+            return []
+
+        sentiment, counts = self._batch_arrays(contexts)
+        anxiety, stress, depression, critical = counts[ANXIETY], counts[STRESS], counts[DEPRESSION], counts[CRITICAL]
+
+        conditions = [
+            critical > 0,
+            (depression > 1) | ((depression > 0) & (sentiment < -0.4)),
+            (anxiety > 1) | ((anxiety > 0) & (sentiment < -0.2)),
+            stress > 0,
+            sentiment < -0.3
+        ]
+        choices = [
+            STATE_ORDER.index(CRITICAL),
+            STATE_ORDER.index(DEPRESSION),
+            STATE_ORDER.index(ANXIETY),
+            STATE_ORDER.index(STRESS),
+            STATE_ORDER.index(STRESS)
+        ]
+        selected = np.select(conditions, choices, default=STATE_ORDER.index(NORMAL))
+        return [STATE_ORDER[i] for i in selected.tolist()]
+
+    def get_probabilities_batch(self, contexts):
+        """
+        Vectorized get_probabilities over a list of contexts.
+        Each row is normalized to exactly 100 with the same rounding as the scalar path.
+        """
+        import numpy as np
+
+        if not contexts:
+            return []
+
+        sentiment, counts = self._batch_arrays(contexts)
+        critical = counts[CRITICAL]
+
+        # Base scores, one row per message in STATE_ORDER
+        scores = np.tile(np.array([10, 5, 5, 5, 0], dtype=np.int64), (len(contexts), 1))
+
+        multiplier = 10
+        scores[:, 1] += counts[ANXIETY] * multiplier
+        scores[:, 2] += counts[STRESS] * multiplier
+        scores[:, 3] += counts[DEPRESSION] * multiplier
+        scores[:, 4] += critical * 50
+
+        very_negative = sentiment < -0.5
+        negative = ~very_negative & (sentiment < -0.2)
+        positive = ~very_negative & ~negative & (sentiment > 0.2)
+        scores[:, 3] += very_negative * 20
+        scores[:, 4] += very_negative * 5
+        scores[:, 2] += negative * 15
+        scores[:, 1] += negative * 15
+        scores[:, 0] += positive * 30
+
+        totals = scores.sum(axis=1)
+        safe_totals = np.where(totals == 0, 1, totals)
+        normalized = np.rint((scores / safe_totals[:, None]) * 100).astype(np.int64)
+
+        # Feed the rounding remainder to the most likely state of each row
+        diff = 100 - normalized.sum(axis=1)
+        rows = np.arange(len(contexts))
+        normalized[rows, normalized.argmax(axis=1)] += diff
+
+        # Rows with no score at all fall back to Normal
+        empty = totals == 0
+        normalized[empty] = 0
+        normalized[empty, 0] = 100
+
+        # Critical keywords force full confidence in Critical Distress
+        forced = critical > 0
+        normalized[forced] = 0
+        normalized[forced, 4] = 100
+
+        return [dict(zip(STATE_ORDER, row)) for row in normalized.tolist()]
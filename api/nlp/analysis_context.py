@@ -0,0 +1,39 @@
+class AnalysisContext:
+    """
+    Per-message analysis state computed once and shared by every pipeline stage.
+
+    The text is cleaned, tokenized and swept against the lexicon exactly once
+    when the context is built; the sentiment stage then fills in `sentiment`,
+    and the classifier, scorer and agent read from here instead of
+    re-processing the raw message.
+    """
+
+    def __init__(self, text, cleaned_text, tokens, lexicon_match, category_matches, lexicon_version=None):
+        self.text = text
+        self.cleaned_text = cleaned_text
+        self.tokens = tokens
+
+        # Raw (unweighted) counts, matched phrases and spans from the lexicon pass
+        self.category_counts = lexicon_match["category_counts"]
+        self.keywords = lexicon_match["keywords"]
+        self.spans = lexicon_match["spans"]
+
+        # Counts with Critical Distress weighting applied, as used for scoring
+        self.category_matches = category_matches
+
+        # Version of the compiled lexicon the matches came from
+        self.lexicon_version = lexicon_version
+
+        self.sentiment = None
+
+    @property
+    def sentiment_score(self):
+        return self.sentiment["score"] if self.sentiment else 0.0
+
+    @property
+    def total_match_weight(self):
+        return sum(self.category_matches.values())
+
+    @property
+    def has_keywords(self):
+        return any(count > 0 for count in self.category_matches.values())
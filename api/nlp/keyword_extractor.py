@@ -1,45 +1,66 @@
 import json
-import os
 from nlp.preprocessing import clean_text
+from nlp.lexicon_registry import LexiconRegistry, get_lexicon_registry
+from nlp.analysis_context import AnalysisContext
 
 class KeywordExtractor:
-    def __init__(self, lexicon_path=None):
-        if lexicon_path is None:
-            lexicon_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'lexicon.json')
-        
-        with open(lexicon_path, 'r') as f:
-            self.lexicon = json.load(f)
+    def __init__(self, lexicon_path=None, registry=None):
+        # Compiled once (or loaded prebuilt) so each message is matched in a single pass.
+        # The default lexicon is shared process-wide and hot-reloaded on change.
+        if registry is None:
+            registry = get_lexicon_registry() if lexicon_path is None else LexiconRegistry(lexicon_path)
+        self.registry = registry
+        self.lexicon_path = registry.lexicon_path
+
+    @property
+    def matcher(self):
+        """The active compiled matcher."""
+        return self.registry.active.matcher
+
+    @property
+    def lexicon(self):
+        """The raw lexicon, read on demand; matching only needs the compiled matcher."""
+        with open(self.lexicon_path, 'r') as f:
+            return json.load(f)
+
+    def match(self, text):
+        """
+        Runs the compiled lexicon over the text and returns category counts,
+        matched keywords and word-boundary spans together.
+        """
+        return self.matcher.match(clean_text(text))
+
+    def build_context(self, text):
+        """
+        Cleans, tokenizes and matches the text once, returning an AnalysisContext
+        that the rest of the pipeline consumes.
+        """
+        lexicon = self.registry.active
+        cleaned = clean_text(text)
+        lexicon_match = lexicon.matcher.match(cleaned)
+        category_matches = self.weight_category_counts(lexicon_match["category_counts"])
+        return AnalysisContext(text, cleaned, cleaned.split(), lexicon_match, category_matches, lexicon.version)
 
     def extract_keywords(self, text):
         """
         Extracts words that match the emotion lexicon.
         """
-        cleaned = clean_text(text)
-        found_keywords = []
-        
-        # We check both individual words and the lexicon entries (which might be phrases)
-        for category, keywords in self.lexicon.items():
-            for kw in keywords:
-                if kw in cleaned:
-                    found_keywords.append(kw)
-        
-        # Deduplicate while preserving order if possible
-        return list(set(found_keywords))
+        return self.match(text)["keywords"]
 
     def get_category_matches(self, text):
         """
         Returns match counts with heavy weighting for Critical Distress phrases.
         """
-        cleaned = clean_text(text)
-        matches = {category: 0 for category in self.lexicon.keys()}
-        
-        for category, keywords in self.lexicon.items():
-            for kw in keywords:
-                # Use word boundary or direct phrase match to prevent partial matches
-                # e.g., "die" shouldn't match "diet", but "want to die" should match "i want to die"
-                if kw in cleaned:
-                    # HEAVY WEIGHTING for Critical Distress
-                    weight = 10 if category == "Critical Distress" else 1
-                    matches[category] += weight
+        return self.weight_category_counts(self.match(text)["category_counts"])
+
+    def weight_category_counts(self, category_counts):
+        """
+        Applies the Critical Distress weighting to raw per-category match counts.
+        """
+        matches = {}
+        for category, count in category_counts.items():
+            # HEAVY WEIGHTING for Critical Distress
+            weight = 10 if category == "Critical Distress" else 1
+            matches[category] = count * weight
         
         return matches
@@ -0,0 +1,113 @@
+"""
+Prebuilt binary index of the compiled emotion lexicon.
+
+Compiling lexicon.json into the Aho-Corasick automaton costs a JSON parse
+and a trie build on every cold start, and leaves every process with its
+own copy of the automaton. The index stores the compiled automaton in the
+flat layout of nlp.lexicon_mmap next to the lexicon, tagged with the
+lexicon's SHA-256; processes memory-map it read-only and match against
+the mapping, so all workers share one copy. A missing or stale index is
+rebuilt from JSON on load; when it cannot be written or mapped, the
+process falls back to its own compiled matcher.
+
+Build it at deploy time from the api directory:
+
+    python -m nlp.lexicon_index
+"""
+import hashlib
+import json
+import logging
+import os
+import sys
+from nlp.lexicon_matcher import LexiconMatcher
+from nlp.lexicon_mmap import MappedLexiconMatcher, write_mapped_index
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', 'data'))
+
+
+def default_lexicon_path():
+    return os.path.join(DATA_DIR, 'lexicon.json')
+
+
+def default_index_path():
+    return os.getenv("LEXICON_INDEX_PATH") or os.path.join(DATA_DIR, 'lexicon.index.bin')
+
+
+def index_path_for(lexicon_path):
+    """
+    Index file for a lexicon: the shared default for data/lexicon.json, and
+    a file next to any other lexicon, so a custom lexicon never overwrites
+    the index production workers map.
+    """
+    if os.path.abspath(lexicon_path) == os.path.abspath(default_lexicon_path()):
+        return default_index_path()
+    return os.path.splitext(lexicon_path)[0] + '.index.bin'
+
+
+def lexicon_digest(lexicon_path):
+    with open(lexicon_path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def compile_lexicon(lexicon_path):
+    with open(lexicon_path, 'r') as f:
+        return LexiconMatcher(json.load(f))
+
+
+def build_index(lexicon_path=None, index_path=None):
+    """
+    Compiles the lexicon and writes the index atomically. Returns the index path.
+    """
+    lexicon_path = lexicon_path or default_lexicon_path()
+    index_path = index_path or index_path_for(lexicon_path)
+    return write_index(compile_lexicon(lexicon_path), lexicon_digest(lexicon_path), index_path)
+
+
+def write_index(matcher, source_sha256, index_path=None):
+    """
+    Writes an already compiled matcher as the index for the lexicon with the
+    given SHA-256, atomically. Returns the index path.
+    """
+    return write_mapped_index(matcher, source_sha256, index_path or default_index_path())
+
+
+def map_index(matcher, source_sha256, index_path=None):
+    """
+    Writes `matcher` as the index and returns the memory-mapped matcher for
+    it, or the compiled matcher itself when the index cannot be written or
+    mapped (e.g. a read-only data directory).
+    """
+    index_path = index_path or default_index_path()
+    try:
+        write_index(matcher, source_sha256, index_path)
+        return MappedLexiconMatcher(index_path, source_sha256)
+    except (OSError, ValueError) as e:
+        logger.warning(f"⚠️  Could not map lexicon index ({e}); using an in-process matcher")
+        return matcher
+
+
+def load_matcher(lexicon_path=None, index_path=None):
+    """
+    Returns a matcher for the lexicon: the memory-mapped index when it
+    matches the lexicon's current contents, otherwise compiled from JSON and
+    written as the new index before mapping it.
+    """
+    lexicon_path = lexicon_path or default_lexicon_path()
+    index_path = index_path or index_path_for(lexicon_path)
+    digest = lexicon_digest(lexicon_path)
+
+    if os.path.exists(index_path):
+        try:
+            return MappedLexiconMatcher(index_path, digest)
+        except Exception as e:
+            logger.warning(f"⚠️  Lexicon index not usable ({e}); rebuilding it from lexicon.json")
+
+    return map_index(compile_lexicon(lexicon_path), digest, index_path)
+
+
+if __name__ == '__main__':
+    lexicon_path = sys.argv[1] if len(sys.argv) > 1 else None
+    index_path = sys.argv[2] if len(sys.argv) > 2 else None
+    print(f"Wrote {build_index(lexicon_path, index_path)}")
@@ -0,0 +1,263 @@
+from collections import deque
+from nlp.preprocessing import clean_text, TOKEN_PATTERN
+
+
+def normalize_phrase(phrase):
+    """
+    Converts a lexicon phrase into the token sequence it must match in cleaned text.
+    Returns None when a word of the phrase cleans away entirely (e.g. "988"),
+    since such a phrase can never appear in text passed through clean_text.
+
+    Phrases are cleaned exactly like messages, so hyphenated entries match:
+    "self-harm" becomes "selfharm", as do "self-harm" and "selfharm" in a
+    message. The original substring matcher compared raw phrases against
+    cleaned text and never matched any hyphenated entry; since the
+    automaton, "self-harm" (Critical Distress) triggers the autonomous SOS.
+    """
+    tokens = []
+    for word in phrase.lower().split():
+        cleaned = clean_text(word).strip()
+        if not cleaned:
+            return None
+        tokens.extend(cleaned.split())
+    return tuple(tokens) if tokens else None
+
+
+class LexiconMatcher:
+    """
+    Token-level Aho-Corasick automaton compiled from the emotion lexicon.
+
+    Every lexicon phrase is matched on whole-word boundaries in a single
+    left-to-right pass over the cleaned text, so matching cost depends on the
+    message length rather than on the number of phrases in the lexicon.
+    """
+
+    def __init__(self, lexicon):
+        self.categories = list(lexicon.keys())
+
+        # entries[i] = (keyword, category, token_length, weight)
+        # weight counts how many raw lexicon entries collapsed into this one,
+        # so duplicated phrases keep contributing the way they always have.
+        self.entries = []
+        entry_index = {}
+
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+
+        for category, phrases in lexicon.items():
+            for phrase in phrases:
+                tokens = normalize_phrase(phrase)
+                if tokens is None:
+                    continue
+
+                key = (tokens, category)
+                if key in entry_index:
+                    entry_id = entry_index[key]
+                    keyword, cat, length, weight = self.entries[entry_id]
+                    self.entries[entry_id] = (keyword, cat, length, weight + 1)
+                    continue
+
+                entry_id = len(self.entries)
+                entry_index[key] = entry_id
+                self.entries.append((phrase, category, len(tokens), 1))
+
+                state = 0
+                for token in tokens:
+                    next_state = self._goto[state].get(token)
+                    if next_state is None:
+                        next_state = len(self._goto)
+                        self._goto[state][token] = next_state
+                        self._goto.append({})
+                        self._fail.append(0)
+                        self._out.append([])
+                    state = next_state
+                self._out[state].append(entry_id)
+
+        self._build_failure_links()
+
+    def to_index(self):
+        """
+        Compiled automaton as plain data, for writing the prebuilt lexicon index.
+        """
+        return {
+            "categories": self.categories,
+            "entries": self.entries,
+            "goto": self._goto,
+            "fail": self._fail,
+            "out": self._out
+        }
+
+    def _build_failure_links(self):
+        """
+        Breadth-first pass that links every state to its longest proper suffix
+        in the trie and folds the suffix outputs into the state's own outputs.
+        """
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, next_state in self._goto[state].items():
+                queue.append(next_state)
+
+                fallback = self._fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(token, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+        self._out = [tuple(out) for out in self._out]
+
+    def step(self, state, token):
+        """
+        Advances the automaton by one token and returns the new state.
+        """
+        while state and token not in self._goto[state]:
+            state = self._fail[state]
+        return self._goto[state].get(token, 0)
+
+    def outputs(self, state):
+        """
+        Returns the ids of all entries that end at the given state.
+        """
+        return self._out[state]
+
+    def match(self, cleaned_text):
+        """
+        Finds every lexicon phrase in already-cleaned text in one pass.
+
+        Returns a dict with:
+            category_counts: matched lexicon entries per category (unweighted)
+            keywords: matched lexicon phrases in order of first appearance
+            spans: one {keyword, category, start, end} per occurrence, as
+                   character offsets into cleaned_text
+        """
+        stream = MatchStream(self)
+        stream.feed(cleaned_text)
+        return stream.close()
+
+    def stream(self):
+        """
+        Returns a MatchStream for matching text that arrives in pieces.
+        """
+        return MatchStream(self)
+
+
+class MatchStream:
+    """
+    Incremental LexiconMatcher pass over cleaned text fed in arbitrary pieces.
+
+    Completed tokens advance the automaton as they arrive; the trailing token
+    is held back until whitespace (or close()) proves it complete, since the
+    next piece may extend it. Feeding the pieces of a text and closing the
+    stream gives exactly LexiconMatcher.match on the whole text.
+    """
+
+    def __init__(self, matcher):
+        self.matcher = matcher
+        self.state = 0
+        self.pending = ""         # trailing, possibly unfinished token
+        self.pending_start = 0    # its offset in the cleaned text
+        self.tokens = []
+        self.starts = []
+
+        self.category_counts = {category: 0 for category in matcher.categories}
+        self.keywords = []
+        self.spans = []
+        self._seen_entries = set()
+        self._seen_keywords = set()
+
+    def feed(self, cleaned_text):
+        """
+        Consumes the next piece of cleaned text. Returns the number of tokens completed.
+        """
+        buffer = self.pending + cleaned_text
+        offset = self.pending_start
+        completed = 0
+
+        for token_match in TOKEN_PATTERN.finditer(buffer):
+            if token_match.end() == len(buffer):
+                # May continue in the next piece
+                self.pending = token_match.group()
+                self.pending_start = offset + token_match.start()
+                break
+            self._advance(token_match.group(), offset + token_match.start(), offset + token_match.end())
+            completed += 1
+        else:
+            self.pending = ""
+            self.pending_start = offset + len(buffer)
+
+        return completed
+
+    def close(self):
+        """
+        Completes the trailing token and returns the final match result.
+        """
+        if self.pending:
+            self._advance(self.pending, self.pending_start, self.pending_start + len(self.pending))
+            self.pending_start += len(self.pending)
+            self.pending = ""
+        return {
+            "category_counts": self.category_counts,
+            "keywords": self.keywords,
+            "spans": self.spans
+        }
+
+    def snapshot(self, tentative=True):
+        """
+        Match result for the text fed so far, as if it ended here.
+        The trailing token is evaluated tentatively without committing it,
+        so a phrase completed by the last keystroke is reported immediately.
+        With tentative=False only completed tokens count.
+        """
+        category_counts = dict(self.category_counts)
+        keywords = list(self.keywords)
+        spans = list(self.spans)
+
+        if self.pending and tentative:
+            state = self.matcher.step(self.state, self.pending)
+            starts = self.starts + [self.pending_start]
+            end = self.pending_start + len(self.pending)
+            seen_keywords = set()
+            for entry_id in self.matcher.outputs(state):
+                keyword, category, length, weight = self.matcher.entries[entry_id]
+                spans.append({"keyword": keyword, "category": category, "start": starts[-length], "end": end})
+                if entry_id in self._seen_entries:
+                    continue
+                category_counts[category] += weight
+                if keyword not in self._seen_keywords and keyword not in seen_keywords:
+                    seen_keywords.add(keyword)
+                    keywords.append(keyword)
+
+        return {
+            "category_counts": category_counts,
+            "keywords": keywords,
+            "spans": spans
+        }
+
+    def current_tokens(self):
+        """Completed tokens followed by the trailing one, if any."""
+        return self.tokens + [self.pending] if self.pending else list(self.tokens)
+
+    def _advance(self, token, start, end):
+        self.tokens.append(token)
+        self.starts.append(start)
+        self.state = self.matcher.step(self.state, token)
+
+        for entry_id in self.matcher.outputs(self.state):
+            keyword, category, length, weight = self.matcher.entries[entry_id]
+            self.spans.append({
+                "keyword": keyword,
+                "category": category,
+                "start": self.starts[-length],
+                "end": end
+            })
+
+            if entry_id in self._seen_entries:
+                continue
+            self._seen_entries.add(entry_id)
+            self.category_counts[category] += weight
+
+            if keyword not in self._seen_keywords:
+                self._seen_keywords.add(keyword)
+                self.keywords.append(keyword)
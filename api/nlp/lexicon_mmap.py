@@ -0,0 +1,319 @@
+"""
+Flat binary form of the compiled lexicon, matched directly from a
+read-only memory map.
+
+A LexiconMatcher keeps its automaton in Python dicts, lists and tuples,
+so every worker process holds a private copy (and pages shared after a
+fork are copied again as soon as reference counts are touched). The
+mapped form stores the same automaton as arrays of unsigned 32-bit
+integers plus one UTF-8 string pool. Workers map the file read-only, so
+the kernel keeps a single copy in the page cache for all of them, and
+nothing is unpickled or rebuilt on start-up.
+
+Layout (native byte order, recorded in the header):
+
+    header      magic, format, byte order, SHA-256 of lexicon.json,
+                then (offset, size) for each section below
+    vocab       open-addressing table of (CRC-32 of token, token id + 1) pairs (0 = empty)
+    tokens      token_count + 1 offsets into the pool
+    goto        open-addressing table of (state + 1, token id, next state) triples
+    fail        failure link per state
+    out_index   state_count + 1 offsets into out_ids
+    out_ids     entry ids ending at each state, suffix outputs included
+    entries     (keyword start, keyword end, category, token length, weight) per entry
+    categories  category_count + 1 offsets into the pool
+    pool        UTF-8 bytes of every token, keyword and category name
+
+MappedLexiconMatcher has the same step/outputs/entries/categories
+interface as LexiconMatcher, so MatchStream runs unchanged on either.
+"""
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from nlp.lexicon_matcher import MatchStream
+
+MAGIC = b"KDLX"
+
+# Bump when the layout changes
+FORMAT = 1
+
+SECTIONS = ("vocab", "tokens", "goto", "fail", "out_index", "out_ids", "entries", "categories", "pool")
+
+_HEADER = struct.Struct("<4sHB32s")
+_SECTION = struct.Struct("<QQ")
+_HEADER_SIZE = _HEADER.size + _SECTION.size * len(SECTIONS)
+
+_BYTE_ORDERS = {"little": 0, "big": 1}
+
+# Multipliers spreading (state, token id) pairs over the goto table
+_STATE_MIX = 2654435761
+_TOKEN_MIX = 40503
+
+
+def _table_size(count):
+    """Power of two at least twice `count`, so probe chains stay short."""
+    size = 8
+    while size < count * 2:
+        size *= 2
+    return size
+
+
+def _u32(values=()):
+    table = array("I", values)
+    if table.itemsize != 4:  # pragma: no cover - no mainstream platform
+        table = array("L", values)
+    return table
+
+
+class _Pool:
+    def __init__(self):
+        self.data = bytearray()
+
+    def add(self, text):
+        start = len(self.data)
+        self.data += text.encode("utf-8")
+        return start, len(self.data)
+
+
+def write_mapped_index(matcher, source_sha256, path):
+    """
+    Serializes a compiled LexiconMatcher into the mapped layout at `path`,
+    atomically. The file is replaced, never rewritten in place, so processes
+    still mapping the previous version keep reading it safely.
+    """
+    index = matcher.to_index()
+    pool = _Pool()
+
+    # Token vocabulary
+    token_ids = {}
+    for edges in index["goto"]:
+        for token in edges:
+            token_ids.setdefault(token, len(token_ids))
+    tokens = _u32([len(pool.data)])
+    for token in token_ids:
+        tokens.append(pool.add(token)[1])
+
+    vocab_mask = _table_size(len(token_ids)) - 1
+    vocab = _u32([0]) * ((vocab_mask + 1) * 2)
+    for token, token_id in token_ids.items():
+        crc = zlib.crc32(token.encode("utf-8"))
+        slot = crc & vocab_mask
+        while vocab[slot * 2 + 1]:
+            slot = (slot + 1) & vocab_mask
+        vocab[slot * 2:slot * 2 + 2] = _u32((crc, token_id + 1))
+
+    # Transitions
+    edges = [(state, token_ids[token], target)
+             for state, targets in enumerate(index["goto"])
+             for token, target in targets.items()]
+    goto_mask = _table_size(len(edges)) - 1
+    goto = _u32([0]) * ((goto_mask + 1) * 3)
+    for state, token_id, target in edges:
+        slot = (state * _STATE_MIX + token_id * _TOKEN_MIX) & goto_mask
+        while goto[slot * 3]:
+            slot = (slot + 1) & goto_mask
+        goto[slot * 3:slot * 3 + 3] = _u32((state + 1, token_id, target))
+
+    # Outputs
+    out_index = _u32([0])
+    out_ids = _u32()
+    for outputs in index["out"]:
+        out_ids.extend(outputs)
+        out_index.append(len(out_ids))
+
+    # Entries and categories
+    category_ids = {category: i for i, category in enumerate(index["categories"])}
+    entries = _u32()
+    for keyword, category, length, weight in index["entries"]:
+        entries.extend(pool.add(keyword) + (category_ids[category], length, weight))
+    categories = _u32([len(pool.data)])
+    for category in index["categories"]:
+        categories.append(pool.add(category)[1])
+
+    sections = {
+        "vocab": vocab.tobytes(),
+        "tokens": tokens.tobytes(),
+        "goto": goto.tobytes(),
+        "fail": _u32(index["fail"]).tobytes(),
+        "out_index": out_index.tobytes(),
+        "out_ids": out_ids.tobytes(),
+        "entries": entries.tobytes(),
+        "categories": categories.tobytes(),
+        "pool": bytes(pool.data)
+    }
+
+    header = [_HEADER.pack(MAGIC, FORMAT, _BYTE_ORDERS[sys.byteorder], bytes.fromhex(source_sha256))]
+    body = []
+    offset = _HEADER_SIZE
+    for name in SECTIONS:
+        data = sections[name]
+        # 8-byte alignment keeps every array on its natural boundary
+        padding = -offset % 8
+        body.append(b"\0" * padding)
+        offset += padding
+        header.append(_SECTION.pack(offset, len(data)))
+        body.append(data)
+        offset += len(data)
+
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(b"".join(header + body))
+    os.replace(temp_path, path)
+    return path
+
+
+class _MappedEntries:
+    """
+    Read-only sequence of (keyword, category, token_length, weight) tuples,
+    decoded from the mapped entries table on access.
+    """
+
+    def __init__(self, table, pool, categories):
+        self._table = table
+        self._pool = pool
+        self._categories = categories
+
+    def __len__(self):
+        return len(self._table) // 5
+
+    def __getitem__(self, entry_id):
+        if not 0 <= entry_id < len(self):
+            raise IndexError("lexicon entry id out of range")
+        base = entry_id * 5
+        start, end, category, length, weight = self._table[base:base + 5]
+        return (str(self._pool[start:end], "utf-8"), self._categories[category], length, weight)
+
+    def __iter__(self):
+        for entry_id in range(len(self)):
+            yield self[entry_id]
+
+
+class MappedLexiconMatcher:
+    """
+    LexiconMatcher backed by a read-only memory map of write_mapped_index output.
+    """
+
+    def __init__(self, path, source_sha256=None):
+        """
+        Maps the index at `path`. Raises ValueError when it is not a mapped
+        lexicon index of this format and byte order, or when `source_sha256`
+        is given and the index was built from a different lexicon.
+        """
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._map) < _HEADER_SIZE:
+            raise ValueError("truncated lexicon index")
+        magic, file_format, byte_order, digest = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or file_format != FORMAT:
+            raise ValueError("not a mapped lexicon index of this format")
+        if byte_order != _BYTE_ORDERS[sys.byteorder]:
+            raise ValueError("lexicon index was built on a machine with a different byte order")
+        self.source_sha256 = digest.hex()
+        if source_sha256 is not None and self.source_sha256 != source_sha256:
+            raise ValueError("lexicon index was built from a different lexicon")
+
+        view = memoryview(self._map)
+        sections = {}
+        offsets = {}
+        for position, name in enumerate(SECTIONS):
+            offset, size = _SECTION.unpack_from(self._map, _HEADER.size + position * _SECTION.size)
+            if offset + size > len(self._map):
+                raise ValueError("truncated lexicon index")
+            data = view[offset:offset + size]
+            offsets[name] = offset
+            sections[name] = data if name == "pool" else data.cast("I")
+
+        self._vocab = sections["vocab"]
+        self._vocab_mask = len(self._vocab) // 2 - 1
+        self._tokens = sections["tokens"]
+        self._goto = sections["goto"]
+        self._goto_mask = len(self._goto) // 3 - 1
+        self._fail = sections["fail"]
+        self._out_index = sections["out_index"]
+        self._out_ids = sections["out_ids"]
+        self._pool = sections["pool"]
+        self._pool_start = offsets["pool"]
+
+        names = sections["categories"]
+        self.categories = [str(self._pool[names[i]:names[i + 1]], "utf-8") for i in range(len(names) - 1)]
+        self.entries = _MappedEntries(sections["entries"], self._pool, self.categories)
+
+    @property
+    def mapped_bytes(self):
+        return len(self._map)
+
+    def _token_id(self, token):
+        encoded = token.encode("utf-8")
+        crc = zlib.crc32(encoded)
+        vocab = self._vocab
+        slot = crc & self._vocab_mask
+        while True:
+            base = slot * 2
+            token_id = vocab[base + 1] - 1
+            if token_id < 0:
+                return -1
+            # The stored CRC rules out almost every other token without touching the pool
+            if vocab[base] == crc:
+                start = self._pool_start + self._tokens[token_id]
+                end = self._pool_start + self._tokens[token_id + 1]
+                if self._map[start:end] == encoded:
+                    return token_id
+            slot = (slot + 1) & self._vocab_mask
+
+    def _next(self, state, token_id):
+        goto = self._goto
+        key = state + 1
+        slot = (state * _STATE_MIX + token_id * _TOKEN_MIX) & self._goto_mask
+        while True:
+            base = slot * 3
+            stored = goto[base]
+            if not stored:
+                return -1
+            if stored == key and goto[base + 1] == token_id:
+                return goto[base + 2]
+            slot = (slot + 1) & self._goto_mask
+
+    def step(self, state, token):
+        """
+        Advances the automaton by one token and returns the new state.
+        """
+        token_id = self._token_id(token)
+        if token_id < 0:
+            # No phrase contains the token, so every suffix falls back to the root
+            return 0
+        while True:
+            next_state = self._next(state, token_id)
+            if next_state >= 0:
+                return next_state
+            if not state:
+                return 0
+            state = self._fail[state]
+
+    def outputs(self, state):
+        """
+        Returns the ids of all entries that end at the given state.
+        """
+        if not state:
+            return ()
+        start = self._out_index[state]
+        end = self._out_index[state + 1]
+        return self._out_ids[start:end] if end > start else ()
+
+    def match(self, cleaned_text):
+        """
+        Finds every lexicon phrase in already-cleaned text in one pass;
+        same result as LexiconMatcher.match.
+        """
+        stream = MatchStream(self)
+        stream.feed(cleaned_text)
+        return stream.close()
+
+    def stream(self):
+        """
+        Returns a MatchStream for matching text that arrives in pieces.
+        """
+        return MatchStream(self)
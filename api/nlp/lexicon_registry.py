@@ -0,0 +1,172 @@
+"""
+Process-wide, hot-reloadable compiled lexicon.
+
+The registry holds the active LexiconVersion (compiled matcher plus the
+SHA-256 of the file it came from). Reading `active` checks the file's
+mtime and size at most every LEXICON_POLL_SECONDS; when they change, a
+background thread compiles the new lexicon and swaps it in with a single
+assignment, so requests never wait on a compile and always see one
+complete version. A file that fails to parse or compile is logged and the
+previous version stays active.
+
+Checking on access instead of from a long-lived watcher thread keeps a
+pre-fork master free of threads; each worker notices changes on its own.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from nlp.lexicon_index import default_lexicon_path, index_path_for, lexicon_digest, load_matcher, map_index
+from nlp.lexicon_matcher import LexiconMatcher
+from nlp.lexicon_mmap import MappedLexiconMatcher
+from utils.constants import LEXICON_POLL_SECONDS
+from utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+LEXICON_RELOADS = REGISTRY.counter(
+    "kiddoo_lexicon_reloads_total", "Lexicon reloads by result.", ("result",))
+
+
+class LexiconVersion:
+    """
+    One compiled lexicon. `version` is the short form of the file's SHA-256.
+    """
+
+    def __init__(self, matcher, digest, loaded_at=None):
+        self.matcher = matcher
+        self.digest = digest
+        self.version = digest[:12]
+        self.loaded_at = loaded_at or time.time()
+
+
+def validate_lexicon(lexicon):
+    """Raises ValueError unless the lexicon maps category names to lists of phrases."""
+    if not isinstance(lexicon, dict) or not lexicon:
+        raise ValueError("Lexicon must be a non-empty object of category -> phrases")
+    for category, phrases in lexicon.items():
+        if not isinstance(phrases, list) or not all(isinstance(phrase, str) for phrase in phrases):
+            raise ValueError(f"Category '{category}' must be a list of strings")
+
+
+class LexiconRegistry:
+    def __init__(self, lexicon_path=None, index_path=None, poll_seconds=None):
+        self.lexicon_path = lexicon_path or default_lexicon_path()
+        self.index_path = index_path or index_path_for(self.lexicon_path)
+        if poll_seconds is None:
+            poll_seconds = float(os.getenv("LEXICON_POLL_SECONDS", LEXICON_POLL_SECONDS))
+        self.poll_seconds = poll_seconds
+
+        # Stat first, so a write landing during the initial load is picked up by the first check
+        self._stat = self._file_stat()
+        digest = lexicon_digest(self.lexicon_path)
+        self._active = LexiconVersion(load_matcher(self.lexicon_path, self.index_path), digest)
+
+        self._next_check = time.monotonic() + self.poll_seconds
+        self._reload_lock = threading.Lock()
+        self.reloads = 0
+        self.last_error = None
+
+    @property
+    def active(self):
+        """
+        The active LexiconVersion. Callers should read it once per message
+        and use that object throughout, so one message never mixes versions.
+        """
+        if self.poll_seconds > 0 and time.monotonic() >= self._next_check:
+            self._check()
+        return self._active
+
+    @property
+    def version(self):
+        return self.active.version
+
+    def _file_stat(self):
+        try:
+            stat = os.stat(self.lexicon_path)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    def _check(self):
+        self._next_check = time.monotonic() + self.poll_seconds
+        if self._file_stat() == self._stat:
+            return
+        # One compile at a time; requests keep using the active version meanwhile
+        if self._reload_lock.acquire(blocking=False):
+            threading.Thread(target=self._reload_in_background, name="lexicon-reload", daemon=True).start()
+
+    def _reload_in_background(self):
+        try:
+            self._reload()
+        finally:
+            self._reload_lock.release()
+
+    def reload(self):
+        """
+        Recompiles the lexicon now if its contents changed.
+        Returns True when a new version became active.
+        """
+        with self._reload_lock:
+            return self._reload()
+
+    def _reload(self):
+        stat = self._file_stat()
+        try:
+            with open(self.lexicon_path, 'rb') as f:
+                raw = f.read()
+            digest = hashlib.sha256(raw).hexdigest()
+            if digest == self._active.digest:
+                self._stat = stat
+                return False
+            lexicon = json.loads(raw)
+            validate_lexicon(lexicon)
+            # Written as the shared index and mapped, so the new version is shared too
+            matcher = map_index(LexiconMatcher(lexicon), digest, self.index_path)
+        except Exception as e:
+            # Keep serving the previous version; the next change to the file is tried again
+            self._stat = stat
+            self.last_error = str(e)
+            LEXICON_RELOADS.inc("error")
+            logger.error(f"❌ Lexicon reload failed, keeping version {self._active.version}: {e}")
+            return False
+
+        previous = self._active.version
+        self._active = LexiconVersion(matcher, digest)
+        self._stat = stat
+        self.reloads += 1
+        self.last_error = None
+        LEXICON_RELOADS.inc("ok")
+        logger.info(f"🔄 Lexicon reloaded: {previous} -> {self._active.version}")
+        return True
+
+    def stats(self):
+        active = self.active
+        return {
+            "version": active.version,
+            "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(active.loaded_at)),
+            "entries": len(active.matcher.entries),
+            "mapped": isinstance(active.matcher, MappedLexiconMatcher),
+            "reloads": self.reloads,
+            "last_error": self.last_error,
+            "poll_seconds": self.poll_seconds
+        }
+
+
+_shared_registry = None
+_shared_registry_lock = threading.Lock()
+
+
+def get_lexicon_registry():
+    """
+    Process-wide registry for the default lexicon, created on first use.
+    Keyword extraction, sentiment overrides and live streams all read it.
+    """
+    global _shared_registry
+    if _shared_registry is None:
+        with _shared_registry_lock:
+            if _shared_registry is None:
+                _shared_registry = LexiconRegistry()
+    return _shared_registry
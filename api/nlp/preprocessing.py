@@ -1,14 +1,55 @@
 import re
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-
 import os
 
-# Add local nltk_data path for Vercel deployment
+# Local nltk_data path for Vercel deployment; registered when nltk is first needed
 nltk_data_path = os.path.join(os.path.dirname(__file__), '..', 'nltk_data')
-if nltk_data_path not in nltk.data.path:
-    nltk.data.path.append(nltk_data_path)
+STOPWORDS_PATH = os.path.join(nltk_data_path, 'corpora', 'stopwords', 'english')
+
+NON_ALPHA_PATTERN = re.compile(r'[^a-zA-Z\s]')
+TOKEN_PATTERN = re.compile(r'\S+')
+
+# Deletes every ASCII character NON_ALPHA_PATTERN removes, for the common all-ASCII message
+ASCII_CLEAN_TABLE = str.maketrans('', '', ''.join(
+    chr(code) for code in range(128) if not (chr(code).isalpha() or chr(code).isspace())
+))
+
+# The only splits nltk's word_tokenize makes in cleaned (lowercase, letters-only) text
+SPLIT_WORDS = {
+    "cannot": ("can", "not"),
+    "gimme": ("gim", "me"),
+    "gonna": ("gon", "na"),
+    "gotta": ("got", "ta"),
+    "lemme": ("lem", "me"),
+    "wanna": ("wan", "na")
+}
+
+_stopwords = None
+
+def _nltk():
+    """
+    Imports nltk on first use. clean_text, which every request runs, does not
+    need it, so cold starts skip the import entirely.
+    """
+    import nltk
+    if nltk_data_path not in nltk.data.path:
+        nltk.data.path.append(nltk_data_path)
+    return nltk
+
+def get_stopwords():
+    """
+    English stopwords as a frozenset, read once from the bundled nltk_data
+    (or from nltk's corpus when the bundled copy is missing).
+    """
+    global _stopwords
+    if _stopwords is None:
+        try:
+            with open(STOPWORDS_PATH, 'r', encoding='utf-8') as f:
+                _stopwords = frozenset(line.strip() for line in f if line.strip())
+        except OSError:
+            _nltk()
+            from nltk.corpus import stopwords
+            _stopwords = frozenset(stopwords.words('english'))
+    return _stopwords
 
 def clean_text(text):
     """
@@ -20,20 +61,25 @@ def clean_text(text):
     # Lowercase
     text = text.lower()
     
-    # Remove special characters
-    text = re.sub(r'[^a-zA-Z\s]', '', text)
-    
-    return text
+    # Remove special characters (a translate table is several times faster on long ASCII messages)
+    if text.isascii():
+        return text.translate(ASCII_CLEAN_TABLE)
+    return NON_ALPHA_PATTERN.sub('', text)
+
+def iter_tokens(text, remove_stopwords=False):
+    """
+    Lazily yields the word tokens of `text`, cleaned first. Produces exactly
+    what nltk's word_tokenize returns for cleaned text, without building lists.
+    """
+    stop_words = get_stopwords() if remove_stopwords else None
+    for token_match in TOKEN_PATTERN.finditer(clean_text(text)):
+        token = token_match.group()
+        for word in SPLIT_WORDS.get(token, (token,)):
+            if stop_words is None or word not in stop_words:
+                yield word
 
 def preprocess_text(text):
     """
     Full preprocessing pipeline: cleaning, tokenization, and stopword removal.
     """
-    text = clean_text(text)
-    
-    tokens = word_tokenize(text)
-    
-    stop_words = set(stopwords.words('english'))
-    filtered_tokens = [w for w in tokens if w not in stop_words]
-    
-    return filtered_tokens
+    return list(iter_tokens(text, remove_stopwords=True))
@@ -1,4 +1,7 @@
-from utils.constants import NORMAL, ANXIETY, STRESS, DEPRESSION, CRITICAL
+from utils.constants import NORMAL, ANXIETY, STRESS, DEPRESSION, CRITICAL, ALLOWED_STATES
+from utils.serialization import freeze
+
+TRENDS = ("Stable", "Spiraling", "Improving")
 
 class AgentService:
     def __init__(self):
@@ -68,10 +71,25 @@ class AgentService:
             CRITICAL: "Urgent"
         }
 
+        # Every (state, trend) reply rendered once, frozen and pre-encoded
+        self.payloads = {
+            (state, trend): freeze(self._render(state, trend))
+            for state in ALLOWED_STATES
+            for trend in TRENDS
+        }
+
     def generate_response(self, state, intensity, trend="Stable"):
         """
         Generates a deterministic, empathetic agent response based on the detected state and session trend.
+        Returns a shared read-only payload; copy it with dict() before modifying.
         """
+        payload = self.payloads.get((state, trend))
+        if payload is None:
+            # Unknown trends read as Stable and unknown states as Normal, as in _render
+            payload = self.payloads.get((state, "Stable"), self.payloads[(NORMAL, "Stable")])
+        return payload
+
+    def _render(self, state, trend):
         base_message = self.messages.get(state, self.messages[NORMAL])
         
         # Contextual prefix based on trend
@@ -1,19 +1,96 @@
+import time
 from nlp.keyword_extractor import KeywordExtractor
 from models.sentiment_model import SentimentAnalyzer
 from models.state_classifier import StateClassifier
-from utils.scoring import calculate_intensity
-from utils.constants import PRECAUTIONS, CRITICAL
-from services.sos_service import SOSService
+from utils.scoring import calculate_intensity, calculate_intensity_batch
+from utils.constants import PRECAUTIONS, CRITICAL, NORMAL, STATE_SEVERITY, MOMENTUM_WINDOW
+from services.sos_service import get_sos_service
 from services.agent_service import AgentService
+from services.streaming_analysis import StreamingAnalysis
+from services.session_store import build_session_store
+from utils.cache import MISSING, build_cache, normalize_message
+from utils.metrics import REGISTRY
+from utils.serialization import freeze
+
+# Hot-path instrumentation: one perf_counter pair and a bucket increment per stage
+STAGE_SECONDS = REGISTRY.histogram(
+    "kiddoo_analysis_stage_seconds", "Time spent in each analysis pipeline stage.", ("stage",))
+ANALYSIS_SECONDS = REGISTRY.histogram(
+    "kiddoo_analysis_seconds", "End-to-end perform_full_analysis latency.", ("cache",))
+CLASSIFIED_STATES = REGISTRY.counter(
+    "kiddoo_classified_states_total", "Messages classified, by state and mode.", ("state", "mode"))
+
+# Messages run once by warm_up to load every lazily imported stage
+WARM_UP_MESSAGES = (
+    "I feel calm and happy today",
+    "I am so stressed and anxious about everything"
+)
+
+# Fields returned per mode, in response order. Unknown modes get the review
+# response. Each field is produced on demand in _build_response, so work that
+# only feeds review fields (probabilities, explanation text) never runs for
+# user-mode requests.
+RESPONSE_FIELDS = {
+    "review": (
+        "prediction_result", "sentiment_analysis", "extracted_keywords", "classified_state",
+        "intensity_score", "state_probabilities", "precautions", "autonomous_action",
+        "decision_explanation", "agent_response", "mode", "lexicon_version"
+    ),
+    # Heavy analytics are hidden in user mode; sentiment/intensity stay for the UI
+    "user": (
+        "prediction_result", "sentiment_analysis", "intensity_score", "classified_state",
+        "precautions", "autonomous_action", "agent_response", "mode", "lexicon_version"
+    )
+}
+
+
+def normalize_mode(mode):
+    """
+    Request mode as a RESPONSE_FIELDS key: "user", or "review" for anything
+    else. Applied where requests come in, so client input never becomes a
+    metric label or cache key as-is.
+    """
+    return "user" if mode == "user" else "review"
+
 
 class AnalysisService:
-    def __init__(self):
+    def __init__(self, sos_service=None, session_store=None):
         self.keyword_extractor = KeywordExtractor()
-        self.sentiment_analyzer = SentimentAnalyzer()
+        self.sentiment_analyzer = SentimentAnalyzer(self.keyword_extractor)
         self.state_classifier = StateClassifier(self.keyword_extractor)
-        self.sos_service = SOSService()
+        # Shared with the SOS endpoints unless a dispatcher is injected
+        self.sos_service = sos_service or get_sos_service()
         self.agent_service = AgentService()
 
+        # Precaution lists frozen and pre-encoded once, shared by every response
+        self.precautions = {state: freeze(items) for state, items in PRECAUTIONS.items()}
+
+        # Memoized responses keyed on (normalized message, mode, trend).
+        # The autonomous SOS action is never cached; it is re-evaluated per request.
+        self.analysis_cache = build_cache("ANALYSIS")
+
+        # Recent states per session id, so clients need not resend their history
+        self.session_store = session_store if session_store is not None else build_session_store()
+
+    def warm_up(self):
+        """
+        Runs the batch pipeline once so TextBlob and its corpora, NumPy and
+        every response path are loaded. A pre-fork server calls this in the
+        master so workers share those pages instead of each loading them.
+        Nothing is dispatched.
+        """
+        self.analyze_many(list(WARM_UP_MESSAGES), mode='review')
+
+    def cache_stats(self):
+        """
+        Hit/miss counters and sizes for the sentiment and full-analysis caches.
+        """
+        sentiment_cache = self.sentiment_analyzer.cache
+        return {
+            "sentiment": sentiment_cache.stats() if sentiment_cache else None,
+            "analysis": self.analysis_cache.stats() if self.analysis_cache else None
+        }
+
     def _analyze_momentum(self, history):
         """
         Analyzes the last few interactions to determine emotional momentum.
@@ -21,57 +98,218 @@ class AnalysisService:
         """
         if not history or len(history) < 2:
             return "Stable"
-            
-        severity_map = {
-            "Normal": 0,
-            "Stress": 1,
-            "Anxiety": 2,
-            "Depression": 3,
-            "Critical Distress": 4
-        }
-        
+
         # Get last 3 states (assuming history is list of dicts with 'classified_state')
-        recent_history = history[-3:]
-        scores = [severity_map.get(item.get('classified_state', 'Normal'), 0) for item in recent_history]
-        
-        if len(scores) < 2:
+        recent_history = history[-MOMENTUM_WINDOW:]
+        return self._momentum([item.get('classified_state', NORMAL) for item in recent_history])
+
+    def _momentum(self, states):
+        """
+        Trend over a short, oldest-first window of states.
+        """
+        if not states or len(states) < 2:
             return "Stable"
-            
+
         # Compare first and last of the recent window
-        first = scores[0]
-        last = scores[-1]
-        
+        first = STATE_SEVERITY.get(states[0], 0)
+        last = STATE_SEVERITY.get(states[-1], 0)
+
         if last > first:
             return "Spiraling"
         elif last < first:
             return "Improving"
-            
+
         return "Stable"
 
-    def perform_full_analysis(self, message, mode='user', history=[], emergency_contacts=None):
-        # 1. Sentiment Analysis
-        sentiment = self.sentiment_analyzer.analyze(message)
-        
-        # 2. Keyword Extraction
-        keywords = self.keyword_extractor.extract_keywords(message)
+    def _session_states(self, session_id, history):
+        """
+        Recent states for the trend: the server-side session when known,
+        otherwise the tail of the client-supplied history.
+        """
+        if session_id and self.session_store is not None:
+            states = self.session_store.recent(session_id)
+            if states is not None:
+                return states
+        return [item.get('classified_state', NORMAL) for item in (history or [])[-MOMENTUM_WINDOW:]]
+
+    def _record_session(self, session_id, states, response):
+        if session_id and self.session_store is not None:
+            self.session_store.record(session_id, response["classified_state"], seed=states)
+
+    def lexicon_stats(self):
+        return self.keyword_extractor.registry.stats()
+
+    def session_stats(self):
+        return self.session_store.stats() if self.session_store is not None else None
+
+    def build_context(self, message):
+        """
+        Cleans and matches the message once and attaches its sentiment,
+        producing the shared context every later stage reads from.
+        """
+        with STAGE_SECONDS.time("keywords"):
+            context = self.keyword_extractor.build_context(message)
+        with STAGE_SECONDS.time("sentiment"):
+            context.sentiment = self.sentiment_analyzer.analyze(message, context)
+        return context
+
+    def perform_full_analysis(self, message, mode='user', history=[], emergency_contacts=None, user_info=None, session_id=None):
+        """
+        Full analysis of one message. With a `session_id`, the trend comes from
+        the server-side session store and the message's state is recorded
+        there; `history` is then only used to seed a session the store does
+        not know yet.
+        """
+        start = time.perf_counter()
+        states = self._session_states(session_id, history)
+        response, cache_result = self._analyze_with_trend(message, mode, self._momentum(states), emergency_contacts, user_info)
+        self._record_session(session_id, states, response)
+
+        ANALYSIS_SECONDS.observe(time.perf_counter() - start, cache_result)
+        CLASSIFIED_STATES.inc(response["classified_state"], normalize_mode(mode))
+        return response
+
+    def _analyze_with_trend(self, message, mode, trend, emergency_contacts, user_info):
+        """
+        Returns (response, cache_result) where cache_result is "hit", "miss" or "disabled".
+        """
+        # The mode is part of the key; a non-string one (from a direct caller) is not cached
+        if self.analysis_cache is None or not isinstance(mode, str):
+            return self._perform_full_analysis(message, mode, trend, emergency_contacts, user_info), "disabled"
+
+        # Keyed on the lexicon version, so a hot reload never serves results of the old lexicon
+        version = self.keyword_extractor.registry.version
+        key = (normalize_message(message), mode, trend, version)
+
+        cached = self.analysis_cache.get(key)
+        if cached is MISSING:
+            response = self._perform_full_analysis(message, mode, trend, emergency_contacts, user_info)
+            if response["lexicon_version"] == version:
+                cached = dict(response)
+                cached["autonomous_action"] = None
+                self.analysis_cache.set(key, cached)
+            return response, "miss"
+
+        # Cache hit: the SOS side effect still runs for every Critical message
+        response = dict(cached)
+        with STAGE_SECONDS.time("sos"):
+            response["autonomous_action"] = self._autonomous_action(response["classified_state"], emergency_contacts, user_info=user_info)
+        return response, "hit"
+
+    def _perform_full_analysis(self, message, mode, trend, emergency_contacts, user_info=None):
+        # 1. Single lexicon pass + Sentiment Analysis
+        context = self.build_context(message)
         
-        # 3. Detailed Classification
-        detailed_data = self.state_classifier.get_detailed_classification(message, sentiment['score'])
-        state = detailed_data['classified_state']
-        probabilities = detailed_data['probabilities']
-        keyword_contributions = detailed_data['category_matches']
+        # 2. Classification (probabilities are computed later, only if the mode returns them)
+        with STAGE_SECONDS.time("classify"):
+            state = self.state_classifier.classify(context)
         
-        # 4. Intensity Score
+        # 3. Intensity Score
         # We pass the Total match weights (especially Critical weighting) to ensure intensity floor triggers
-        total_match_weight = sum(keyword_contributions.values())
-        intensity = calculate_intensity(sentiment['score'], total_match_weight)
+        with STAGE_SECONDS.time("intensity"):
+            intensity = calculate_intensity(context.sentiment_score, context.total_match_weight)
         
-        # 5. Trend Analysis (NEW Phase 8)
+        # 4. Trend Analysis (NEW Phase 8): computed by the caller from the session window
+        return self._build_response(context, state, intensity, trend, mode, emergency_contacts, user_info=user_info)
+
+    def open_stream(self, max_chars=None):
+        """
+        Starts a live analysis of text that arrives as deltas while the user types.
+        """
+        return StreamingAnalysis(self, max_chars=max_chars)
+
+    def analyze_many(self, messages, mode='user', history=None, emergency_contacts=None, dispatch_sos=False):
+        """
+        Analyzes a batch of messages in one call.
+
+        Lexicon matching and sentiment run per message, while classification,
+        probabilities and intensity are computed as array operations over the
+        whole batch. Every result is identical to what perform_full_analysis
+        returns for the same message, except that SOS dispatch for Critical
+        messages only happens when `dispatch_sos` is set.
+        """
+        if not messages:
+            return []
+
+        contexts = [self.build_context(message) for message in messages]
+        states = self.state_classifier.classify_batch(contexts)
+        if "state_probabilities" in self._response_fields(mode):
+            probabilities = self.state_classifier.get_probabilities_batch(contexts)
+        else:
+            probabilities = [None] * len(contexts)
+        intensities = calculate_intensity_batch(
+            [context.sentiment_score for context in contexts],
+            [context.total_match_weight for context in contexts]
+        )
         trend = self._analyze_momentum(history)
-        
-        # 6. Agent Response (Updated Phase 8)
-        agent_resp = self.agent_service.generate_response(state, intensity, trend)
-        
+
+        responses = [
+            self._build_response(context, state, intensity, trend, mode, emergency_contacts, dispatch_sos, probabilities=probs)
+            for context, state, intensity, probs in zip(contexts, states, intensities, probabilities)
+        ]
+        for response in responses:
+            CLASSIFIED_STATES.inc(response["classified_state"], normalize_mode(mode))
+        return responses
+
+    def _autonomous_action(self, state, emergency_contacts, dispatch_sos=True, user_info=None):
+        """
+        Runs the SOS side effect for Critical messages. Repeated Critical
+        messages from the same user coalesce into one alert in SOSService.
+        """
+        if state != CRITICAL:
+            return {"sos_triggered": False, "message": "No emergency action required"}
+        if not dispatch_sos:
+            return {"sos_triggered": False, "message": "SOS dispatch disabled for batch analysis"}
+        # Pass user contacts for autonomous trigger
+        return self.sos_service.trigger_sos(emergency_contacts=emergency_contacts, user_info=user_info)
+
+    def _response_fields(self, mode):
+        # Callers other than the endpoints may pass any mode; only a known string selects a field set
+        if isinstance(mode, str) and mode in RESPONSE_FIELDS:
+            return RESPONSE_FIELDS[mode]
+        return RESPONSE_FIELDS["review"]
+
+    def _build_response(self, context, state, intensity, trend, mode, emergency_contacts, dispatch_sos=True, user_info=None, probabilities=None):
+        """
+        Assembles the response fields the mode asks for. Each entry below
+        names what its field depends on; fields the mode does not return are
+        never computed. `probabilities` may be passed in when already
+        computed (batch path).
+        """
+        def agent_response():
+            # 5. Agent Response (Updated Phase 8)
+            with STAGE_SECONDS.time("agent"):
+                return self.agent_service.generate_response(state, intensity, trend)
+
+        def autonomous_action():
+            # 9. Autonomous Action (SOS)
+            with STAGE_SECONDS.time("sos"):
+                return self._autonomous_action(state, emergency_contacts, dispatch_sos, user_info)
+
+        producers = {
+            "prediction_result": lambda: state,
+            "sentiment_analysis": lambda: context.sentiment,
+            "extracted_keywords": lambda: context.keywords,
+            "classified_state": lambda: state,
+            "intensity_score": lambda: intensity,
+            "state_probabilities": lambda: probabilities if probabilities is not None else self.state_classifier.get_probabilities(context),
+            # 8. Precautions
+            "precautions": lambda: self.precautions.get(state, self.precautions[NORMAL]),
+            "autonomous_action": autonomous_action,
+            "decision_explanation": lambda: self._decision_explanation(context, state, intensity),
+            "agent_response": agent_response,
+            "mode": lambda: mode,
+            "lexicon_version": lambda: context.lexicon_version
+        }
+        return {field: producers[field]() for field in self._response_fields(mode)}
+
+    def _decision_explanation(self, context, state, intensity):
+        """
+        Review-mode explanation of why the message got its state and intensity.
+        """
+        sentiment = context.sentiment
+        keywords = context.keywords
+
         # 6. Intensity Reasoning Logic
         if intensity >= 4.0:
             intensity_reasoning = f"Critical indicators detected with high volume of risk keywords ({len(keywords)}) and significant negative sentiment ({sentiment['score']})."
@@ -81,58 +319,18 @@ class AnalysisService:
             intensity_reasoning = "Stable emotional state with low keyword density and neutral or positive sentiment."
 
         # 7. Final Decision Summary
-        has_keywords = any(count > 0 for count in keyword_contributions.values())
         if state == CRITICAL:
             summary = "The message was classified as Critical Distress due to the presence of emergency/crisis indicators."
-        elif has_keywords:
+        elif context.has_keywords:
             summary = f"The message was classified as {state} because of a high concentration of {state}-related keywords and sentiment influence."
         else:
             summary = f"The message was classified as {state} based primarily on the overall sentiment score of {sentiment['score']}."
 
-        # 8. Precautions
-        precautions = PRECAUTIONS.get(state, PRECAUTIONS["Normal"])
-        
-        # 9. Autonomous Action (SOS)
-        sos_action = {"sos_triggered": False, "message": "No emergency action required"}
-        if state == CRITICAL:
-            # Pass user contacts for autonomous trigger
-            sos_action = self.sos_service.trigger_sos(emergency_contacts=emergency_contacts)
-            
-        full_response = {
-            "prediction_result": state,
-            "sentiment_analysis": sentiment,
-            "extracted_keywords": keywords,
-            "classified_state": state,
-            "intensity_score": intensity,
-            "state_probabilities": probabilities,
-            "precautions": precautions,
-            "autonomous_action": sos_action,
-            "decision_explanation": {
-                "dominant_state": state,
-                "trigger_keywords": keywords,
-                "keyword_contributions": keyword_contributions,
-                "sentiment_influence": sentiment['score'],
-                "intensity_reasoning": intensity_reasoning,
-                "final_decision_summary": summary
-            },
-            "agent_response": agent_resp,
-            "mode": mode
+        return {
+            "dominant_state": state,
+            "trigger_keywords": keywords,
+            "keyword_contributions": context.category_matches,
+            "sentiment_influence": sentiment['score'],
+            "intensity_reasoning": intensity_reasoning,
+            "final_decision_summary": summary
         }
-
-        # Filtering based on mode
-        if mode == 'user':
-            # Hide heavy analytics for user mode, but keep sentiment/intensity for UI
-            filtered_response = {
-                "prediction_result": full_response["prediction_result"],
-                "sentiment_analysis": full_response["sentiment_analysis"],  # Added for frontend
-                "intensity_score": full_response["intensity_score"],  # Added for frontend
-                "classified_state": full_response["classified_state"],
-                "precautions": full_response["precautions"],
-                "autonomous_action": full_response["autonomous_action"],
-                "agent_response": full_response["agent_response"],
-                "mode": mode
-            }
-            return filtered_response
-
-        # Return full response for review mode
-        return full_response
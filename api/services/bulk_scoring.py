@@ -0,0 +1,358 @@
+"""
+Offline bulk scoring of historical messages.
+
+Streams a JSONL or CSV file, shards it into batches across a process pool
+(each worker holds its own AnalysisService and scores with analyze_many)
+and writes one result per input record, in input order, as JSONL or as
+Parquet parts. Only a bounded number of batches is in flight, so memory
+stays flat however large the input is.
+
+SOS is never dispatched: batches go through analyze_many without
+dispatch_sos, and workers run with Twilio credentials removed.
+
+Progress is checkpointed next to the output after every --checkpoint-every
+records; --resume continues after the last checkpoint.
+
+Run from the api directory:
+    python -m services.bulk_scoring messages.jsonl scored.jsonl
+    python -m services.bulk_scoring export.csv scored.jsonl --field text --id-field message_id
+    python -m services.bulk_scoring messages.jsonl scored_parquet --format parquet --workers 8
+    python -m services.bulk_scoring messages.jsonl scored.jsonl --resume
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+INPUT_FORMATS = ("jsonl", "csv")
+OUTPUT_FORMATS = ("jsonl", "parquet")
+
+# Non-string Parquet columns; every other column is stored as text
+PARQUET_TYPES = {"offset": "int64", "intensity_score": "float64"}
+
+# Per-process service, created by _init_worker
+_service = None
+_mode = None
+
+
+def _init_worker(mode):
+    global _service, _mode
+
+    # Offline scoring must never reach a contact, whatever the environment holds
+    for variable in ("TWILIO_ACCOUNT_SID", "TWILIO_AUTH_TOKEN", "TWILIO_PHONE_NUMBER"):
+        os.environ.pop(variable, None)
+    os.environ["SOS_START_WORKERS"] = "false"
+    os.environ["SESSION_STORE"] = "none"
+    logging.disable(logging.WARNING)
+
+    from services.analysis_service import AnalysisService
+    from services.sos_service import SOSService
+    from services.sos_outbox import SOSOutbox, MEMORY_OUTBOX
+
+    _service = AnalysisService(sos_service=SOSService(outbox=SOSOutbox(MEMORY_OUTBOX)))
+    _mode = mode
+
+
+def score_batch(records, output_format):
+    """
+    Scores one batch of (offset, id, message, error) records in a worker.
+    JSONL batches come back as encoded lines, so the parent only writes bytes.
+    """
+    from utils.serialization import dumps
+
+    valid = [record for record in records if record[3] is None]
+    responses = iter(_service.analyze_many([record[2] for record in valid], _mode, dispatch_sos=False))
+
+    rows = []
+    for offset, record_id, _, error in records:
+        row = {"offset": offset, "id": record_id}
+        if error is None:
+            row.update(next(responses))
+        else:
+            row["error"] = error
+        rows.append(row)
+
+    if output_format == "jsonl":
+        return b"".join(dumps(row) + b"\n" for row in rows)
+    return [_flatten(row) for row in rows]
+
+
+def _flatten(row):
+    """
+    Parquet row with the same columns for every record of the mode: nested
+    fields (sentiment, probabilities, explanation...) become JSON text and
+    ids become strings, so every part shares one schema.
+    """
+    from services.analysis_service import RESPONSE_FIELDS
+    from utils.serialization import dumps
+
+    columns = ("offset", "id") + RESPONSE_FIELDS.get(_mode, RESPONSE_FIELDS["review"]) + ("error",)
+    flat = {}
+    for column in columns:
+        value = row.get(column)
+        if isinstance(value, (dict, list)):
+            value = dumps(value).decode("utf-8")
+        elif value is not None and column not in PARQUET_TYPES:
+            value = str(value)
+        flat[column] = value
+    return flat
+
+
+def read_records(path, input_format, field, id_field, start=0):
+    """
+    Yields (offset, id, message, error) for every record from `start` on.
+    Records without a usable message carry an error instead of failing the run.
+    """
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if input_format == "csv":
+            rows = csv.DictReader(f)
+        else:
+            rows = (line for line in f if line.strip())
+
+        for offset, row in enumerate(rows):
+            if offset < start:
+                continue
+            if input_format == "jsonl":
+                try:
+                    row = json.loads(row)
+                except ValueError as e:
+                    yield offset, None, None, f"Invalid JSON: {e}"
+                    continue
+                if isinstance(row, str):
+                    row = {field: row}
+
+            if not isinstance(row, dict):
+                yield offset, None, None, "Record must be an object or a string"
+                continue
+            message = row.get(field)
+            record_id = row.get(id_field)
+            if not isinstance(message, str):
+                yield offset, record_id, None, f"Missing or non-string '{field}'"
+                continue
+            yield offset, record_id, message, None
+
+
+def batched(records, size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class JsonlOutput:
+    """Appends encoded lines; the checkpoint records the byte size it is valid up to."""
+
+    def __init__(self, path, position=0):
+        self.path = path
+        self.file = open(path, 'r+b' if position else 'wb')
+        # Anything written after the last checkpoint is rewritten on resume
+        self.file.truncate(position)
+        self.file.seek(position)
+
+    def write(self, encoded):
+        self.file.write(encoded)
+
+    def commit(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return {"position": self.file.tell()}
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetOutput:
+    """
+    Writes a directory of Parquet parts, one per checkpoint interval, so a
+    resumed run only ever adds new parts. Requires pyarrow.
+    """
+
+    def __init__(self, path, parts=0):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise SystemExit("❌ Parquet output needs pyarrow: pip install pyarrow")
+        self.pa = pyarrow
+        self.pq = pyarrow.parquet
+        self.path = path
+        self.parts = parts
+        self.rows = []
+        os.makedirs(path, exist_ok=True)
+
+        # Parts beyond the checkpoint come from an interrupted interval
+        for name in os.listdir(path):
+            if name.startswith("part-") and int(name[5:10]) >= parts:
+                os.remove(os.path.join(path, name))
+
+    def write(self, rows):
+        self.rows.extend(rows)
+
+    def commit(self):
+        if self.rows:
+            part_path = os.path.join(self.path, f"part-{self.parts:05d}.parquet")
+            temp_path = f"{part_path}.tmp"
+            schema = self.pa.schema([
+                (column, getattr(self.pa, PARQUET_TYPES.get(column, "string"))())
+                for column in self.rows[0]
+            ])
+            self.pq.write_table(self.pa.Table.from_pylist(self.rows, schema=schema), temp_path)
+            os.replace(temp_path, part_path)
+            self.parts += 1
+            self.rows = []
+        return {"parts": self.parts}
+
+    def close(self):
+        pass
+
+
+def checkpoint_path(output_path):
+    return f"{output_path.rstrip(os.sep)}.checkpoint.json"
+
+
+def load_checkpoint(path, settings):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        checkpoint = json.load(f)
+    mismatched = [key for key, value in settings.items() if checkpoint.get("settings", {}).get(key) != value]
+    if mismatched:
+        raise SystemExit(f"❌ Checkpoint {path} was written with different {', '.join(mismatched)}; rerun without --resume")
+    return checkpoint
+
+
+def save_checkpoint(path, settings, records, output_state):
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump({"settings": settings, "records": records, "output": output_state,
+                   "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S")}, f)
+    os.replace(temp_path, path)
+
+
+def run(input_path, output_path, input_format, output_format, field="message", id_field="id",
+        mode="review", workers=None, batch_size=256, checkpoint_every=10000, resume=False):
+    """
+    Scores every record of `input_path` into `output_path`. Returns the number
+    of records written by this run (excluding those skipped by a resume).
+    """
+    settings = {
+        "input": os.path.abspath(input_path),
+        "input_format": input_format,
+        "output_format": output_format,
+        "field": field,
+        "id_field": id_field,
+        "mode": mode
+    }
+    progress_path = checkpoint_path(output_path)
+    checkpoint = load_checkpoint(progress_path, settings) if resume else None
+    start = checkpoint["records"] if checkpoint else 0
+    output_state = checkpoint["output"] if checkpoint else {}
+
+    if not resume and os.path.exists(progress_path):
+        # A fresh run overwrites the output, so an old checkpoint no longer describes it
+        os.remove(progress_path)
+
+    if output_format == "jsonl":
+        output = JsonlOutput(output_path, output_state.get("position", 0))
+    else:
+        output = ParquetOutput(output_path, output_state.get("parts", 0))
+
+    if start:
+        logger.info(f"⏩ Resuming after {start:,} records")
+
+    workers = workers or os.cpu_count() or 1
+    done = start
+    last_checkpoint = start
+    started_at = time.monotonic()
+    pending = deque()
+
+    def drain_one():
+        nonlocal done
+        batch_length, future = pending.popleft()
+        output.write(future.result())
+        done += batch_length
+
+    def commit():
+        nonlocal last_checkpoint
+        save_checkpoint(progress_path, settings, done, output.commit())
+        last_checkpoint = done
+        rate = (done - start) / max(time.monotonic() - started_at, 1e-9)
+        logger.info(f"📈 {done:,} records scored ({rate:,.0f}/s)")
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(mode,)) as executor:
+        try:
+            for batch in batched(read_records(input_path, input_format, field, id_field, start), batch_size):
+                # Bounded in-flight work keeps memory flat on inputs of any size
+                while len(pending) >= workers * 2:
+                    drain_one()
+                    if done - last_checkpoint >= checkpoint_every:
+                        commit()
+                pending.append((len(batch), executor.submit(score_batch, batch, output_format)))
+
+            while pending:
+                drain_one()
+                if done - last_checkpoint >= checkpoint_every:
+                    commit()
+            commit()
+        except KeyboardInterrupt:
+            # Keep everything already written in order; the rest is redone on --resume
+            for _, future in pending:
+                future.cancel()
+            commit()
+            logger.warning(f"⏸️  Interrupted; resume with --resume to continue after record {done:,}")
+            raise
+        finally:
+            output.close()
+
+    return done - start
+
+
+def detect_format(path, choices, default):
+    extension = os.path.splitext(path)[1].lstrip(".").lower()
+    if extension == "ndjson":
+        extension = "jsonl"
+    return extension if extension in choices else default
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL or CSV file of messages")
+    parser.add_argument("output", help="JSONL file, or directory of Parquet parts")
+    parser.add_argument("--input-format", choices=INPUT_FORMATS, help="Default: from the input extension")
+    parser.add_argument("--format", dest="output_format", choices=OUTPUT_FORMATS, help="Default: from the output extension, else jsonl")
+    parser.add_argument("--field", default="message", help="Field/column holding the message text")
+    parser.add_argument("--id-field", default="id", help="Field/column copied to each result as 'id'")
+    parser.add_argument("--mode", default="review", choices=("review", "user"))
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--checkpoint-every", type=int, default=10000, help="Records between checkpoints")
+    parser.add_argument("--resume", action="store_true", help="Continue after the last checkpoint")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    input_format = args.input_format or detect_format(args.input, INPUT_FORMATS, "jsonl")
+    output_format = args.output_format or detect_format(args.output, OUTPUT_FORMATS, "jsonl")
+
+    started_at = time.monotonic()
+    try:
+        count = run(args.input, args.output, input_format, output_format, args.field, args.id_field,
+                    args.mode, args.workers, args.batch_size, args.checkpoint_every, args.resume)
+    except KeyboardInterrupt:
+        sys.exit(130)
+    logger.info(f"✅ Scored {count:,} records into {args.output} in {time.monotonic() - started_at:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+"""
+Failure isolation for calls to the SMS provider.
+
+CircuitBreaker stops calling a provider that keeps failing, so an outage
+costs one fast check per delivery instead of a full HTTP timeout.
+RetryBudget caps retries at a fraction of recent traffic, so retries of a
+struggling provider cannot multiply the load on it.
+
+Both are process-local and thread-safe.
+"""
+import threading
+import time
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Rolling-window circuit breaker.
+
+    Closed: calls go through and their outcomes are kept for
+    `window_seconds`. Once at least `min_calls` outcomes are in the window
+    and the failure ratio reaches `failure_rate`, the breaker opens.
+    Open: allow() is False until `cooldown_seconds` have passed.
+    Half-open: `probe_calls` calls are let through; a success closes the
+    breaker, a failure opens it for another cooldown.
+    """
+
+    def __init__(self, failure_rate=0.5, min_calls=10, window_seconds=30.0, cooldown_seconds=30.0,
+                 probe_calls=1, on_transition=None):
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self.probe_calls = probe_calls
+        self.on_transition = on_transition
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._outcomes = deque()  # (monotonic time, failed)
+        self._failures = 0
+        self._opened_at = None
+        self._probes = 0
+        self.times_opened = 0
+
+    def _transition(self, state):
+        self._state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self.times_opened += 1
+        if state != CLOSED:
+            self._probes = 0
+        if state == CLOSED:
+            self._outcomes.clear()
+            self._failures = 0
+        if self.on_transition:
+            self.on_transition(state)
+
+    def _refresh(self, now):
+        # Caller holds the lock
+        if self._state == OPEN and now - self._opened_at >= self.cooldown_seconds:
+            self._transition(HALF_OPEN)
+        cutoff = now - self.window_seconds
+        while self._outcomes and self._outcomes[0][0] < cutoff:
+            _, failed = self._outcomes.popleft()
+            self._failures -= failed
+
+    @property
+    def state(self):
+        with self._lock:
+            self._refresh(time.monotonic())
+            return self._state
+
+    def is_open(self):
+        """True while calls are being refused outright (not while probing)."""
+        return self.state == OPEN
+
+    def retry_at(self):
+        """Wall-clock time at which the breaker lets a probe through (now when not open)."""
+        with self._lock:
+            self._refresh(time.monotonic())
+            if self._state != OPEN:
+                return time.time()
+            return time.time() + max(0.0, self.cooldown_seconds - (time.monotonic() - self._opened_at))
+
+    def allow(self):
+        """
+        True when a call may be made now. In the half-open state this
+        reserves one of the probe slots, so every True must be followed by
+        record_success() or record_failure().
+        """
+        with self._lock:
+            self._refresh(time.monotonic())
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._probes < self.probe_calls:
+                self._probes += 1
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            now = time.monotonic()
+            self._refresh(now)
+            if self._state == HALF_OPEN:
+                self._transition(CLOSED)
+            elif self._state == CLOSED:
+                self._outcomes.append((now, False))
+
+    def record_failure(self):
+        with self._lock:
+            now = time.monotonic()
+            self._refresh(now)
+            if self._state == HALF_OPEN:
+                self._transition(OPEN)
+            elif self._state == CLOSED:
+                self._outcomes.append((now, True))
+                self._failures += 1
+                calls = len(self._outcomes)
+                if calls >= self.min_calls and self._failures / calls >= self.failure_rate:
+                    self._transition(OPEN)
+
+    def snapshot(self):
+        with self._lock:
+            now = time.monotonic()
+            self._refresh(now)
+            calls = len(self._outcomes)
+            retry_in = None
+            if self._state == OPEN:
+                retry_in = round(max(0.0, self.cooldown_seconds - (now - self._opened_at)), 2)
+            return {
+                "state": self._state,
+                "calls_in_window": calls,
+                "failures_in_window": self._failures,
+                "failure_rate": round(self._failures / calls, 4) if calls else 0.0,
+                "threshold": self.failure_rate,
+                "retry_in_seconds": retry_in,
+                "times_opened": self.times_opened
+            }
+
+
+class RetryBudget:
+    """
+    Allows retries up to `ratio` times the first attempts seen in the last
+    `window_seconds`, plus `min_per_second` regardless of traffic.
+    """
+
+    def __init__(self, ratio=0.2, min_per_second=1.0, window_seconds=10.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.window_seconds = window_seconds
+        self._lock = threading.Lock()
+        self._attempts = deque()
+        self._retries = deque()
+        self.exhausted = 0
+
+    def _trim(self, now):
+        cutoff = now - self.window_seconds
+        for events in (self._attempts, self._retries):
+            while events and events[0] < cutoff:
+                events.popleft()
+
+    def _allowed(self):
+        return self.min_per_second * self.window_seconds + self.ratio * len(self._attempts)
+
+    def record_attempt(self):
+        """Counts a first attempt, which earns the budget `ratio` retries."""
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            self._attempts.append(now)
+
+    def try_retry(self):
+        """Spends one retry; False when the budget is used up."""
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            if len(self._retries) >= self._allowed():
+                self.exhausted += 1
+                return False
+            self._retries.append(now)
+            return True
+
+    def snapshot(self):
+        with self._lock:
+            self._trim(time.monotonic())
+            return {
+                "attempts_in_window": len(self._attempts),
+                "retries_in_window": len(self._retries),
+                "retries_allowed": int(self._allowed()),
+                "exhausted": self.exhausted
+            }
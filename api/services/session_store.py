@@ -0,0 +1,150 @@
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict, deque
+from utils.constants import MOMENTUM_WINDOW, SESSION_STORE, SESSION_TTL_SECONDS, SESSION_MAX_SESSIONS
+
+logger = logging.getLogger(__name__)
+
+SESSION_STORES = ("memory", "sqlite", "none")
+
+
+class MemorySessionStore:
+    """
+    Per-process session store: a fixed-size ring buffer of recent states per
+    session id, with idle expiry and a cap on the number of sessions kept.
+    """
+
+    def __init__(self, window=MOMENTUM_WINDOW, ttl_seconds=SESSION_TTL_SECONDS, max_sessions=SESSION_MAX_SESSIONS):
+        self.window = window
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()  # session_id -> (updated_at, deque of states)
+        self._lock = threading.Lock()
+
+    def recent(self, session_id):
+        """Oldest-first recent states of the session, or None if it is unknown or expired."""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            updated_at, states = entry
+            if updated_at <= time.monotonic() - self.ttl_seconds:
+                del self._sessions[session_id]
+                return None
+            return list(states)
+
+    def record(self, session_id, state, seed=None):
+        """
+        Appends a state to the session's ring buffer. `seed` provides the
+        earlier states when the session is new to this store.
+        """
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+            states = entry[1] if entry else deque(seed or (), maxlen=self.window)
+            states.append(state)
+            self._sessions[session_id] = (time.monotonic(), states)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {"backend": "memory", "sessions": len(self._sessions), "window": self.window}
+
+
+class SQLiteSessionStore:
+    """
+    Session store in a local SQLite file (WAL mode), shared by every worker
+    process on the host. Each row holds the session's ring buffer as a short
+    JSON list, so reads and writes stay constant-size.
+    """
+
+    def __init__(self, path=None, window=MOMENTUM_WINDOW, ttl_seconds=SESSION_TTL_SECONDS):
+        self.path = path or os.getenv("SESSION_STORE_PATH") or os.path.join(tempfile.gettempdir(), "kiddoo_sessions.db")
+        self.window = window
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        self._pid = os.getpid()
+        self._last_purge = 0.0
+
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS sessions (session_id TEXT PRIMARY KEY, states TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def _connection(self):
+        # SQLite connections must not cross threads or forks; keep one per thread per process
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._local = threading.local()
+
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def recent(self, session_id):
+        """Oldest-first recent states of the session, or None if it is unknown or expired."""
+        row = self._connection().execute(
+            "SELECT states FROM sessions WHERE session_id = ? AND updated_at > ?",
+            (session_id, time.time() - self.ttl_seconds)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def record(self, session_id, state, seed=None):
+        """
+        Appends a state to the session's ring buffer. `seed` provides the
+        earlier states when the session is new to this store.
+        """
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT states FROM sessions WHERE session_id = ? AND updated_at > ?",
+                (session_id, now - self.ttl_seconds)
+            ).fetchone()
+            states = deque(json.loads(row[0]) if row else (seed or ()), maxlen=self.window)
+            states.append(state)
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, states, updated_at) VALUES (?, ?, ?)",
+                (session_id, json.dumps(list(states)), now)
+            )
+            if now - self._last_purge > 60:
+                conn.execute("DELETE FROM sessions WHERE updated_at <= ?", (now - self.ttl_seconds,))
+                self._last_purge = now
+
+    def stats(self):
+        count = self._connection().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        return {"backend": "sqlite", "sessions": count, "window": self.window}
+
+
+def build_session_store(backend=None):
+    """
+    Creates the session store selected by SESSION_STORE ("memory", "sqlite" or "none").
+    Returns None when server-side sessions are disabled.
+    """
+    backend = (backend or os.getenv("SESSION_STORE", SESSION_STORE)).lower()
+    if backend not in SESSION_STORES:
+        raise ValueError(f"Unknown session store '{backend}'. Expected one of {SESSION_STORES}")
+
+    window = int(os.getenv("MOMENTUM_WINDOW", MOMENTUM_WINDOW))
+    ttl_seconds = float(os.getenv("SESSION_TTL_SECONDS", SESSION_TTL_SECONDS))
+    if backend == "none":
+        return None
+    if backend == "sqlite":
+        try:
+            return SQLiteSessionStore(window=window, ttl_seconds=ttl_seconds)
+        except (sqlite3.Error, OSError) as e:
+            logger.error(f"❌ Failed to open session store, falling back to memory: {e}")
+    return MemorySessionStore(
+        window=window,
+        ttl_seconds=ttl_seconds,
+        max_sessions=int(os.getenv("SESSION_MAX_SESSIONS", SESSION_MAX_SESSIONS))
+    )
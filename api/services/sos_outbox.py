@@ -0,0 +1,302 @@
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Delivery states
+QUEUED = "queued"
+SENDING = "sending"
+RETRYING = "retrying"
+SENT = "sent"
+FAILED = "failed"
+SKIPPED = "skipped"
+MOCK_SENT = "mock_sent"
+
+PENDING_STATES = (QUEUED, RETRYING)
+FINAL_STATES = (SENT, FAILED, SKIPPED, MOCK_SENT)
+# An alert with a delivery in one of these states has reached, or may still reach, a contact
+NOTIFYING_STATES = (QUEUED, SENDING, RETRYING, SENT, MOCK_SENT)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    timestamp TEXT NOT NULL,
+    message_body TEXT NOT NULL,
+    user_info TEXT,
+    user_location TEXT,
+    idempotency_key TEXT,
+    dedupe_key TEXT
+);
+CREATE TABLE IF NOT EXISTS deliveries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    alert_id TEXT NOT NULL REFERENCES alerts(id),
+    position INTEGER NOT NULL,
+    name TEXT,
+    phone TEXT,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    lease_until REAL NOT NULL DEFAULT 0,
+    sid TEXT,
+    error TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_deliveries_due ON deliveries(status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS idx_deliveries_alert ON deliveries(alert_id, position);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_alerts_idempotency ON alerts(dedupe_key, idempotency_key) WHERE idempotency_key IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_alerts_dedupe ON alerts(dedupe_key, created_at);
+"""
+
+
+# Process-local fallback used when the outbox file cannot be opened
+MEMORY_OUTBOX = ":memory:"
+
+
+def default_outbox_path():
+    return os.getenv("SOS_OUTBOX_PATH") or os.path.join(tempfile.gettempdir(), "kiddoo_sos_outbox.db")
+
+
+class SOSOutbox:
+    """
+    Durable SQLite (WAL mode) outbox for SOS alerts.
+
+    An alert is written with one delivery row per contact before anything is
+    sent, so a crash or a slow provider never loses it. Workers claim due
+    deliveries under a lease; a lease that expires (e.g. the worker died
+    mid-send) makes the delivery claimable again.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or default_outbox_path()
+        self._local = threading.local()
+        self._pid = os.getpid()
+
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connection(self):
+        # SQLite connections must not cross threads or forks; keep one per thread per process
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._local = threading.local()
+
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self.path == MEMORY_OUTBOX:
+                # Shared-cache URI so every thread sees the same in-memory database
+                conn = sqlite3.connect("file:kiddoo_sos_outbox?mode=memory&cache=shared", uri=True, timeout=10, isolation_level=None)
+            else:
+                conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+        return _Transaction(conn)
+
+    def enqueue(self, message_body, deliveries, timestamp, user_info=None, user_location=None,
+                idempotency_key=None, dedupe_key=None, dedupe_window=0, idempotency_ttl=0):
+        """
+        Persists a new alert and its per-contact deliveries.
+        Each delivery is a dict with name, phone, status and optional error.
+
+        Returns (alert_id, created). When an alert for the same dedupe key
+        already exists with the same idempotency key (within `idempotency_ttl`
+        seconds), or was created within `dedupe_window` seconds and covers this
+        trigger, nothing is written and that alert's id is returned with
+        created=False. An alert covers a trigger when it is notifying (in
+        NOTIFYING_STATES) every phone this trigger would notify, and already
+        carries the trigger's location if it has one; a trigger that adds a
+        location or a contact is always stored and sent. Idempotency keys are
+        scoped to the dedupe key, so a key reused by another user never
+        returns their alert.
+        The lookup and the insert share one write transaction, so concurrent
+        triggers across threads and processes coalesce into a single alert.
+        """
+        alert_id = uuid.uuid4().hex
+        now = time.time()
+
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            existing = self._find_existing(conn, now, deliveries, user_location, idempotency_key,
+                                           dedupe_key, dedupe_window, idempotency_ttl)
+            if existing is not None:
+                return existing, False
+
+            conn.execute(
+                "INSERT INTO alerts (id, created_at, timestamp, message_body, user_info, user_location, idempotency_key, dedupe_key) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (alert_id, now, timestamp, message_body, json.dumps(user_info), json.dumps(user_location), idempotency_key, dedupe_key)
+            )
+            conn.executemany(
+                "INSERT INTO deliveries (alert_id, position, name, phone, status, error, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (alert_id, position, d.get("name"), d.get("phone"), d["status"], d.get("error"), now)
+                    for position, d in enumerate(deliveries)
+                ]
+            )
+        return alert_id, True
+
+    def _find_existing(self, conn, now, deliveries, user_location, idempotency_key, dedupe_key, dedupe_window, idempotency_ttl):
+        if idempotency_key:
+            row = conn.execute(
+                "SELECT id, created_at FROM alerts WHERE idempotency_key = ? AND dedupe_key IS ?", (idempotency_key, dedupe_key)
+            ).fetchone()
+            if row is not None:
+                if not idempotency_ttl or row["created_at"] > now - idempotency_ttl:
+                    return row["id"]
+                # Expired key: release it so the new alert can take it over
+                conn.execute("UPDATE alerts SET idempotency_key = NULL WHERE id = ?", (row["id"],))
+
+        if dedupe_key and dedupe_window > 0:
+            phones = {str(d.get("phone")) for d in deliveries if d["status"] in NOTIFYING_STATES}
+            rows = conn.execute(
+                "SELECT id, user_location FROM alerts WHERE dedupe_key = ? AND created_at > ? ORDER BY created_at DESC",
+                (dedupe_key, now - dedupe_window)
+            ).fetchall()
+            for row in rows:
+                if self._covers(conn, row, phones, user_location):
+                    return row["id"]
+        return None
+
+    def _covers(self, conn, alert, phones, user_location):
+        # A new location must reach the contacts, so only an alert that already carries it can absorb the trigger
+        if user_location and (json.loads(alert["user_location"]) if alert["user_location"] else None) != user_location:
+            return False
+        placeholders = ", ".join("?" for _ in NOTIFYING_STATES)
+        notifying = {
+            row["phone"] for row in conn.execute(
+                f"SELECT phone FROM deliveries WHERE alert_id = ? AND status IN ({placeholders})",
+                (alert["id"], *NOTIFYING_STATES)
+            )
+        }
+        # An alert whose deliveries all failed or were skipped never swallows a new one,
+        # and one that is not reaching a contact this trigger would notify does not either
+        return bool(notifying) and phones <= notifying
+
+    def claim(self, limit=1, lease_seconds=30, alert_id=None):
+        """
+        Atomically claims up to `limit` due deliveries (optionally for one alert)
+        and returns them as dicts that include the alert's message body.
+        """
+        now = time.time()
+        query = (
+            "SELECT d.*, a.message_body FROM deliveries d JOIN alerts a ON a.id = d.alert_id "
+            "WHERE ((d.status IN (?, ?) AND d.next_attempt_at <= ?) OR (d.status = ? AND d.lease_until <= ?))"
+        )
+        params = [QUEUED, RETRYING, now, SENDING, now]
+        if alert_id is not None:
+            query += " AND d.alert_id = ?"
+            params.append(alert_id)
+        query += " ORDER BY d.next_attempt_at, d.id LIMIT ?"
+        params.append(limit)
+
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = [dict(row) for row in conn.execute(query, params)]
+            conn.executemany(
+                "UPDATE deliveries SET status = ?, lease_until = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                [(SENDING, now + lease_seconds, now, row["id"]) for row in rows]
+            )
+        for row in rows:
+            row["attempts"] += 1
+        return rows
+
+    def mark_sent(self, delivery_id, sid):
+        self._update(delivery_id, status=SENT, sid=sid, error=None)
+
+    def mark_retry(self, delivery_id, error, next_attempt_at):
+        self._update(delivery_id, status=RETRYING, error=error, next_attempt_at=next_attempt_at)
+
+    def defer(self, delivery_id, error, next_attempt_at):
+        """
+        Returns a claimed delivery to the queue without counting the claim as
+        an attempt, e.g. while the provider's circuit breaker is open.
+        """
+        with self._connection() as conn:
+            conn.execute(
+                "UPDATE deliveries SET status = ?, error = ?, next_attempt_at = ?, lease_until = 0, "
+                "attempts = MAX(attempts - 1, 0), updated_at = ? WHERE id = ?",
+                (RETRYING, error, next_attempt_at, time.time(), delivery_id)
+            )
+
+    def mark_failed(self, delivery_id, error):
+        self._update(delivery_id, status=FAILED, error=error)
+
+    def _update(self, delivery_id, **fields):
+        fields["updated_at"] = time.time()
+        fields["lease_until"] = 0
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self._connection() as conn:
+            conn.execute(f"UPDATE deliveries SET {assignments} WHERE id = ?", (*fields.values(), delivery_id))
+
+    def pending_count(self):
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) FROM deliveries WHERE status IN (?, ?, ?)", (QUEUED, RETRYING, SENDING)
+            ).fetchone()
+        return row[0]
+
+    def get_alert(self, alert_id):
+        """
+        Returns the alert with per-contact delivery state, or None if unknown.
+        """
+        with self._connection() as conn:
+            alert = conn.execute("SELECT * FROM alerts WHERE id = ?", (alert_id,)).fetchone()
+            if alert is None:
+                return None
+            rows = conn.execute(
+                "SELECT * FROM deliveries WHERE alert_id = ? ORDER BY position", (alert_id,)
+            ).fetchall()
+
+        contacts = []
+        for row in rows:
+            contact = {
+                "name": row["name"],
+                "phone": row["phone"],
+                "status": row["status"],
+                "attempts": row["attempts"],
+                "timestamp": alert["timestamp"]
+            }
+            if row["sid"]:
+                contact["sid"] = row["sid"]
+            if row["error"]:
+                contact["error"] = row["error"]
+            contacts.append(contact)
+
+        statuses = [c["status"] for c in contacts]
+        return {
+            "alert_id": alert_id,
+            "status": "complete" if all(s in FINAL_STATES for s in statuses) else "in_progress",
+            "delivered": sum(s in (SENT, MOCK_SENT) for s in statuses),
+            "created_at": alert["created_at"],
+            "timestamp": alert["timestamp"],
+            "contacts_notified": contacts,
+            "user_info": json.loads(alert["user_info"]) if alert["user_info"] else None,
+            "user_location": json.loads(alert["user_location"]) if alert["user_location"] else None
+        }
+
+
+class _Transaction:
+    """
+    Context manager that commits an explicit transaction on success and rolls back on error.
+    The connection runs in autocommit mode, so statements outside BEGIN commit immediately.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.conn.in_transaction:
+            self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
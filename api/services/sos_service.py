@@ -1,30 +1,248 @@
+import hashlib
 import logging
 import os
 import json
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
-from twilio.rest import Client
-from utils.constants import MOCK_EMERGENCY_CONTACTS
+from utils.metrics import REGISTRY
+from services.sos_outbox import SOSOutbox, MEMORY_OUTBOX, FINAL_STATES, QUEUED, SENDING, RETRYING, SENT, FAILED, SKIPPED, MOCK_SENT
+from services.resilience import CircuitBreaker, RetryBudget, CLOSED, OPEN
+from utils.constants import (
+    MOCK_EMERGENCY_CONTACTS,
+    SOS_MAX_WORKERS,
+    SOS_SMS_TIMEOUT_SECONDS,
+    SOS_SMS_CONNECT_TIMEOUT_SECONDS,
+    SOS_DISPATCH_DEADLINE_SECONDS,
+    SOS_DISPATCH_MODE,
+    SOS_MAX_ATTEMPTS,
+    SOS_RETRY_BASE_SECONDS,
+    SOS_RETRY_MAX_SECONDS,
+    SOS_RETRY_BUDGET_RATIO,
+    SOS_RETRY_BUDGET_MIN_PER_SECOND,
+    SOS_OUTBOX_POLL_SECONDS,
+    SOS_OUTBOX_LEASE_SECONDS,
+    SOS_PREWARM_CONNECTION,
+    SOS_START_WORKERS,
+    SOS_BREAKER_FAILURE_RATE,
+    SOS_BREAKER_MIN_CALLS,
+    SOS_BREAKER_WINDOW_SECONDS,
+    SOS_BREAKER_COOLDOWN_SECONDS,
+    SOS_SUPPRESSION_WINDOW_SECONDS,
+    SOS_IDEMPOTENCY_TTL_SECONDS
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+SOS_TRIGGER_SECONDS = REGISTRY.histogram(
+    "kiddoo_sos_trigger_seconds", "Time spent in trigger_sos, including inline delivery.", ("outcome",))
+SOS_TRIGGERS = REGISTRY.counter(
+    "kiddoo_sos_triggers_total", "SOS triggers by outcome.", ("outcome",))
+SMS_SEND_SECONDS = REGISTRY.histogram(
+    "kiddoo_sms_send_seconds", "Latency of a single Twilio message create call.", ("result",))
+SMS_DELIVERIES = REGISTRY.counter(
+    "kiddoo_sms_deliveries_total", "SMS delivery attempts by resulting status.", ("status",))
+SMS_BREAKER_TRANSITIONS = REGISTRY.counter(
+    "kiddoo_sms_breaker_transitions_total", "SMS provider circuit breaker state changes.", ("state",))
+SMS_RETRY_BUDGET_EXHAUSTED = REGISTRY.counter(
+    "kiddoo_sms_retry_budget_exhausted_total", "Retries pushed to the maximum backoff because the retry budget was spent.")
+
+
 class SOSService:
-    def __init__(self):
+    def __init__(self, outbox=None, dispatch_mode=None):
         self.account_sid = os.getenv("TWILIO_ACCOUNT_SID")
         self.auth_token = os.getenv("TWILIO_AUTH_TOKEN")
         self.from_number = os.getenv("TWILIO_PHONE_NUMBER")
+
+        # Concurrency and time limits for the SMS fan-out
+        self.max_workers = int(os.getenv("SOS_MAX_WORKERS", SOS_MAX_WORKERS))
+        self.sms_timeout = float(os.getenv("SOS_SMS_TIMEOUT_SECONDS", SOS_SMS_TIMEOUT_SECONDS))
+        self.connect_timeout = float(os.getenv("SOS_SMS_CONNECT_TIMEOUT_SECONDS", SOS_SMS_CONNECT_TIMEOUT_SECONDS))
+        self.dispatch_deadline = float(os.getenv("SOS_DISPATCH_DEADLINE_SECONDS", SOS_DISPATCH_DEADLINE_SECONDS))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="sos-sms")
+
+        # Outbox dispatch: "outbox" returns as soon as the alert is persisted,
+        # "inline" also makes the first delivery attempt inside the request,
+        # "sync" sends and retries inside the request with no background workers
+        self.dispatch_mode = (dispatch_mode or os.getenv("SOS_DISPATCH_MODE", SOS_DISPATCH_MODE)).lower()
+        self.max_attempts = int(os.getenv("SOS_MAX_ATTEMPTS", SOS_MAX_ATTEMPTS))
+        self.retry_base = float(os.getenv("SOS_RETRY_BASE_SECONDS", SOS_RETRY_BASE_SECONDS))
+        self.retry_max = float(os.getenv("SOS_RETRY_MAX_SECONDS", SOS_RETRY_MAX_SECONDS))
+        self._build_resilience()
+        self.poll_interval = float(os.getenv("SOS_OUTBOX_POLL_SECONDS", SOS_OUTBOX_POLL_SECONDS))
+        self.lease_seconds = float(os.getenv("SOS_OUTBOX_LEASE_SECONDS", SOS_OUTBOX_LEASE_SECONDS))
+
+        # Repeat triggers for the same user inside the window coalesce into the open alert
+        self.suppression_window = float(os.getenv("SOS_SUPPRESSION_WINDOW_SECONDS", SOS_SUPPRESSION_WINDOW_SECONDS))
+        self.idempotency_ttl = float(os.getenv("SOS_IDEMPOTENCY_TTL_SECONDS", SOS_IDEMPOTENCY_TTL_SECONDS))
+
+        try:
+            self.outbox = outbox or SOSOutbox()
+        except (sqlite3.Error, OSError) as e:
+            # Never lose the ability to alert: fall back to a non-durable in-memory outbox
+            logger.error(f"❌ Failed to open SOS outbox, falling back to memory: {e}")
+            self.outbox = SOSOutbox(MEMORY_OUTBOX)
+
+        self._workers = []
+        self._workers_pid = None
+        self._workers_lock = threading.Lock()
+        self._wakeup = threading.Event()
         
         self.client = None
+        self.http_client = None
         if self.account_sid and self.auth_token:
             try:
-                self.client = Client(self.account_sid, self.auth_token)
+                # Twilio is only imported when credentials are configured; mock mode never loads it
+                from twilio.rest import Client
+                from services.twilio_http import PooledTwilioHttpClient
+
+                # One keep-alive pool sized to the worker count, shared by every send in this process
+                # TWILIO_API_BASE_URL points the client at a stand-in server (load tests, staging)
+                base_url = os.getenv("TWILIO_API_BASE_URL")
+                self.http_client = PooledTwilioHttpClient(timeout=self.sms_timeout, pool_size=self.max_workers,
+                                                          base_url=base_url, connect_timeout=self.connect_timeout)
+                self.client = Client(self.account_sid, self.auth_token, http_client=self.http_client)
                 logger.info("✅ Twilio client initialized successfully")
+                if base_url:
+                    logger.warning(f"⚠️  Twilio API calls are redirected to {base_url}")
             except Exception as e:
                 logger.error(f"❌ Failed to initialize Twilio Client: {e}")
         else:
             logger.warning("⚠️  Twilio credentials not found. Running in mock mode.")
 
+        # A pre-fork master must not own threads or sockets; its workers call after_fork instead
+        if os.getenv("SOS_START_WORKERS", str(SOS_START_WORKERS)).lower() in ("1", "true", "yes"):
+            self._start_background()
+
+    def _build_resilience(self):
+        """
+        Circuit breaker and retry budget for provider calls. Built per process:
+        a forked worker starts with a closed breaker and an empty budget.
+        """
+        self.breaker = CircuitBreaker(
+            failure_rate=float(os.getenv("SOS_BREAKER_FAILURE_RATE", SOS_BREAKER_FAILURE_RATE)),
+            min_calls=int(os.getenv("SOS_BREAKER_MIN_CALLS", SOS_BREAKER_MIN_CALLS)),
+            window_seconds=float(os.getenv("SOS_BREAKER_WINDOW_SECONDS", SOS_BREAKER_WINDOW_SECONDS)),
+            cooldown_seconds=float(os.getenv("SOS_BREAKER_COOLDOWN_SECONDS", SOS_BREAKER_COOLDOWN_SECONDS)),
+            on_transition=self._on_breaker_transition
+        )
+        self.retry_budget = RetryBudget(
+            ratio=float(os.getenv("SOS_RETRY_BUDGET_RATIO", SOS_RETRY_BUDGET_RATIO)),
+            min_per_second=float(os.getenv("SOS_RETRY_BUDGET_MIN_PER_SECOND", SOS_RETRY_BUDGET_MIN_PER_SECOND))
+        )
+
+    def _on_breaker_transition(self, state):
+        SMS_BREAKER_TRANSITIONS.inc(state)
+        if state == OPEN:
+            logger.error("🔌 SMS provider circuit opened: failing fast, alerts stay queued until it recovers")
+        elif state == CLOSED:
+            logger.info("🔌 SMS provider circuit closed: deliveries resumed")
+        else:
+            logger.warning("🔌 SMS provider circuit half-open: probing with one delivery")
+
+    def provider_degraded(self):
+        """True while real SMS is configured but the provider's circuit is not closed."""
+        return self.can_send() and self.breaker.state != CLOSED
+
+    def _start_background(self):
+        if self.can_send():
+            # Sync dispatch runs where threads do not outlive the request; it never relies on workers
+            if self.dispatch_mode != "sync":
+                self.start_workers()
+            prewarm = os.getenv("SOS_PREWARM_CONNECTION", str(SOS_PREWARM_CONNECTION)).lower() in ("1", "true", "yes")
+            if prewarm:
+                self.warm_up(wait=False)
+
+    def after_fork(self):
+        """
+        Rebuilds per-process state in a freshly forked worker: the SMS thread
+        pool, the provider connection pool and the outbox workers. Threads and
+        sockets never survive a fork, so nothing is shared with the parent.
+        """
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="sos-sms")
+        self._workers_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._build_resilience()
+        if self.http_client:
+            self.http_client.reset_pool()
+        self._start_background()
+
+    def can_send(self):
+        """True when real SMS can be sent (otherwise alerts are mocked)."""
+        return bool(self.client and self.from_number)
+
+    def start_workers(self):
+        """
+        Starts the background threads that drain the outbox in this process.
+        Safe to call repeatedly; threads are restarted after a fork.
+        """
+        with self._workers_lock:
+            if self._workers_pid == os.getpid() and all(t.is_alive() for t in self._workers):
+                return
+            self._workers = [
+                threading.Thread(target=self._worker_loop, name=f"sos-outbox-{i}", daemon=True)
+                for i in range(self.max_workers)
+            ]
+            self._workers_pid = os.getpid()
+            for worker in self._workers:
+                worker.start()
+        logger.info(f"📬 Started {self.max_workers} SOS outbox workers")
+
+    def warm_up(self, wait=True):
+        """
+        Opens the provider connection ahead of the first alert.
+        With wait=False the handshake runs on a background thread.
+        """
+        if not self.http_client:
+            return False
+        if wait:
+            return self.http_client.warm_up()
+        threading.Thread(target=self.http_client.warm_up, name="sos-warm-up", daemon=True).start()
+        return True
+
+    def metrics(self):
+        """Dispatch configuration, outbox backlog and provider connection reuse."""
+        try:
+            pending = self.outbox.pending_count()
+        except Exception as e:
+            logger.error(f"❌ SOS outbox count failed: {e}")
+            pending = None
+        return {
+            "dispatch_mode": self.dispatch_mode,
+            "workers": sum(t.is_alive() for t in self._workers) if self._workers_pid == os.getpid() else 0,
+            "pending_deliveries": pending,
+            "http": self.http_client.metrics() if self.http_client else None,
+            "breaker": self.breaker.snapshot(),
+            "retry_budget": self.retry_budget.snapshot()
+        }
+
+    def _worker_loop(self):
+        while True:
+            if self.breaker.is_open():
+                # Nothing can be sent; leave deliveries queued until the breaker lets a probe through
+                self._wakeup.wait(min(self.poll_interval, max(0.0, self.breaker.retry_at() - time.time())))
+                continue
+
+            try:
+                claimed = self.outbox.claim(limit=1, lease_seconds=self.lease_seconds)
+            except Exception as e:
+                logger.error(f"❌ SOS outbox claim failed: {e}")
+                claimed = []
+
+            if not claimed:
+                # Sleep until a new alert arrives or a retry may have come due
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            for delivery in claimed:
+                self._deliver(delivery)
+
     def _is_valid_phone(self, phone):
         """Simple validation to check if a phone number looks valid."""
         if not phone or not isinstance(phone, (str, int)):
@@ -41,15 +259,226 @@ class SOSService:
             
         return True
 
-    def trigger_sos(self, emergency_contacts=None, user_location=None, user_info=None):
+    def _contact_fields(self, contact):
+        """Returns (name, phone) for a contact dict or a bare phone string."""
+        if isinstance(contact, dict):
+            return contact.get('name', 'Contact'), contact.get('phone')
+        # Handle case where contact might be a string
+        return str(contact), str(contact)
+
+    def _send_sms(self, phone, message_body):
+        """Single provider call; returns the message SID."""
+        message = self.client.messages.create(
+            body=message_body,
+            from_=self.from_number,
+            to=str(phone)
+        )
+        return message.sid
+
+    def _is_retryable(self, error):
+        from twilio.base.exceptions import TwilioRestException
+
+        # Provider 4xx errors (bad number, unverified recipient) will not succeed on retry; 429 will
+        if isinstance(error, TwilioRestException) and error.status is not None:
+            return error.status == 429 or error.status >= 500
+        return True
+
+    def _retry_delay(self, attempts):
+        """
+        Jittered exponential backoff for the given attempt number. Once the
+        retry budget is spent, retries wait the maximum backoff instead.
+        """
+        backoff = min(self.retry_max, self.retry_base * (2 ** (attempts - 1)))
+        if not self.retry_budget.try_retry():
+            SMS_RETRY_BUDGET_EXHAUSTED.inc()
+            backoff = self.retry_max
+        # Half fixed, half random: never immediate, never in lockstep with other deliveries
+        return backoff / 2 + random.uniform(0, backoff / 2)
+
+    def _deliver(self, delivery):
+        """
+        Makes one delivery attempt for a claimed outbox row and records the outcome.
+        Retryable failures are rescheduled with jittered exponential backoff
+        until SOS_MAX_ATTEMPTS is reached. While the provider's circuit is
+        open the delivery is deferred without spending an attempt.
+        Returns the per-contact result.
+        """
+        name, phone = delivery["name"], delivery["phone"]
+        if not self.breaker.allow():
+            error = "SMS provider unavailable (circuit open); delivery deferred"
+            retry_at = max(self.breaker.retry_at(), time.time() + self.poll_interval) + random.uniform(0, self.poll_interval)
+            self.outbox.defer(delivery["id"], error, retry_at)
+            SMS_DELIVERIES.inc("deferred")
+            return {"name": name, "phone": phone, "status": RETRYING, "error": error}
+
+        if delivery["attempts"] == 1:
+            self.retry_budget.record_attempt()
+        start = time.perf_counter()
+        try:
+            sid = self._send_sms(phone, delivery["message_body"])
+        except Exception as e:
+            SMS_SEND_SECONDS.observe(time.perf_counter() - start, "error")
+            error = str(e)
+            attempts = delivery["attempts"]
+            retryable = self._is_retryable(e)
+            # Rejections of one message (bad number) say nothing about the provider's health
+            if retryable:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            if retryable and attempts < self.max_attempts:
+                delay = self._retry_delay(attempts)
+                self.outbox.mark_retry(delivery["id"], error, time.time() + delay)
+                status = RETRYING
+                logger.warning(f"🔁 SMS to {name} ({phone}) failed (attempt {attempts}), retrying in {delay:.1f}s: {e}")
+            else:
+                self.outbox.mark_failed(delivery["id"], error)
+                status = FAILED
+                logger.error(f"❌ Failed to send SMS to {name} ({phone}) after {attempts} attempt(s): {e}")
+            SMS_DELIVERIES.inc(status)
+            return {"name": name, "phone": phone, "status": status, "error": error}
+
+        SMS_SEND_SECONDS.observe(time.perf_counter() - start, "ok")
+        self.breaker.record_success()
+        SMS_DELIVERIES.inc(SENT)
+        self.outbox.mark_sent(delivery["id"], sid)
+        logger.info(f"✅ SMS sent to {name} ({phone}): {sid}")
+        return {"name": name, "phone": phone, "status": SENT, "sid": sid}
+
+    def _fan_out(self, deliveries, timeout=None):
+        """
+        Makes the first attempt for every claimed delivery concurrently on the
+        bounded SMS pool. Each provider call is capped by the HTTP timeout, and
+        the whole fan-out by the dispatch deadline (or `timeout`); deliveries
+        still in flight at the deadline keep running and are reported as "sending".
+        Results keep the order of `deliveries`.
+        """
+        futures = [self._executor.submit(self._deliver, delivery) for delivery in deliveries]
+        wait(futures, timeout=self.dispatch_deadline if timeout is None else timeout)
+
+        results = []
+        for delivery, future in zip(deliveries, futures):
+            if future.done():
+                results.append(future.result())
+            else:
+                logger.error(f"⏱️ SMS to {delivery['name']} did not finish within {self.dispatch_deadline}s")
+                results.append({
+                    "name": delivery["name"],
+                    "phone": delivery["phone"],
+                    "status": SENDING,
+                    "error": f"Still in progress after the {self.dispatch_deadline}s dispatch deadline"
+                })
+        return results
+
+    def _dispatch_sync(self, alert_id, results):
+        """
+        Sync dispatch, for hosts where nothing runs once the response is
+        returned (serverless functions): attempts the alert's deliveries and
+        retries them inside the request until each is final or the dispatch
+        deadline passes. Deliveries still pending at the deadline stay in
+        the outbox. Returns `results` updated in contact order.
+        """
+        deadline = time.monotonic() + self.dispatch_deadline
+        while True:
+            remaining = deadline - time.monotonic()
+            claimed = self.outbox.claim(limit=len(results), lease_seconds=self.lease_seconds, alert_id=alert_id)
+            for delivery, result in zip(claimed, self._fan_out(claimed, timeout=max(0.0, remaining))):
+                results[delivery["position"]] = result
+
+            # The outbox is authoritative for sends that outlived a fan-out
+            alert = self.outbox.get_alert(alert_id)
+            for position, contact in enumerate(alert["contacts_notified"]):
+                if contact["status"] != results[position]["status"] and contact["status"] in FINAL_STATES:
+                    results[position] = {key: contact[key] for key in ("name", "phone", "status", "sid", "error") if key in contact}
+
+            remaining = deadline - time.monotonic()
+            if alert["status"] == "complete" or remaining <= 0:
+                if alert["status"] != "complete":
+                    logger.warning(f"⏱️ SOS alert {alert_id} still has pending deliveries after {self.dispatch_deadline}s")
+                return results
+            # Wait for the next retry to come due
+            time.sleep(min(self.poll_interval, remaining))
+
+    def _dedupe_key(self, contacts, user_info):
+        """
+        Identity used for the suppression window: a hash of the sorted contact
+        phone numbers being alerted, qualified by the user's uid when known.
+        A client that only knows a uid cannot silence alerts to other contacts.
+        """
+        phones = sorted(str(self._contact_fields(contact)[1]) for contact in contacts)
+        digest = hashlib.sha256("|".join(phones).encode("utf-8")).hexdigest()
+        if isinstance(user_info, dict) and user_info.get('uid'):
+            return f"uid:{user_info['uid']}:{digest}"
+        return "contacts:" + digest
+
+    def _deduplicated_response(self, alert_id):
+        """
+        Status of the already-open alert, returned instead of sending again.
+        Location and user details are the stored alert's, i.e. what was actually sent.
+        """
+        alert = self.outbox.get_alert(alert_id) or {"contacts_notified": [], "timestamp": None}
+        contacts = alert["contacts_notified"]
+        any_notified = any(c['status'] in [SENT, MOCK_SENT, QUEUED, SENDING, RETRYING] for c in contacts)
+        logger.info(f"🔕 SOS coalesced into existing alert {alert_id}; no new messages sent")
+        return {
+            "sos_triggered": any_notified,
+            "alert_id": alert_id,
+            "deduplicated": True,
+            "contacts_notified": contacts,
+            "message": ("Emergency response already in progress; no new messages were sent" if any_notified
+                        else "Emergency alert failed or skipped due to invalid contacts"),
+            "timestamp": alert["timestamp"],
+            "user_location": alert.get("user_location"),
+            "user_info": alert.get("user_info")
+        }
+
+    def get_alert_status(self, alert_id):
+        """Per-contact delivery state for an alert, or None if the id is unknown."""
+        return self.outbox.get_alert(alert_id)
+
+    def trigger_sos(self, emergency_contacts=None, user_location=None, user_info=None, idempotency_key=None):
         """
         Triggers SOS alert via Twilio SMS with enhanced information.
+        The alert is written to the durable outbox and returned with its
+        alert_id immediately; background workers deliver it, and
+        get_alert_status reports per-contact progress.
+
+        A trigger that repeats the same user's idempotency key, or arrives
+        for the same user and contacts within SOS_SUPPRESSION_WINDOW_SECONDS
+        of an earlier alert that is still being (or was) delivered to every
+        one of them, sends nothing and returns that alert's status with
+        "deduplicated": True. A trigger that adds a location or a contact the
+        earlier alert is not notifying is always sent.
         
         Args:
             emergency_contacts: List of contacts [{'name': '', 'phone': ''}]
             user_location: Dict with lat/lng or address
             user_info: Dict with user details (name, uid, etc.)
+            idempotency_key: Optional client-supplied key for safe retries
         """
+        start = time.perf_counter()
+        result = self._trigger_sos(emergency_contacts, user_location, user_info, idempotency_key)
+        outcome = self._outcome(result)
+        SOS_TRIGGER_SECONDS.observe(time.perf_counter() - start, outcome)
+        SOS_TRIGGERS.inc(outcome)
+        return result
+
+    def _outcome(self, result):
+        """Metric label for a trigger_sos result."""
+        if "error" in result:
+            return "error"
+        if result.get("deduplicated"):
+            return "deduplicated"
+        if "alert_id" not in result:
+            return "no_contacts"
+        if not result["sos_triggered"]:
+            return "undeliverable"
+        if result.get("degraded"):
+            return "degraded"
+        return "dispatched" if self.can_send() else "mock"
+
+    def _trigger_sos(self, emergency_contacts, user_location, user_info, idempotency_key):
+        """Body of trigger_sos; the public method wraps it with timing and outcome counters."""
         try:
             logger.info("🚨 SOS TRIGGERED - EMERGENCY PROTOCOL ACTIVATED 🚨")
             
@@ -88,93 +517,85 @@ class SOSService:
                 user_name = user_info.get('name', 'User')
                 user_uid = user_info.get('uid', 'Unknown')
         
-            results = []
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-            if self.client and self.from_number:
-                logger.info(f"📱 Sending real SMS alerts to {len(contacts)} contacts...")
-                
-                for contact in contacts:
-                    try:
-                        name = 'Contact'
-                        phone = None
-                        
-                        if isinstance(contact, dict):
-                            name = contact.get('name', 'Contact')
-                            phone = contact.get('phone')
-                        else:
-                            # Handle case where contact might be a string
-                            name = str(contact)
-                            phone = str(contact)
-                        
-                        if not self._is_valid_phone(phone):
-                            logger.warning(f"⏩ Skipping invalid phone number for {name}: {phone}")
-                            results.append({
-                                "name": name,
-                                "phone": str(phone),
-                                "status": "skipped",
-                                "error": "Invalid phone number format",
-                                "timestamp": timestamp
-                            })
-                            continue
-
-                        # Simplified message for better delivery in India (Carrier filters are strict)
-                        message_body = (
-                            f"KIDDOO SOS ALERT: {user_name} needs support. "
-                            f"Time: {timestamp}. {location_info}. "
-                            f"Please check on them."
-                        )
-                        
-                        message = self.client.messages.create(
-                            body=message_body,
-                            from_=self.from_number,
-                            to=str(phone)
-                        )
-                        
-                        logger.info(f"✅ SMS sent to {name} ({phone}): {message.sid}")
-                        results.append({
-                            "name": name, 
-                            "phone": str(phone),
-                            "status": "sent", 
-                            "sid": message.sid,
-                            "timestamp": timestamp
-                        })
-                            
-                    except Exception as e:
-                        logger.error(f"❌ Failed to send SMS to {contact}: {e}")
-                        name = str(contact) if not isinstance(contact, dict) else contact.get('name', 'Unknown')
-                        phone = str(contact) if not isinstance(contact, dict) else contact.get('phone', 'Unknown')
-                        results.append({
-                            "name": name,
-                            "phone": phone,
-                            "status": "failed", 
-                            "error": str(e),
-                            "timestamp": timestamp
-                        })
+
+            # Simplified message for better delivery in India (Carrier filters are strict)
+            message_body = (
+                f"KIDDOO SOS ALERT: {user_name} needs support. "
+                f"Time: {timestamp}. {location_info}. "
+                f"Please check on them."
+            )
+
+            can_send = self.can_send()
+            # With the provider's circuit open the alert is stored but not attempted in-request
+            degraded = self.provider_degraded()
+            if degraded:
+                logger.warning(f"🔌 SMS provider degraded; queueing alerts to {len(contacts)} contacts for later delivery")
+            elif can_send:
+                logger.info(f"📱 Queueing real SMS alerts to {len(contacts)} contacts...")
             else:
                 logger.warning("⚠️  Twilio not configured properly. Using Mock Logic.")
-                results = []
-                for c in contacts:
-                    if isinstance(c, dict):
-                        name = c.get('name', 'Mock Contact')
-                        phone = c.get('phone', 'Unknown')
-                    else:
-                        name = str(c)
-                        phone = str(c)
-                    results.append({
-                        "name": name,
-                        "phone": phone,
-                        "status": "mock_sent",
-                        "timestamp": timestamp
-                    })
-
-            # Final check if anything was actually sent
-            any_notified = any(r['status'] in ['sent', 'mock_sent'] for r in results)
+
+            deliveries = []
+            for contact in contacts:
+                name, phone = self._contact_fields(contact)
+                if not can_send:
+                    if isinstance(contact, dict):
+                        name = contact.get('name', 'Mock Contact')
+                        phone = contact.get('phone', 'Unknown')
+                    deliveries.append({"name": name, "phone": phone, "status": MOCK_SENT})
+                elif not self._is_valid_phone(phone):
+                    logger.warning(f"⏩ Skipping invalid phone number for {name}: {phone}")
+                    deliveries.append({"name": name, "phone": str(phone), "status": SKIPPED, "error": "Invalid phone number format"})
+                else:
+                    deliveries.append({"name": name, "phone": str(phone), "status": QUEUED})
+
+            # Persist before sending so a crash or slow provider never loses the alert
+            alert_id, created = self.outbox.enqueue(
+                message_body, deliveries, timestamp, user_info, user_location,
+                idempotency_key=idempotency_key,
+                dedupe_key=self._dedupe_key(contacts, user_info),
+                dedupe_window=self.suppression_window,
+                idempotency_ttl=self.idempotency_ttl
+            )
+            if not created:
+                return self._deduplicated_response(alert_id)
+            logger.info(f"📬 SOS alert {alert_id} stored in outbox")
+
+            results = [dict(d) for d in deliveries]
+            if can_send and self.dispatch_mode == "sync":
+                results = self._dispatch_sync(alert_id, results)
+            elif can_send:
+                self.start_workers()
+                if self.dispatch_mode == "inline" and not degraded:
+                    queued = sum(d["status"] == QUEUED for d in deliveries)
+                    claimed = self.outbox.claim(limit=queued, lease_seconds=self.lease_seconds, alert_id=alert_id)
+                    attempted = {d["position"]: r for d, r in zip(claimed, self._fan_out(claimed))}
+                    results = [attempted.get(position, r) for position, r in enumerate(results)]
+                else:
+                    self._wakeup.set()
+
+            for r in results:
+                r["timestamp"] = timestamp
+
+            # Final check if anything was sent or is on its way
+            any_notified = any(r['status'] in [SENT, MOCK_SENT, QUEUED, SENDING, RETRYING] for r in results)
+
+            if degraded and any_notified:
+                message = "Emergency alert stored; the SMS provider is unavailable and delivery will resume automatically"
+            elif any_notified:
+                message = "Emergency response sequence initiated"
+            else:
+                message = "Emergency alert failed or skipped due to invalid contacts"
 
             return {
                 "sos_triggered": any_notified,
+                "alert_id": alert_id,
+                "deduplicated": False,
+                "degraded": degraded,
+                "provider_status": self.breaker.state if can_send else "mock",
                 "contacts_notified": results,
-                "message": "Emergency response sequence initiated" if any_notified else "Emergency alert failed or skipped due to invalid contacts",
+                "message": message,
                 "timestamp": timestamp,
                 "user_location": user_location,
                 "user_info": user_info
@@ -193,3 +614,21 @@ class SOSService:
             "sos_triggered": False,
             "message": "No emergency action required"
         }
+
+
+_shared_service = None
+_shared_service_lock = threading.Lock()
+
+
+def get_sos_service():
+    """
+    Process-wide SOSService, created on first use. The API endpoints and
+    AnalysisService share it, so each process has one Twilio client, one
+    connection pool and one set of outbox workers.
+    """
+    global _shared_service
+    if _shared_service is None:
+        with _shared_service_lock:
+            if _shared_service is None:
+                _shared_service = SOSService()
+    return _shared_service
@@ -0,0 +1,110 @@
+from nlp.preprocessing import clean_text
+from nlp.analysis_context import AnalysisContext
+from utils.scoring import calculate_intensity
+from utils.constants import CRITICAL
+import re
+
+# The unfinished word at the end of the raw text
+TRAILING_WORD = re.compile(r"\S+$")
+
+
+class StreamingAnalysis:
+    """
+    Live analysis of a message that arrives as text deltas while the user types.
+
+    The lexicon automaton state and the unfinished trailing token are kept
+    between deltas, so each delta only costs the new characters. The trailing
+    token is evaluated tentatively on every delta, so keyword feedback follows
+    each keystroke. Critical is only reported once the word completing the
+    phrase is finished (a word boundary follows or the stream closes), so
+    "di" + "e" + "t" never flashes Critical. Sentiment needs the whole text
+    and is only recomputed when a word is completed or the matched keywords
+    change. The final update equals what /api/analyze reports for
+    the full text (without dispatching SOS; the submitted message does that).
+    """
+
+    def __init__(self, analysis_service, max_chars=None):
+        self.service = analysis_service
+        self.keyword_extractor = analysis_service.keyword_extractor
+        self.sentiment_analyzer = analysis_service.sentiment_analyzer
+        self.max_chars = max_chars
+
+        self.text = ""
+        self._cleaned = ""
+        # One lexicon version for the whole stream, even if a reload lands meanwhile
+        self._lexicon = self.keyword_extractor.registry.active
+        self._match = self._lexicon.matcher.stream()
+
+        self._sentiment = None
+        self._sentiment_keywords = None
+        self._last_emitted = None
+        self.closed = False
+
+    def feed(self, delta):
+        """
+        Consumes the next piece of typed text. Returns an update dict when the
+        classified state or intensity changed, otherwise None.
+        """
+        if self.closed:
+            raise ValueError("Stream already closed")
+        if not delta:
+            return None
+        if self.max_chars is not None and len(self.text) + len(delta) > self.max_chars:
+            raise ValueError(f"Stream exceeds {self.max_chars} characters")
+
+        self.text += delta
+
+        cleaned_delta = clean_text(delta)
+        self._cleaned += cleaned_delta
+        completed = self._match.feed(cleaned_delta)
+
+        update = self._evaluate(self._match.snapshot(), self._match.current_tokens(), refresh_sentiment=completed > 0)
+        if update["key"][0] == CRITICAL and self._match.pending:
+            # The word being typed may still turn out harmless ("die" -> "diet"): judge the
+            # text up to it. Cleaning only deletes characters, so it is the last raw \S+ run
+            text = TRAILING_WORD.sub("", self.text)
+            cleaned = self._cleaned[:self._match.pending_start]
+            update = self._evaluate(self._match.snapshot(tentative=False), list(self._match.tokens),
+                                    refresh_sentiment=True, text=text, cleaned=cleaned)
+        if update["key"] == self._last_emitted:
+            return None
+        self._last_emitted = update["key"]
+        return update["event"]
+
+    def close(self):
+        """
+        Ends the stream and returns the final update, which is always emitted.
+        """
+        self.closed = True
+        lexicon_match = self._match.close()
+        update = self._evaluate(lexicon_match, list(self._match.tokens), refresh_sentiment=True)
+        event = update["event"]
+        event["final"] = True
+        return event
+
+    def _evaluate(self, lexicon_match, tokens, refresh_sentiment, text=None, cleaned=None):
+        category_matches = self.keyword_extractor.weight_category_counts(lexicon_match["category_counts"])
+        context = AnalysisContext(self.text if text is None else text, self._cleaned if cleaned is None else cleaned,
+                                  tokens, lexicon_match, category_matches, self._lexicon.version)
+
+        # Sentiment only moves when a word completes or the keyword overrides change
+        if refresh_sentiment or self._sentiment is None or lexicon_match["keywords"] != self._sentiment_keywords:
+            self._sentiment = self.sentiment_analyzer.analyze(context.text, context, use_cache=False)
+            self._sentiment_keywords = list(lexicon_match["keywords"])
+        context.sentiment = self._sentiment
+
+        state = self.service.state_classifier.classify(context)
+        intensity = calculate_intensity(context.sentiment_score, context.total_match_weight)
+
+        return {
+            "key": (state, intensity),
+            "event": {
+                "classified_state": state,
+                "intensity_score": intensity,
+                "critical": state == CRITICAL,
+                "sentiment_analysis": self._sentiment,
+                "extracted_keywords": context.keywords,
+                "characters": len(self.text),
+                "final": False
+            }
+        }
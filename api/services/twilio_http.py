@@ -0,0 +1,159 @@
+import logging
+import os
+import threading
+from requests.adapters import HTTPAdapter
+from twilio.http.http_client import TwilioHttpClient
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+logger = logging.getLogger(__name__)
+
+TWILIO_API_URL = "https://api.twilio.com"
+
+
+class ConnectionStats:
+    """
+    Process-wide counters for sockets opened to the SMS provider.
+    Every connect() is a TCP + TLS handshake; a request that does not
+    trigger one went out over a kept-alive pooled connection.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connects = 0
+        self.pid = os.getpid()
+
+    def _reset_after_fork(self):
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.requests = 0
+            self.connects = 0
+
+    def record_request(self):
+        with self._lock:
+            self._reset_after_fork()
+            self.requests += 1
+
+    def record_connect(self):
+        with self._lock:
+            self._reset_after_fork()
+            self.connects += 1
+
+    def snapshot(self):
+        with self._lock:
+            self._reset_after_fork()
+            reused = max(0, self.requests - self.connects)
+            return {
+                "requests": self.requests,
+                "connections_opened": self.connects,
+                "connections_reused": reused,
+                "reuse_ratio": round(reused / self.requests, 4) if self.requests else 0.0
+            }
+
+
+CONNECTION_STATS = ConnectionStats()
+
+
+class _CountingHTTPConnection(HTTPConnection):
+    def connect(self):
+        CONNECTION_STATS.record_connect()
+        super().connect()
+
+
+class _CountingHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        CONNECTION_STATS.record_connect()
+        super().connect()
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _CountingHTTPConnection
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _CountingHTTPSConnection
+
+
+class _KeepAliveAdapter(HTTPAdapter):
+    """
+    HTTPAdapter whose pools count every new socket in CONNECTION_STATS.
+    """
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        super().init_poolmanager(connections, maxsize, block, **pool_kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool
+        }
+
+
+class PooledTwilioHttpClient(TwilioHttpClient):
+    """
+    Twilio HTTP client backed by one keep-alive connection pool per process.
+
+    The pool holds up to `pool_size` connections (one per concurrent SMS
+    worker), so repeated sends reuse an established TLS session instead of
+    handshaking on the critical path. Connections inherited across a fork
+    are discarded and the pool is rebuilt in the child.
+
+    `timeout` bounds each socket read; `connect_timeout` separately bounds
+    establishing the connection, so an unreachable provider fails in
+    seconds rather than after the read timeout.
+
+    `base_url` redirects every call to another host (e.g. a local fake of
+    the Messages API, see benchmarks/fake_twilio.py) in place of
+    https://api.twilio.com.
+    """
+
+    def __init__(self, timeout=None, pool_size=8, base_url=None, connect_timeout=None):
+        super().__init__(pool_connections=True, timeout=timeout)
+        if connect_timeout:
+            # requests takes (connect, read); the Twilio base class only validates a single number
+            self.timeout = (connect_timeout, timeout)
+        self.pool_size = max(1, int(pool_size))
+        self.base_url = base_url.rstrip("/") if base_url else None
+        self._pid = None
+        self._pool_lock = threading.Lock()
+        self._mount_pool()
+
+    def _mount_pool(self):
+        adapter = _KeepAliveAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._pid = os.getpid()
+
+    def reset_pool(self):
+        """Closes every pooled connection and mounts a fresh pool."""
+        with self._pool_lock:
+            self.session.close()
+            self._mount_pool()
+
+    def _ensure_pool(self):
+        # Sockets must not be shared between a forked worker and its parent
+        if self._pid != os.getpid():
+            self.reset_pool()
+
+    def request(self, method, url, params=None, data=None, headers=None, auth=None, timeout=None, allow_redirects=False):
+        self._ensure_pool()
+        if self.base_url and url.startswith(TWILIO_API_URL):
+            url = self.base_url + url[len(TWILIO_API_URL):]
+        CONNECTION_STATS.record_request()
+        return super().request(method, url, params, data, headers, auth, timeout, allow_redirects)
+
+    def warm_up(self, url=TWILIO_API_URL):
+        """
+        Opens a connection to the provider ahead of the first alert so the
+        TCP and TLS handshake happen off the critical path. Returns True
+        when the connection was established.
+        """
+        try:
+            self.request("HEAD", url)
+            logger.info("🔥 Twilio connection pre-warmed")
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️  Twilio connection warm-up failed: {e}")
+            return False
+
+    def metrics(self):
+        return dict(CONNECTION_STATS.snapshot(), pool_size=self.pool_size)
@@ -15,8 +15,11 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Initialize SOS service
+# A serverless function is frozen or torn down once it returns, so background
+# outbox workers cannot be relied on: every alert is sent, and retried, in the request.
+# The service is this function's own, so the mode never leaks into other importers.
 try:
-    sos_service = SOSService()
+    sos_service = SOSService(dispatch_mode="sync")
     logger.info("✅ SOS service initialized")
 except Exception as e:
     logger.error(f"❌ Failed to initialize SOS service: {e}")
@@ -34,7 +37,7 @@ def handler(request):
                 "Content-Type": "application/json",
                 "Access-Control-Allow-Origin": "*",
                 "Access-Control-Allow-Methods": "POST, GET, OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type"
+                "Access-Control-Allow-Headers": "Content-Type, Idempotency-Key"
             },
             "body": json.dumps({})
         }
@@ -47,7 +50,7 @@ def handler(request):
                 "Content-Type": "application/json",
                 "Access-Control-Allow-Origin": "*",
                 "Access-Control-Allow-Methods": "POST, OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type"
+                "Access-Control-Allow-Headers": "Content-Type, Idempotency-Key"
             },
             "body": json.dumps({"error": "Method not allowed"})
         }
@@ -61,7 +64,7 @@ def handler(request):
                 "Content-Type": "application/json",
                 "Access-Control-Allow-Origin": "*",
                 "Access-Control-Allow-Methods": "POST, OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type"
+                "Access-Control-Allow-Headers": "Content-Type, Idempotency-Key"
             },
             "body": json.dumps({"error": "SOS service failed to initialize. Check logs."})
         }
@@ -78,7 +81,7 @@ def handler(request):
                     "Content-Type": "application/json",
                     "Access-Control-Allow-Origin": "*",
                     "Access-Control-Allow-Methods": "POST, OPTIONS",
-                    "Access-Control-Allow-Headers": "Content-Type"
+                    "Access-Control-Allow-Headers": "Content-Type, Idempotency-Key"
                 },
                 "body": json.dumps({"error": "Invalid JSON in request body"})
             }
@@ -88,10 +91,12 @@ def handler(request):
         emergency_contacts = body.get('emergency_contacts', [])
         user_location = body.get('user_location')  # Optional
         user_info = body.get('user_info')          # Optional
+        headers = getattr(request, 'headers', None) or {}
+        idempotency_key = headers.get('Idempotency-Key') or body.get('idempotency_key')
 
         logger.info(f"Processing SOS with {len(emergency_contacts)} contacts")
 
-        result = sos_service.trigger_sos(emergency_contacts, user_location, user_info)
+        result = sos_service.trigger_sos(emergency_contacts, user_location, user_info, idempotency_key)
 
         return {
             "statusCode": 200,
@@ -99,7 +104,7 @@ def handler(request):
                 "Content-Type": "application/json",
                 "Access-Control-Allow-Origin": "*",
                 "Access-Control-Allow-Methods": "POST, OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type"
+                "Access-Control-Allow-Headers": "Content-Type, Idempotency-Key"
             },
             "body": json.dumps(result)
         }
@@ -112,7 +117,7 @@ def handler(request):
                 "Content-Type": "application/json",
                 "Access-Control-Allow-Origin": "*",
                 "Access-Control-Allow-Methods": "POST, OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type"
+                "Access-Control-Allow-Headers": "Content-Type, Idempotency-Key"
             },
             "body": json.dumps({"error": f"Internal server error: {str(e)}"})
         }
\ No newline at end of file
@@ -0,0 +1,244 @@
+"""
+Tests for incremental request body parsing (utils/json_stream.py) and
+the /api/analyze body limits.
+Run with: python -m pytest test_json_stream.py
+"""
+
+import io
+import json
+import os
+import random
+import sys
+
+import pytest
+from werkzeug.test import EnvironBuilder, run_wsgi_app
+
+# Add current directory to path
+sys.path.append(os.path.dirname(__file__))
+
+from utils.json_stream import BodyTooLarge, read_json_object
+
+FIELDS = ("message", "mode", "emergency_contacts", "user_info", "session_id")
+TAILS = {"history": (3, ("classified_state",))}
+CHUNK_SIZES = (1, 2, 3, 5, 7, 16, 64, 16384)
+
+
+def expected(body):
+    """What read_json_object must return, computed from the fully decoded body."""
+    document = json.loads(body)
+    data = {key: document[key] for key in FIELDS if key in document}
+    if "history" in document:
+        history = document["history"]
+        if isinstance(history, list):
+            history = [{k: v for k, v in item.items() if k == "classified_state"} if isinstance(item, dict) else item
+                       for item in history[-3:]]
+        data["history"] = history
+    return data
+
+
+def parse(body, chunk_size, max_bytes=10 ** 9):
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    return read_json_object(io.BytesIO(body), FIELDS, max_bytes, TAILS, chunk_size=chunk_size)
+
+
+BODIES = [
+    '{}',
+    '{"message": "hi"}',
+    ' \n {"message" : "hi" , "mode":"user"} \n',
+    '{"message": "I want to die", "mode": "review", "session_id": "s1", "user_info": {"uid": "u1", "name": "A"}}',
+    '{"message": "x", "history": []}',
+    '{"message": "x", "history": [{"classified_state": "Critical Distress", "agent_response": {"text": "long"}}]}',
+    '{"history": [1, "two", null, {"classified_state": "Normal"}, {"other": 1}, [3]], "message": "x"}',
+    '{"history": {"not": "a list"}}',
+    '{"history": null, "message": null}',
+    '{"extra": [[[{"deep": [1, 2, {"x": "]}"}]}]]], "message": "after nested skip"}',
+    '{"extra": "a string with \\"quotes\\", commas, ] and }", "message": "ok"}',
+    '{"numbers": [0, -1, 12345678901234567890, 1.5, -2.5e10, 1E-3, 3e+2], "message": 12345}',
+    '{"message": -2.5e10}',
+    '{"message": 1234567}',
+    '{"message": true, "mode": false, "session_id": null}',
+    '{"message": "héllo ☃ 😀 日本語", "user_info": {"name": "Zoë"}}',
+    '{"message": "\\u00e9\\ud83d\\ude00 escaped"}',
+    '{"message": "first", "message": "last wins"}',
+    '{"history": [{"classified_state": "Normal"}], "history": [{"classified_state": "Stress"}]}',
+    '{"emergency_contacts": [{"name": "Mom", "phone": "+15550000001"}], "message": ""}',
+]
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+@pytest.mark.parametrize("body", BODIES)
+def test_matches_full_decode(body, chunk_size):
+    assert parse(body, chunk_size) == expected(body)
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_history_keeps_last_window(chunk_size):
+    history = [{"classified_state": f"state-{i}", "agent_response": {"text": "x" * 50}} for i in range(100)]
+    body = json.dumps({"message": "hi", "history": history})
+    assert parse(body, chunk_size)["history"] == [{"classified_state": f"state-{i}"} for i in (97, 98, 99)]
+
+
+def test_window_of_zero_keeps_nothing():
+    body = json.dumps({"history": [{"classified_state": "Normal"}] * 5})
+    tails = {"history": (0, ("classified_state",))}
+    for chunk_size in (1, 16384):
+        assert read_json_object(io.BytesIO(body.encode()), FIELDS, 10 ** 6, tails, chunk_size=chunk_size) == {"history": []}
+
+
+@pytest.mark.parametrize("chunk_size", (1, 2, 3))
+def test_utf8_split_across_chunks(chunk_size):
+    # Multi-byte characters land on every possible chunk boundary
+    for prefix in range(4):
+        body = '{"message": "' + "a" * prefix + '😀é☃"}'
+        assert parse(body, chunk_size) == {"message": "a" * prefix + "😀é☃"}
+
+
+def test_random_documents():
+    rng = random.Random(7)
+
+    def value(depth=0):
+        roll = rng.random()
+        if depth > 3 or roll < 0.5:
+            return rng.choice([0, -7, 2 ** 70, -1.25e-7, 3.5, "", "é\"\\☃", True, False, None])
+        if roll < 0.75:
+            return [value(depth + 1) for _ in range(rng.randint(0, 4))]
+        return {rng.choice(["a", "message", "history", "classified_state", "ü"]): value(depth + 1)
+                for _ in range(rng.randint(0, 4))}
+
+    for _ in range(300):
+        document = {key: value() for key in rng.sample(list(FIELDS) + ["history", "x", "y"], rng.randint(0, 8))}
+        body = json.dumps(document, indent=rng.choice([None, 2]), ensure_ascii=rng.random() < 0.5)
+        for chunk_size in (1, 3, 16384):
+            assert parse(body, chunk_size) == expected(body)
+
+
+MALFORMED = [
+    b'',
+    b'   ',
+    b'[]',
+    b'"just a string"',
+    b'42',
+    b'{"message": "hi"',
+    b'{"message": "hi",}',
+    b'{"message" "hi"}',
+    b'{message: "hi"}',
+    b'{1: "hi"}',
+    b'{"message": "hi"} trailing',
+    b'{"message": "hi"}{}',
+    b'{"extra": [1, 2}',
+    b'{"extra": [1 2]}',
+    b'{"message": tru}',
+    b'{"message": "unterminated}',
+    b'{"message": 1.}',
+    b'\xff\xfe{}',
+    b'{"message": "\xe2\x98"}',
+]
+
+
+@pytest.mark.parametrize("chunk_size", (1, 2, 16384))
+@pytest.mark.parametrize("body", MALFORMED)
+def test_malformed_bodies_raise_value_error(body, chunk_size):
+    with pytest.raises(ValueError):
+        parse(body, chunk_size)
+
+
+def nested(depth):
+    """A body whose ignored field nests `depth` levels of arrays and objects."""
+    return '{"extra": ' + '[{"x": ' * (depth // 2) + '1' + '}]' * (depth // 2) + ', "message": "after deep skip"}'
+
+
+@pytest.mark.parametrize("chunk_size", (1, 64, 16384))
+def test_deeply_nested_ignored_field(chunk_size):
+    # A recursive walk takes about two frames per level and would pass the recursion limit
+    body = nested(600)
+    assert parse(body, chunk_size) == expected(body) == {"message": "after deep skip"}
+
+
+@pytest.mark.parametrize("chunk_size", (64, 16384))
+def test_nesting_past_decoder_limit_raises_value_error(chunk_size):
+    body = '{"message": ' + "[" * 100000 + "]" * 100000 + "}"
+    with pytest.raises(ValueError):
+        parse(body, chunk_size)
+
+
+@pytest.mark.parametrize("chunk_size", (1, 7, 16384))
+def test_body_over_limit_raises(chunk_size):
+    body = json.dumps({"message": "hi", "history": [{"classified_state": "Normal"}] * 1000})
+    with pytest.raises(BodyTooLarge):
+        parse(body, chunk_size, max_bytes=len(body) - 1)
+    assert parse(body, chunk_size, max_bytes=len(body))["message"] == "hi"
+
+
+def test_stops_reading_at_limit():
+    stream = io.BytesIO(b'{"extra": "' + b"a" * 100000 + b'"}')
+    with pytest.raises(BodyTooLarge):
+        read_json_object(stream, FIELDS, 1000, TAILS, chunk_size=256)
+    assert stream.tell() < 2000
+
+
+@pytest.fixture(scope="module")
+def app_client():
+    for variable in ("TWILIO_ACCOUNT_SID", "TWILIO_AUTH_TOKEN", "TWILIO_PHONE_NUMBER"):
+        os.environ.pop(variable, None)
+    os.environ["SESSION_STORE"] = "none"
+    import index
+    return index, index.app.test_client()
+
+
+@pytest.mark.parametrize("body", [b'', b'[1, 2]', b'{"message": "hi",', b'{"message": "hi"} x', b'\xff'])
+def test_analyze_rejects_malformed_body_with_400(app_client, body):
+    _, client = app_client
+    response = client.post('/api/analyze', data=body, content_type='application/json')
+    assert response.status_code == 400
+    assert "Invalid JSON" in response.get_json()["error"]
+
+
+def test_analyze_accepts_deeply_nested_ignored_field(app_client):
+    _, client = app_client
+    response = client.post('/api/analyze', data=nested(600), content_type='application/json')
+    assert response.status_code == 200
+    # Far deeper than any decoder recursion limit; skipping never recurses
+    body = '{"message": "hi", "extra": ' + "[" * 100000 + "]" * 100000 + "}"
+    response = client.post('/api/analyze', data=body, content_type='application/json')
+    assert response.status_code == 200
+
+
+def test_analyze_rejects_too_deep_body_with_400(app_client):
+    _, client = app_client
+    body = '{"message": ' + "[" * 100000 + "]" * 100000 + "}"
+    response = client.post('/api/analyze', data=body, content_type='application/json')
+    assert response.status_code == 400
+
+
+def test_analyze_rejects_large_body_with_413(app_client, monkeypatch):
+    index, client = app_client
+    monkeypatch.setattr(index, "MAX_ANALYZE_BODY", 1000)
+    body = json.dumps({"message": "hi", "history": [{"classified_state": "Normal"}] * 100}).encode()
+    response = client.post('/api/analyze', data=body, content_type='application/json')
+    assert response.status_code == 413
+
+
+def test_analyze_413_without_content_length(app_client, monkeypatch):
+    index, _ = app_client
+    monkeypatch.setattr(index, "MAX_ANALYZE_BODY", 1000)
+    body = json.dumps({"message": "hi", "history": [{"classified_state": "Normal"}] * 100}).encode()
+    # No Content-Length and a terminated input stream, as a chunked upload arrives
+    environ = EnvironBuilder(path='/api/analyze', method='POST', input_stream=io.BytesIO(body),
+                             content_type='application/json').get_environ()
+    del environ["CONTENT_LENGTH"]
+    environ["wsgi.input_terminated"] = True
+    _, status, _ = run_wsgi_app(index.app, environ, buffered=True)
+    assert status.startswith("413")
+
+
+@pytest.mark.parametrize("tail", ["Normal", "Critical Distress"])
+def test_analyze_matches_full_history(app_client, tail):
+    index, client = app_client
+    history = [{"classified_state": "Stress", "agent_response": {"text": "x" * 100}}] * 500
+    history += [{"classified_state": tail}] * 3
+    message = "I feel a bit sad today"
+    response = client.post('/api/analyze', json={"message": message, "mode": "review", "history": history})
+    assert response.status_code == 200
+    full = json.loads(index.dumps(index.analysis_service.perform_full_analysis(message, "review", history)))
+    assert response.get_json()["agent_response"] == full["agent_response"]
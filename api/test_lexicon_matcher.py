@@ -0,0 +1,43 @@
+"""
+Tests for lexicon phrase normalization and matching.
+Run with: python -m pytest test_lexicon_matcher.py
+"""
+
+import os
+import sys
+
+# Add current directory to path
+sys.path.append(os.path.dirname(__file__))
+
+from nlp.lexicon_matcher import LexiconMatcher, normalize_phrase
+from nlp.preprocessing import clean_text
+
+LEXICON = {
+    "Critical Distress": ["self-harm", "want to die", "calling 988"],
+    "Normal": ["self-care"]
+}
+
+
+def keywords(text):
+    return LexiconMatcher(LEXICON).match(clean_text(text))["keywords"]
+
+
+def test_hyphenated_phrases_are_cleaned_like_messages():
+    assert normalize_phrase("self-harm") == ("selfharm",)
+    assert normalize_phrase("Want to  die") == ("want", "to", "die")
+
+
+def test_phrase_with_word_that_cleans_away_is_dropped():
+    assert normalize_phrase("calling 988") is None
+
+
+def test_hyphenated_critical_phrase_matches():
+    # Behavior change from the substring matcher, which never matched "self-harm"
+    assert keywords("I keep thinking about self-harm") == ["self-harm"]
+    assert keywords("I keep thinking about selfharm") == ["self-harm"]
+    assert keywords("I keep thinking about self harm") == []
+
+
+def test_matches_whole_words_only():
+    assert keywords("I am on a diet and want to dine") == []
+    assert keywords("some days I want to die") == ["want to die"]
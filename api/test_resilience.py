@@ -0,0 +1,165 @@
+"""
+Tests for the SMS provider circuit breaker and retry budget.
+Run with: python -m pytest test_resilience.py
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add current directory to path
+sys.path.append(os.path.dirname(__file__))
+
+from services import resilience
+from services.resilience import CircuitBreaker, RetryBudget, CLOSED, OPEN, HALF_OPEN
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(resilience.time, "monotonic", fake)
+    return fake
+
+
+def make_breaker(transitions=None, **overrides):
+    settings = {"failure_rate": 0.5, "min_calls": 4, "window_seconds": 30.0, "cooldown_seconds": 10.0}
+    settings.update(overrides)
+    return CircuitBreaker(on_transition=transitions.append if transitions is not None else None, **settings)
+
+
+def test_breaker_stays_closed_below_min_calls(clock):
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.record_failure()
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+def test_breaker_stays_closed_below_failure_rate(clock):
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.record_success()
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CLOSED
+
+
+def test_breaker_opens_at_failure_rate(clock):
+    transitions = []
+    breaker = make_breaker(transitions)
+    breaker.record_success()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.is_open()
+    assert not breaker.allow()
+    assert transitions == [OPEN]
+    assert breaker.snapshot()["times_opened"] == 1
+
+
+def test_old_outcomes_leave_the_window(clock):
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.record_failure()
+    clock.advance(31)
+    breaker.record_failure()
+    # Only one failure is left in the window, below min_calls
+    assert breaker.state == CLOSED
+    assert breaker.snapshot()["calls_in_window"] == 1
+
+
+def test_breaker_half_opens_after_cooldown(clock):
+    transitions = []
+    breaker = make_breaker(transitions)
+    for _ in range(4):
+        breaker.record_failure()
+    clock.advance(9.9)
+    assert breaker.state == OPEN
+    clock.advance(0.1)
+    assert breaker.state == HALF_OPEN
+    assert transitions == [OPEN, HALF_OPEN]
+
+
+def test_half_open_lets_probe_calls_through(clock):
+    breaker = make_breaker(probe_calls=1)
+    for _ in range(4):
+        breaker.record_failure()
+    clock.advance(10)
+    assert breaker.allow()
+    # The probe slot is taken until its outcome is recorded
+    assert not breaker.allow()
+
+
+def test_successful_probe_closes_breaker(clock):
+    transitions = []
+    breaker = make_breaker(transitions)
+    for _ in range(4):
+        breaker.record_failure()
+    clock.advance(10)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert transitions == [OPEN, HALF_OPEN, CLOSED]
+    # Closing starts a fresh window
+    assert breaker.snapshot()["calls_in_window"] == 0
+
+
+def test_failed_probe_reopens_breaker(clock):
+    transitions = []
+    breaker = make_breaker(transitions)
+    for _ in range(4):
+        breaker.record_failure()
+    clock.advance(10)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert transitions == [OPEN, HALF_OPEN, OPEN]
+    assert breaker.snapshot()["retry_in_seconds"] == 10.0
+
+
+def test_retry_at_is_now_unless_open(clock):
+    breaker = make_breaker()
+    before = resilience.time.time()
+    assert breaker.retry_at() >= before
+    for _ in range(4):
+        breaker.record_failure()
+    assert breaker.retry_at() >= before + 9.9
+
+
+def test_retry_budget_allows_minimum_without_traffic(clock):
+    budget = RetryBudget(ratio=0.2, min_per_second=0.5, window_seconds=10.0)
+    assert all(budget.try_retry() for _ in range(5))
+    assert not budget.try_retry()
+    assert budget.snapshot()["exhausted"] == 1
+
+
+def test_retry_budget_grows_with_first_attempts(clock):
+    budget = RetryBudget(ratio=0.2, min_per_second=0.0, window_seconds=10.0)
+    assert not budget.try_retry()
+    for _ in range(10):
+        budget.record_attempt()
+    assert budget.try_retry()
+    assert budget.try_retry()
+    assert not budget.try_retry()
+    assert budget.snapshot()["retries_allowed"] == 2
+
+
+def test_retry_budget_refills_as_window_moves(clock):
+    budget = RetryBudget(ratio=0.0, min_per_second=0.1, window_seconds=10.0)
+    assert budget.try_retry()
+    assert not budget.try_retry()
+    clock.advance(10.1)
+    assert budget.try_retry()
@@ -0,0 +1,182 @@
+"""
+Tests for SOS alert deduplication in the outbox and SOSService.
+Run with: python -m pytest test_sos_dedupe.py
+"""
+
+import os
+import sys
+
+# Add current directory to path
+sys.path.append(os.path.dirname(__file__))
+
+from services.sos_outbox import SOSOutbox, QUEUED, SKIPPED, MOCK_SENT
+from services.sos_service import SOSService
+
+TIMESTAMP = "2024-01-01 00:00:00"
+WINDOW = 300
+TTL = 86400
+
+CONTACTS = [{"name": "Mom", "phone": "+15550000001"}, {"name": "Dad", "phone": "+15550000002"}]
+LOCATION = {"lat": 17.385, "lng": 78.4867}
+
+
+def make_outbox(tmp_path):
+    return SOSOutbox(str(tmp_path / "outbox.db"))
+
+
+def enqueue(outbox, dedupe_key="uid:u1", idempotency_key=None, status=QUEUED, contacts=CONTACTS, user_location=None):
+    deliveries = [dict(contact, status=status) for contact in contacts]
+    return outbox.enqueue("SOS", deliveries, TIMESTAMP, {"uid": "u1"}, user_location,
+                          idempotency_key=idempotency_key, dedupe_key=dedupe_key,
+                          dedupe_window=WINDOW, idempotency_ttl=TTL)
+
+
+def fail_all(outbox):
+    for delivery in outbox.claim(limit=10):
+        outbox.mark_failed(delivery["id"], "provider outage")
+
+
+def test_repeat_trigger_coalesces_into_open_alert(tmp_path):
+    outbox = make_outbox(tmp_path)
+    first, created = enqueue(outbox)
+    assert created
+    assert enqueue(outbox) == (first, False)
+
+
+def test_repeat_trigger_coalesces_into_delivered_alert(tmp_path):
+    outbox = make_outbox(tmp_path)
+    first, _ = enqueue(outbox)
+    for delivery in outbox.claim(limit=10):
+        outbox.mark_sent(delivery["id"], "SM123")
+    assert enqueue(outbox) == (first, False)
+
+
+def test_failed_alert_does_not_suppress_new_one(tmp_path):
+    outbox = make_outbox(tmp_path)
+    first, _ = enqueue(outbox)
+    fail_all(outbox)
+
+    second, created = enqueue(outbox)
+    assert created
+    assert second != first
+    assert [c["status"] for c in outbox.get_alert(second)["contacts_notified"]] == [QUEUED, QUEUED]
+
+
+def test_skipped_alert_does_not_suppress_new_one(tmp_path):
+    outbox = make_outbox(tmp_path)
+    first, _ = enqueue(outbox, status=SKIPPED)
+    second, created = enqueue(outbox)
+    assert created
+    assert second != first
+
+
+def test_alert_that_failed_a_contact_does_not_suppress(tmp_path):
+    outbox = make_outbox(tmp_path)
+    first, _ = enqueue(outbox)
+    claimed = outbox.claim(limit=10)
+    outbox.mark_failed(claimed[0]["id"], "provider outage")
+    outbox.mark_sent(claimed[1]["id"], "SM123")
+    second, created = enqueue(outbox)
+    assert created
+    assert second != first
+
+
+def test_skipped_contact_in_both_alerts_still_suppresses(tmp_path):
+    outbox = make_outbox(tmp_path)
+    deliveries = [{"name": "Mom", "phone": "+15550000001", "status": QUEUED},
+                  {"name": "Bad", "phone": "12", "status": SKIPPED}]
+    first, _ = outbox.enqueue("SOS", deliveries, TIMESTAMP, dedupe_key="uid:u1", dedupe_window=WINDOW)
+    assert outbox.enqueue("SOS", deliveries, TIMESTAMP, dedupe_key="uid:u1", dedupe_window=WINDOW) == (first, False)
+
+
+def test_added_contact_is_not_suppressed(tmp_path):
+    outbox = make_outbox(tmp_path)
+    first, _ = enqueue(outbox, contacts=CONTACTS[:1])
+    second, created = enqueue(outbox)
+    assert created
+    assert second != first
+
+
+def test_added_location_is_not_suppressed(tmp_path):
+    outbox = make_outbox(tmp_path)
+    first, _ = enqueue(outbox)
+    second, created = enqueue(outbox, user_location=LOCATION)
+    assert created
+    assert second != first
+    # The same location again adds nothing, and neither does a trigger without one
+    assert enqueue(outbox, user_location=LOCATION) == (second, False)
+    assert enqueue(outbox) == (second, False)
+    third, created = enqueue(outbox, user_location={"lat": 17.4, "lng": 78.5})
+    assert created
+
+
+def test_other_user_is_not_suppressed(tmp_path):
+    outbox = make_outbox(tmp_path)
+    first, _ = enqueue(outbox, dedupe_key="uid:u1")
+    second, created = enqueue(outbox, dedupe_key="uid:u2")
+    assert created
+    assert second != first
+
+
+def test_idempotency_key_returns_same_alert_even_after_failure(tmp_path):
+    outbox = make_outbox(tmp_path)
+    first, _ = enqueue(outbox, idempotency_key="key-1")
+    fail_all(outbox)
+    assert enqueue(outbox, idempotency_key="key-1") == (first, False)
+
+
+def test_idempotency_key_is_scoped_to_the_user(tmp_path):
+    outbox = make_outbox(tmp_path)
+    first, _ = enqueue(outbox, dedupe_key="uid:u1", idempotency_key="shared-key")
+    second, created = enqueue(outbox, dedupe_key="uid:u2", idempotency_key="shared-key")
+    assert created
+    assert second != first
+    # Each user keeps getting their own alert back for the key
+    assert enqueue(outbox, dedupe_key="uid:u1", idempotency_key="shared-key") == (first, False)
+    assert enqueue(outbox, dedupe_key="uid:u2", idempotency_key="shared-key") == (second, False)
+
+
+def test_suppression_window_disabled(tmp_path):
+    outbox = make_outbox(tmp_path)
+    first, _ = enqueue(outbox)
+    deliveries = [{"name": "Mom", "phone": "+15550000001", "status": QUEUED}]
+    second, created = outbox.enqueue("SOS", deliveries, TIMESTAMP, dedupe_key="uid:u1", dedupe_window=0)
+    assert created
+    assert second != first
+
+
+def make_service(tmp_path, monkeypatch):
+    # Mock mode: no provider is called and deliveries are recorded as mock_sent
+    for variable in ("TWILIO_ACCOUNT_SID", "TWILIO_AUTH_TOKEN", "TWILIO_PHONE_NUMBER"):
+        monkeypatch.delenv(variable, raising=False)
+    return SOSService(outbox=make_outbox(tmp_path))
+
+
+def test_manual_sos_with_location_after_autonomous_alert(tmp_path, monkeypatch):
+    service = make_service(tmp_path, monkeypatch)
+    autonomous = service.trigger_sos(CONTACTS, None, {"uid": "u1", "name": "A"})
+    assert not autonomous["deduplicated"]
+
+    manual = service.trigger_sos(CONTACTS, LOCATION, {"uid": "u1", "name": "A"})
+    assert not manual["deduplicated"]
+    assert manual["alert_id"] != autonomous["alert_id"]
+    stored = service.get_alert_status(manual["alert_id"])
+    assert stored["user_location"] == LOCATION
+    assert [c["status"] for c in stored["contacts_notified"]] == [MOCK_SENT, MOCK_SENT]
+
+
+def test_deduplicated_response_reports_the_stored_alert(tmp_path, monkeypatch):
+    service = make_service(tmp_path, monkeypatch)
+    first = service.trigger_sos(CONTACTS, LOCATION, {"uid": "u1", "name": "A"})
+    repeat = service.trigger_sos(CONTACTS, None, {"uid": "u1", "name": "Someone else"})
+    assert repeat["deduplicated"]
+    assert repeat["alert_id"] == first["alert_id"]
+    assert repeat["user_location"] == LOCATION
+    assert repeat["user_info"] == {"uid": "u1", "name": "A"}
+
+
+def test_uid_alone_cannot_suppress_other_contacts(tmp_path, monkeypatch):
+    service = make_service(tmp_path, monkeypatch)
+    service.trigger_sos([{"name": "Someone", "phone": "+15559999999"}], None, {"uid": "u1"})
+    victim = service.trigger_sos(CONTACTS, None, {"uid": "u1"})
+    assert not victim["deduplicated"]
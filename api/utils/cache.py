@@ -0,0 +1,120 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from utils.serialization import dumps, frozen_size
+
+# Sentinel returned by LRUCache.get on a miss, so cached falsy values stay usable
+MISSING = object()
+
+
+def normalize_message(text):
+    """
+    Cache key form of a message: lowercased with whitespace collapsed.
+    Sentiment and lexicon matching are both case-insensitive, so messages
+    that differ only in case or spacing analyze identically.
+    """
+    if not text:
+        return ""
+    return " ".join(text.lower().split())
+
+
+def _estimate_size(key, value):
+    # Frozen payloads are shared by every entry that references them, so they are not counted
+    return len(repr(key)) + len(dumps(value, default=str)) - frozen_size(value)
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with a per-entry TTL, an entry cap and an
+    approximate size cap in bytes (keys plus JSON-encoded values).
+    """
+
+    def __init__(self, max_entries=2048, ttl_seconds=300, max_bytes=8 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._lock = threading.Lock()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+
+            expires_at, size, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return MISSING
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        size = _estimate_size(key, value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, size, value)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
+
+
+def build_cache(prefix, max_entries=2048, ttl_seconds=300, max_bytes=8 * 1024 * 1024):
+    """
+    Creates an LRUCache sized from {prefix}_CACHE_MAX_ENTRIES, {prefix}_CACHE_TTL_SECONDS
+    and {prefix}_CACHE_MAX_BYTES, falling back to the given defaults.
+    Returns None when the entry cap is 0, which disables caching.
+    """
+    max_entries = int(os.getenv(f"{prefix}_CACHE_MAX_ENTRIES", max_entries))
+    if max_entries <= 0:
+        return None
+
+    return LRUCache(
+        max_entries=max_entries,
+        ttl_seconds=float(os.getenv(f"{prefix}_CACHE_TTL_SECONDS", ttl_seconds)),
+        max_bytes=int(os.getenv(f"{prefix}_CACHE_MAX_BYTES", max_bytes))
+    )
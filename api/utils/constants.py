@@ -7,6 +7,15 @@ CRITICAL = "Critical Distress"
 
 ALLOWED_STATES = [NORMAL, ANXIETY, STRESS, DEPRESSION, CRITICAL]
 
+# Severity rank used for emotional momentum (trend)
+STATE_SEVERITY = {
+    NORMAL: 0,
+    STRESS: 1,
+    ANXIETY: 2,
+    DEPRESSION: 3,
+    CRITICAL: 4
+}
+
 # Thresholds
 SENTIMENT_THRESHOLD_NEGATIVE = -0.2
 SENTIMENT_THRESHOLD_POSITIVE = 0.2
@@ -49,3 +58,50 @@ PRECAUTIONS = {
 # Note: Keep this empty or use valid phone numbers like "+1234567890" for testing.
 # Placeholder strings like "Contact 1" will cause Twilio to return a 400 error.
 MOCK_EMERGENCY_CONTACTS = []
+
+# Batch Analysis
+MAX_BATCH_SIZE = 1000
+
+# Analyze Request Parsing
+MAX_ANALYZE_BODY_BYTES = 1048576          # /api/analyze bodies beyond this are rejected with 413 (history is bounded, not the body)
+
+# SOS Dispatch Limits
+SOS_MAX_WORKERS = 8                   # Concurrent SMS sends per process
+SOS_SMS_TIMEOUT_SECONDS = 5.0         # Read timeout for a single provider call
+SOS_SMS_CONNECT_TIMEOUT_SECONDS = 2.0 # TCP/TLS connect timeout for a single provider call
+SOS_DISPATCH_DEADLINE_SECONDS = 8.0   # Upper bound for the whole fan-out
+
+# SOS Outbox
+SOS_DISPATCH_MODE = "outbox"          # "outbox" returns immediately; "inline" also attempts delivery in-request
+                                      # "sync" sends and retries in-request, no workers (serverless)
+SOS_MAX_ATTEMPTS = 5                  # Delivery attempts per contact before giving up
+SOS_RETRY_BASE_SECONDS = 2.0          # First retry delay; doubles on each attempt, with jitter
+SOS_RETRY_MAX_SECONDS = 60.0
+SOS_RETRY_BUDGET_RATIO = 0.2          # Retries allowed per recent first attempt; past it retries wait SOS_RETRY_MAX_SECONDS
+SOS_RETRY_BUDGET_MIN_PER_SECOND = 1.0 # Retries always allowed regardless of traffic
+SOS_OUTBOX_POLL_SECONDS = 1.0         # Idle worker wake-up interval (picks up due retries)
+SOS_OUTBOX_LEASE_SECONDS = 30.0       # A claimed delivery becomes claimable again after this
+SOS_PREWARM_CONNECTION = True         # Open the Twilio connection at startup, off the alert path
+SOS_START_WORKERS = True              # Pre-fork servers turn this off and start workers per process
+
+# SMS Provider Circuit Breaker
+SOS_BREAKER_FAILURE_RATE = 0.5        # Failure ratio over the window that opens the breaker
+SOS_BREAKER_MIN_CALLS = 10            # Calls needed in the window before the ratio counts
+SOS_BREAKER_WINDOW_SECONDS = 30.0
+SOS_BREAKER_COOLDOWN_SECONDS = 30.0   # Open time before a probe call is let through
+
+# SOS Deduplication
+SOS_SUPPRESSION_WINDOW_SECONDS = 300.0    # Repeat triggers for the same user within this window reuse the open alert (0 disables)
+SOS_IDEMPOTENCY_TTL_SECONDS = 86400.0     # How long an Idempotency-Key keeps returning its original alert
+
+# Live Analysis Stream
+MAX_STREAM_CHARS = 20000                  # Upper bound on text accumulated by /api/analyze/stream
+
+# Session State (server-side momentum)
+MOMENTUM_WINDOW = 3                       # Recent states the trend is computed over
+SESSION_STORE = "memory"                  # "memory", "sqlite" (shared by workers on one host) or "none"
+SESSION_TTL_SECONDS = 3600.0              # Idle sessions are forgotten after this
+SESSION_MAX_SESSIONS = 10000              # In-memory store cap; least recently used sessions are dropped
+
+# Lexicon Hot Reload
+LEXICON_POLL_SECONDS = 5.0                # How often lexicon.json is checked for changes; 0 disables hot reload
@@ -0,0 +1,223 @@
+"""
+Incremental parsing of JSON request bodies.
+
+read_json_object() reads a JSON object from a stream in chunks and keeps
+only the fields it is asked for. Arrays named in `tails` are streamed
+element by element into a bounded window, so a client that sends a long
+history costs one element of memory at a time instead of the whole array.
+Every other value is skipped the same way, container by container.
+
+Individual values are decoded by the standard library's C decoder
+(json.JSONDecoder.raw_decode); only the walk over the top-level object
+and the streamed arrays runs in Python. Consumed input is dropped as new
+chunks arrive, so memory stays at about one chunk plus the value being
+decoded, and the body is never read past `max_bytes`. Bodies that arrive
+whole in the first read are decoded in one go and trimmed the same way.
+"""
+import codecs
+import json
+import re
+from collections import deque
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_AFTER_VALUE = frozenset(" \t\n\r,:]}")
+
+
+class BodyTooLarge(ValueError):
+    """The body is longer than the allowed maximum."""
+
+
+class _StreamReader:
+    def __init__(self, stream, max_bytes, chunk_size):
+        self.stream = stream
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.pos = 0
+        self.bytes_read = 0
+        self.eof = False
+
+    def _fill(self, size=None):
+        """Appends the next chunk to the buffer. Returns False at the end of the body."""
+        if self.eof:
+            return False
+        chunk = self.stream.read(size or self.chunk_size)
+        if not chunk:
+            self.eof = True
+            self.buffer += self.decoder.decode(b"", final=True)
+            return False
+
+        self.bytes_read += len(chunk)
+        if self.bytes_read > self.max_bytes:
+            raise BodyTooLarge(f"Request body exceeds {self.max_bytes} bytes")
+        # Drop what has been consumed, so memory does not grow with the body
+        if self.pos:
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        self.buffer += self.decoder.decode(chunk)
+        return True
+
+    def peek(self):
+        """The next non-whitespace character, or "" at the end of the body."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected '{char}' but found {repr(found) if found else 'end of body'}")
+        self.pos += 1
+
+    def value(self):
+        """Decodes the next complete JSON value."""
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buffer, self.pos)
+                # A number cut by a chunk boundary ("12|3", "1.|5", "1e|3") decodes as its prefix;
+                # only accept it once it is followed by a delimiter
+                if self.eof or (end < len(self.buffer) and self.buffer[end] in _AFTER_VALUE):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Read ahead in growing steps, so a long value is re-scanned a bounded number of times
+            self._fill(size)
+            size *= 2
+
+    def elements(self, open_char, close_char, consume):
+        """
+        Walks an array or object, calling consume() once per element
+        (for objects, after the key and colon have been read and passed in).
+        """
+        self.expect(open_char)
+        if self.peek() == close_char:
+            self.pos += 1
+            return
+        while True:
+            if open_char == "{":
+                consume(self.key())
+            else:
+                consume()
+            if self.separator(close_char):
+                return
+
+    def key(self):
+        """Reads an object key and the colon after it."""
+        key = self.value()
+        if not isinstance(key, str):
+            raise ValueError("Object keys must be strings")
+        self.expect(":")
+        return key
+
+    def separator(self, close_char):
+        """Consumes the ',' or closing character after an element; True when the container ends."""
+        found = self.peek()
+        self.pos += 1
+        if found == close_char:
+            return True
+        if found != ",":
+            raise ValueError(f"Expected ',' or '{close_char}' but found {repr(found) if found else 'end of body'}")
+        return False
+
+    def skip(self, key=None):
+        """
+        Consumes the next value, streaming through containers instead of building them.
+        Open containers are tracked on an explicit stack, so nesting depth costs no recursion.
+        """
+        closing = []
+        while True:
+            char = self.peek()
+            if char == "[" or char == "{":
+                self.pos += 1
+                close_char = "]" if char == "[" else "}"
+                if self.peek() == close_char:
+                    self.pos += 1
+                else:
+                    closing.append(close_char)
+                    if close_char == "}":
+                        self.key()
+                    continue
+            else:
+                self.value()
+
+            # A value is complete: close finished containers, or move on to the next element
+            while closing:
+                if not self.separator(closing[-1]):
+                    if closing[-1] == "}":
+                        self.key()
+                    break
+                closing.pop()
+            if not closing:
+                return
+
+
+def _trim(item, fields):
+    return {field: item[field] for field in fields if field in item} if isinstance(item, dict) else item
+
+
+def _select(document, fields, tails):
+    """The same selection as the streaming path, applied to a decoded document."""
+    if not isinstance(document, dict):
+        raise ValueError("Request body must be a JSON object")
+    data = {key: document[key] for key in fields if key in document}
+    for key, (window, item_fields) in tails.items():
+        if key in document:
+            items = document[key]
+            if isinstance(items, list):
+                items = [_trim(item, item_fields) for item in items[max(0, len(items) - window):]]
+            data[key] = items
+    return data
+
+
+def read_json_object(stream, fields, max_bytes, tails=None, chunk_size=16384):
+    """
+    Reads a JSON object from `stream` and returns a dict with only `fields`.
+
+    `tails` maps array fields to (window, item_fields): only the last
+    `window` elements are kept, and of object elements only `item_fields`.
+    A tail field that is not an array is returned as decoded.
+
+    Raises BodyTooLarge past `max_bytes`, and ValueError for a body that is
+    not a single JSON object.
+    """
+    try:
+        return _read_json_object(stream, fields, max_bytes, tails or {}, chunk_size)
+    except RecursionError:
+        # Values are decoded recursively; past the interpreter's limit the body is rejected, not crashed on
+        raise ValueError("JSON nesting is too deep")
+
+
+def _read_json_object(stream, fields, max_bytes, tails, chunk_size):
+    reader = _StreamReader(stream, max_bytes, chunk_size)
+    if not (reader._fill() and reader._fill()):
+        # Small bodies arrive whole in the first read; one C decode is cheaper than walking them
+        return _select(json.loads(reader.buffer), fields, tails)
+    if reader.peek() != "{":
+        raise ValueError("Request body must be a JSON object")
+
+    data = {}
+
+    def consume(key):
+        if key in tails and reader.peek() == "[":
+            window, item_fields = tails[key]
+            kept = deque(maxlen=window)
+            reader.elements("[", "]", lambda: kept.append(_trim(reader.value(), item_fields)))
+            data[key] = list(kept)
+        elif key in fields or key in tails:
+            data[key] = reader.value()
+        else:
+            reader.skip()
+
+    reader.elements("{", "}", consume)
+    if reader.peek():
+        raise ValueError("Unexpected data after the JSON object")
+    return data
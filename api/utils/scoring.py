@@ -1,3 +1,5 @@
+# numpy is imported inside calculate_intensity_batch so single-message requests never load it
+
 def calculate_intensity(sentiment_score, keyword_count):
     """
     Calculates intensity with a safety floor for high keyword counts.
@@ -15,3 +17,23 @@ def calculate_intensity(sentiment_score, keyword_count):
     total_intensity = sentiment_intensity + kw_intensity
     
     return round(min(total_intensity, 5.0), 1)
+
+def calculate_intensity_batch(sentiment_scores, keyword_counts):
+    """
+    Vectorized calculate_intensity over parallel sequences of scores and counts.
+    Returns a list of floats identical to calling calculate_intensity per message.
+    """
+    import numpy as np
+
+    sentiment = np.asarray(sentiment_scores, dtype=float)
+    counts = np.asarray(keyword_counts, dtype=float)
+
+    sentiment_intensity = (1.0 - sentiment) * 1.25
+    kw_intensity = np.minimum(counts * 0.5, 2.5)
+    total_intensity = np.minimum(sentiment_intensity + kw_intensity, 5.0)
+
+    # Python's round() is used for the final step so ties resolve exactly as in calculate_intensity
+    return [
+        5.0 if count >= 10 else round(value, 1)
+        for value, count in zip(total_intensity.tolist(), counts.tolist())
+    ]
@@ -0,0 +1,137 @@
+"""
+Fast JSON encoding for analysis responses.
+
+Static parts of a response (agent payloads, precaution lists) are frozen
+once at startup together with their encoded bytes. With orjson 3.9+,
+dumps() splices those bytes into the output as orjson.Fragment instead of
+re-encoding them; with older orjson or the standard json module the whole
+response is encoded natively in one call, which is still faster than
+splicing from Python.
+
+orjson is optional; without it the standard json module is used.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+# orjson.Fragment (3.9+) embeds already-encoded JSON verbatim
+_FRAGMENTS = orjson is not None and hasattr(orjson, "Fragment")
+
+
+def _read_only(self, *args, **kwargs):
+    raise TypeError(f"{type(self).__name__} is read-only; copy it with dict() or list() to modify")
+
+
+def _freeze(value):
+    if isinstance(value, (FrozenDict, FrozenList)):
+        return value
+    if isinstance(value, dict):
+        return FrozenDict(value)
+    if isinstance(value, (list, tuple)):
+        return FrozenList(value)
+    return value
+
+
+def _encode_plain(value, default=None):
+    """Compact UTF-8 JSON of `value`, with frozen fragments encoded like plain containers."""
+    if orjson is not None:
+        return orjson.dumps(value, default=default)
+    return json.dumps(value, default=default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FrozenDict(dict):
+    """
+    Read-only dict carrying its own pre-encoded JSON in `.json`.
+    Nested dicts and lists are frozen too. It is still a dict, so it
+    compares, copies and encodes like one everywhere a response is read.
+    """
+
+    __slots__ = ("json",)
+
+    def __init__(self, value=()):
+        dict.__init__(self, ((key, _freeze(item)) for key, item in dict(value).items()))
+        self.json = _encode_plain(self)
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = __ior__ = _read_only
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+class FrozenList(list):
+    """
+    Read-only list carrying its own pre-encoded JSON in `.json`.
+    """
+
+    __slots__ = ("json",)
+
+    def __init__(self, value=()):
+        list.__init__(self, (_freeze(item) for item in value))
+        self.json = _encode_plain(self)
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = extend = insert = pop = remove = clear = sort = reverse = _read_only
+
+    def __reduce__(self):
+        return (FrozenList, (list(self),))
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+def freeze(value):
+    """Returns an immutable, pre-encoded copy of a dict or list."""
+    return _freeze(value)
+
+
+def _fragment_default(default):
+    def encode(value):
+        if isinstance(value, (FrozenDict, FrozenList)):
+            return orjson.Fragment(value.json)
+        # Other subclasses of built-in types encode as their base type
+        for base in (dict, list, str, int, float):
+            if isinstance(value, base):
+                return base(value)
+        if default is not None:
+            return default(value)
+        raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+    return encode
+
+
+_SPLICE = _fragment_default(None) if _FRAGMENTS else None
+
+
+def dumps(value, default=None):
+    """
+    Encodes `value` as compact UTF-8 JSON bytes, splicing in the cached
+    bytes of frozen fragments where the backend supports it.
+    """
+    if _FRAGMENTS:
+        # Subclass passthrough routes FrozenDict/FrozenList to the hook, which returns their bytes
+        return orjson.dumps(
+            value,
+            default=_SPLICE if default is None else _fragment_default(default),
+            option=orjson.OPT_PASSTHROUGH_SUBCLASS
+        )
+    return _encode_plain(value, default)
+
+
+def frozen_size(value):
+    """
+    Encoded bytes of the frozen fragments inside `value`. These are shared by
+    every response that references them, so the cache leaves them out when
+    sizing an entry.
+    """
+    if isinstance(value, (FrozenDict, FrozenList)):
+        return len(value.json)
+    if isinstance(value, dict):
+        return sum(frozen_size(item) for item in value.values())
+    if isinstance(value, list):
+        return sum(frozen_size(item) for item in value)
+    return 0
@@ -20,6 +20,8 @@ import { collection, addDoc, query, orderBy, onSnapshot, limit, doc, getDoc } fr
 
 const Home: React.FC = () => {
     const hydrationRef = useRef(false);
+    // Identifies this chat to the backend, which tracks the emotional trend server-side
+    const sessionIdRef = useRef(crypto.randomUUID());
     const [analysisResult, setAnalysisResult] = useState<AnalysisResponse | null>(null);
     const [isMobileMenuOpen, setIsMobileMenuOpen] = useState(false);
     // If brand new user with no history, set initial greeting
@@ -229,12 +231,19 @@ const Home: React.FC = () => {
             // 2. Run Analysis in Background (Does not block UI)
             // Fetch contacts for analysis payload
             let emergencyContacts = [];
+            let userInfo;
             if (currentUser) {
                 const userDoc = await getDoc(doc(db, 'users', currentUser.uid));
-                emergencyContacts = userDoc.data()?.emergencyContacts || [];
+                const userData = userDoc.data();
+                emergencyContacts = userData?.emergencyContacts || [];
+                // Lets the backend coalesce repeated Critical alerts for this user
+                userInfo = {
+                    name: userData?.displayName || userData?.name || "User",
+                    uid: currentUser.uid
+                };
             }
 
-            analyzeMessage(content, reviewMode ? 'review' : 'user', history, emergencyContacts)
+            analyzeMessage(content, reviewMode ? 'review' : 'user', history, emergencyContacts, userInfo, sessionIdRef.current)
                 .then(async (analysisResult) => {
                     if (!analysisResult) return; // Safety check
 
@@ -41,14 +41,25 @@ export interface AnalysisResponse {
 
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || '/api';
 
-export const analyzeMessage = async (message: string, mode: 'user' | 'review' = 'user', history: PredictionHistoryItem[] = [], emergencyContacts: any[] = []): Promise<AnalysisResponse> => {
+// The backend keeps the recent states per session; only this tail of the
+// history is sent, to seed a session the server does not know yet
+const MOMENTUM_WINDOW = 3;
+
+export const analyzeMessage = async (message: string, mode: 'user' | 'review' = 'user', history: PredictionHistoryItem[] = [], emergencyContacts: any[] = [], userInfo?: { name: string; uid: string }, sessionId?: string): Promise<AnalysisResponse> => {
     try {
         const response = await fetch(`${API_BASE_URL}/analyze`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({ message, mode, history, emergency_contacts: emergencyContacts }),
+            body: JSON.stringify({
+                message,
+                mode,
+                history: history.slice(-MOMENTUM_WINDOW),
+                emergency_contacts: emergencyContacts,
+                user_info: userInfo,
+                session_id: sessionId
+            }),
         });
 
         if (!response.ok) {